@@ -6,10 +6,13 @@
 """
 
 import re
+import sys
 import json
 from collections import defaultdict
 from pathlib import Path
 
+from gender_index import GenderIndex
+
 
 def extract_potential_names(text):
     """
@@ -65,42 +68,6 @@ def extract_potential_names(text):
     return {name: count for name, count in potential_names.items() if count >= 2}
 
 
-def infer_gender_from_context(text, name):
-    """
-    从上下文推断角色性别
-
-    返回: (性别, 置信度)
-    """
-    # 查找名字前后的代词
-    patterns = [
-        rf'{{0,20}}{name}{{0,20}}([他她])',
-        rf'([他她]){{0,20}}{name}{{0,20}}',
-    ]
-
-    female_count = 0
-    male_count = 0
-
-    for pattern in patterns:
-        matches = re.findall(pattern.format(name=name), text)
-        for match in matches:
-            if '她' in match:
-                female_count += 1
-            elif '他' in match:
-                male_count += 1
-
-    # 判断
-    if female_count > male_count * 2:
-        return '女', '高'
-    elif male_count > female_count * 2:
-        return '男', '高'
-    elif female_count > male_count:
-        return '女', '中'
-    elif male_count > female_count:
-        return '男', '中'
-    else:
-        return '未知', '低'
-
-
 def analyze_novel(text):
     """
     分析小说文本，提取角色信息
@@ -121,9 +88,12 @@ def analyze_novel(text):
     # 创建角色对象
     characters = {}
 
+    # 扫描一遍全文，同时推断所有角色的性别
+    gender_index = GenderIndex(text, potential_names)
+
     for name, count in sorted(potential_names.items(), key=lambda x: x[1], reverse=True):
         # 推断性别
-        gender, confidence = infer_gender_from_context(text, name)
+        gender, confidence = gender_index.gender(name)
 
         characters[name] = {
             'name': name,
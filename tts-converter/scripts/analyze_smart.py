@@ -10,6 +10,8 @@ import json
 from collections import defaultdict
 from pathlib import Path
 
+from gender_index import GenderIndex
+
 
 def extract_names_and_dialogues(text):
     """
@@ -131,33 +133,6 @@ def extract_names_and_dialogues(text):
     return characters, dialogues
 
 
-def infer_gender(text, character_name):
-    """推断角色性别"""
-    # 查找名字周围的代词
-    patterns = [
-        rf'{character_name}{{0,50}}([他她])',
-        rf'([他她]){{0,50}}{character_name}',
-    ]
-
-    female = 0
-    male = 0
-
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        for m in matches:
-            if '她' in m:
-                female += 1
-            elif '他' in m:
-                male += 1
-
-    if female > male:
-        return '女'
-    elif male > female:
-        return '男'
-    else:
-        return '未知'
-
-
 def main():
     import sys
 
@@ -184,8 +159,13 @@ def main():
     # 创建角色配置
     char_configs = {}
 
-    for name, stats in sorted(characters.items(), key=lambda x: x[1]['count'], reverse=True)[:10]:
-        gender = infer_gender(text, name)
+    top_characters = sorted(characters.items(), key=lambda x: x[1]['count'], reverse=True)[:10]
+
+    # 扫描一遍全文，同时推断所有角色的性别（名字前后50个字符内的他/她和性别名词）
+    gender_index = GenderIndex(text, [name for name, _ in top_characters], window=50)
+
+    for name, stats in top_characters:
+        gender, _ = gender_index.gender(name)
 
         char_configs[name] = {
             'name': name,
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MP3帧级拼接工具
+直接按MPEG音频帧拼接多个MP3片段，无需解码、无需临时文件、无需逐段调用ffmpeg
+"""
+
+import io
+import subprocess
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+
+# 比特率表 (kbps)，按 (MPEG版本是否为1, 层) 索引
+_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# 采样率表，按MPEG版本位索引 (0=MPEG2.5, 2=MPEG2, 3=MPEG1)
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+
+# Edge TTS输出的流参数: MPEG2 Layer III, 24kHz, 单声道
+DEFAULT_SIGNATURE = (2, 3, 24000, 1)
+
+# 全局增益不超过此值且没有大值区的颗粒视为静音（量化值±1时幅度约为满幅的2^-15）
+SILENCE_GLOBAL_GAIN = 150
+
+# 长文本分块拼接时块之间的停顿（秒），与整段合成时的句间停顿相近
+CHUNK_GAP = 0.3
+
+# 其他容器格式的文件头（不能按MP3帧处理）
+_CONTAINER_MAGIC = (b'RIFF', b'OggS', b'fLaC')
+
+
+def parse_frame_header(data, offset: int) -> Optional[dict]:
+    """
+    解析MPEG音频帧头
+
+    Args:
+        data: 音频数据
+        offset: 帧头位置
+
+    Returns:
+        {version, layer, sample_rate, channels, frame_length, samples}，不是有效帧头时返回None
+    """
+    if offset + 4 > len(data):
+        return None
+
+    b0, b1, b2, b3 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+
+    if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    layer = 4 - layer_bits
+    is_v1 = version == 3
+    bitrate = _BITRATES[(is_v1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    channels = 1 if (b3 >> 6) == 3 else 2
+
+    if layer == 1:
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+        samples = 384
+    elif layer == 2 or is_v1:
+        frame_length = 144 * bitrate // sample_rate + padding
+        samples = 1152
+    else:
+        frame_length = 72 * bitrate // sample_rate + padding
+        samples = 576
+
+    return {
+        'version': version,
+        'layer': layer,
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'frame_length': frame_length,
+        'samples': samples,
+    }
+
+
+def _skip_id3v2(data) -> int:
+    """跳过开头的ID3v2标签，返回音频起始位置"""
+    if len(data) >= 10 and bytes(data[:3]) == b'ID3':
+        size = ((data[6] & 0x7F) << 21) | ((data[7] & 0x7F) << 14) | ((data[8] & 0x7F) << 7) | (data[9] & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def _side_info_length(header: dict) -> int:
+    """Layer III 边信息长度（字节）"""
+    if header['version'] == 3:
+        return 17 if header['channels'] == 1 else 32
+    return 9 if header['channels'] == 1 else 17
+
+
+def read_side_info(data, offset: int, header: dict) -> Tuple[int, list]:
+    """
+    读取 Layer III 帧的边信息
+
+    Args:
+        data: 音频数据
+        offset: 帧头位置
+        header: 帧头信息
+
+    Returns:
+        (main_data_begin, [(part2_3_length, big_values, global_gain), ...])；
+        main_data_begin 为本帧主数据在前面帧中的起始回退字节数（比特池），
+        列表为每个颗粒每个声道的编码长度（位）、大值区长度和全局增益
+    """
+    crc = 0 if data[offset + 1] & 0x01 else 2
+    start = offset + 4 + crc
+    length = _side_info_length(header)
+    bits = int.from_bytes(bytes(data[start:start + length]), 'big')
+    total_bits = length * 8
+
+    def field(position, width):
+        return (bits >> (total_bits - position - width)) & ((1 << width) - 1)
+
+    channels = header['channels']
+    if header['version'] == 3:
+        # MPEG1: main_data_begin(9) private(5/3) scfsi(4/声道)，每颗粒每声道59位，共2个颗粒
+        main_data_begin = field(0, 9)
+        position = 9 + (5 if channels == 1 else 3) + 4 * channels
+        granules, block = 2, 59
+    else:
+        # MPEG2/2.5: main_data_begin(8) private(1/2)，每声道63位，1个颗粒
+        main_data_begin = field(0, 8)
+        position = 8 + (1 if channels == 1 else 2)
+        granules, block = 1, 63
+
+    blocks = []
+    for _ in range(granules * channels):
+        blocks.append((field(position, 12), field(position + 12, 9), field(position + 21, 8)))
+        position += block
+
+    return main_data_begin, blocks
+
+
+def is_silent_frame(data, offset: int, header: dict) -> bool:
+    """
+    是否为静音帧（不解码，只看边信息）
+
+    每个颗粒都没有编码数据，或只有±1的量化值且全局增益很低（约-90dB以下）时视为静音
+    """
+    if header['layer'] != 3:
+        return False
+    _, blocks = read_side_info(data, offset, header)
+    return all(length == 0 or (big_values == 0 and gain <= SILENCE_GLOBAL_GAIN)
+               for length, big_values, gain in blocks)
+
+
+def _is_info_frame(data, offset: int, header: dict) -> bool:
+    """是否为Xing/Info/VBRI信息帧（不含音频，拼接时必须去掉）"""
+    # Xing/Info标签紧跟在帧头和边信息之后
+    crc = 0 if data[offset + 1] & 0x01 else 2
+
+    xing = offset + 4 + crc + _side_info_length(header)
+    if bytes(data[xing:xing + 4]) in (b'Xing', b'Info'):
+        return True
+    return bytes(data[offset + 36:offset + 40]) == b'VBRI'
+
+
+def iter_frames(data) -> Iterator[Tuple[int, dict]]:
+    """
+    遍历MP3数据中的音频帧
+
+    跳过ID3v2标签、ID3v1尾标签、Xing/Info信息帧和帧之间的无效字节
+
+    Yields:
+        (帧位置, 帧头信息)
+    """
+    offset = _skip_id3v2(data)
+    end = len(data)
+    if end - offset >= 128 and bytes(data[end - 128:end - 125]) == b'TAG':
+        end -= 128
+
+    first = True
+    while offset + 4 <= end:
+        header = parse_frame_header(data, offset)
+        if header is None or offset + header['frame_length'] > end:
+            # 失去同步，向后查找下一个帧头
+            offset += 1
+            continue
+
+        if first and header['layer'] == 3 and _is_info_frame(data, offset, header):
+            first = False
+            offset += header['frame_length']
+            continue
+
+        first = False
+        yield offset, header
+        offset += header['frame_length']
+
+
+def stream_signature(header: dict) -> Tuple[int, int, int, int]:
+    """可以直接帧级拼接的流参数"""
+    return (header['version'], header['layer'], header['sample_rate'], header['channels'])
+
+
+class MP3Assembler:
+    """
+    MP3流拼接器
+    依次加入多个MP3片段，按帧写入同一个输出流
+    """
+
+    def __init__(self, output: Union[str, Path, BinaryIO]):
+        """
+        初始化拼接器
+
+        Args:
+            output: 输出文件路径，或已打开的二进制流（如 sys.stdout.buffer）
+        """
+        if isinstance(output, (str, Path)):
+            self._stream = open(output, 'wb')
+            self._owns_stream = True
+        else:
+            self._stream = output
+            self._owns_stream = False
+
+        self.signature = None  # 第一个片段的流参数
+        self.frames = 0
+        self.samples = 0
+        self.bytes_written = 0
+        self.transcoded = 0  # 需要转码的片段数
+
+    def add(self, data: bytes) -> float:
+        """
+        加入一个音频片段
+
+        与第一个片段参数一致的MP3直接按帧写入；参数不一致或不是MP3的数据
+        （如部分后端返回的WAV）会先用ffmpeg转码为相同参数
+
+        Args:
+            data: 音频数据
+
+        Returns:
+            片段时长（秒）
+        """
+        if not data:
+            return 0.0
+
+        frames = [] if bytes(data[:4]) in _CONTAINER_MAGIC else list(iter_frames(data))
+
+        if self.signature is None:
+            self.signature = stream_signature(frames[0][1]) if frames else DEFAULT_SIGNATURE
+
+        if not frames or any(stream_signature(h) != self.signature for _, h in frames):
+            data = self._transcode(data)
+            frames = list(iter_frames(data))
+            self.transcoded += 1
+
+        view = memoryview(data)
+        samples = 0
+        for offset, header in frames:
+            self._stream.write(view[offset:offset + header['frame_length']])
+            self.bytes_written += header['frame_length']
+            samples += header['samples']
+
+        self.frames += len(frames)
+        self.samples += samples
+        return samples / self.signature[2]
+
+    def add_file(self, path: Union[str, Path]) -> float:
+        """加入一个音频文件"""
+        return self.add(Path(path).read_bytes())
+
+    def _transcode(self, data: bytes) -> bytes:
+        """用ffmpeg把片段转码为与输出流相同的参数（通过管道，不写临时文件）"""
+        _, _, sample_rate, channels = self.signature
+        result = subprocess.run([
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-i', 'pipe:0',
+            '-ar', str(sample_rate), '-ac', str(channels),
+            '-f', 'mp3', 'pipe:1'
+        ], input=data, capture_output=True, check=True)
+        return result.stdout
+
+    @property
+    def duration(self) -> float:
+        """已写入音频的总时长（秒）"""
+        if self.signature is None:
+            return 0.0
+        return self.samples / self.signature[2]
+
+    def close(self):
+        """结束写入"""
+        if self._owns_stream:
+            self._stream.close()
+        else:
+            self._stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def make_silence(duration: float) -> bytes:
+    """
+    生成指定时长的静音MP3（与Edge TTS输出参数相同，可直接帧级拼接）
+
+    Args:
+        duration: 时长（秒）
+
+    Returns:
+        MP3数据
+    """
+    # MPEG2 Layer III, 48kbps, 24kHz, 单声道, 无CRC; 边信息全零即为静音帧
+    header = bytes([0xFF, 0xF3, 0x64, 0xC4])
+    frame = header + bytes(144 - len(header))
+    frames = max(0, round(duration * 24000 / 576))
+    return frame * frames
+
+
+def make_voiced(duration: float, seed: bytes = b'') -> bytes:
+    """
+    生成指定时长的"有声"MP3（参数与 make_silence 相同），用于离线测试合成流水线
+
+    每帧的边信息带有编码数据和较高的全局增益，拼接时按有声帧处理（不会被当作首尾静音修剪）；
+    主数据是 count1 区的全零四元组（码表A的码字"1"），解码器可以正常解码，听起来仍是静音
+
+    Args:
+        duration: 时长（秒）
+        seed: 决定各帧增益的字节串（相同的seed生成相同的数据）
+
+    Returns:
+        MP3数据
+    """
+    header = bytes([0xFF, 0xF3, 0x64, 0xC4])
+    side_length = 9
+    # 576个值 = 144个四元组，每个1位
+    payload = b'\xff' * 18
+    padding = bytes(144 - len(header) - side_length - len(payload))
+
+    variants = {}
+    frames = []
+    for i in range(max(0, round(duration * 24000 / 576))):
+        gain = SILENCE_GLOBAL_GAIN + 20 + (seed[i % len(seed)] % 40 if seed else 0)
+        if gain not in variants:
+            # 边信息72位: main_data_begin(8)=0 private(1)=0 part2_3_length(12)=144 big_values(9)=0
+            # global_gain(8) 其余34位为0（scalefac_compress=0，不切换窗口，count1码表A）
+            side = ((144 << 51) | (gain << 34)).to_bytes(side_length, 'big')
+            variants[gain] = header + side + payload + padding
+        frames.append(variants[gain])
+    return b''.join(frames)
+
+
+def join_mp3(parts) -> bytes:
+    """
+    在内存中拼接多个MP3片段
+
+    Args:
+        parts: MP3数据列表
+
+    Returns:
+        拼接后的MP3数据
+    """
+    buffer = io.BytesIO()
+    assembler = MP3Assembler(buffer)
+    for part in parts:
+        assembler.add(part)
+    return buffer.getvalue()
+
+
+def _trim_plan(data, frames) -> Tuple[int, int, list]:
+    """
+    计算片段首尾的静音帧数和可以安全去掉的开头帧数
+
+    Returns:
+        (开头静音帧数, 结尾静音帧数, 每个开头帧数d对应是否可以从第d帧开始播放的列表)；
+        整个片段都是静音时首尾静音帧数都为0（不修剪）
+    """
+    silent = [is_silent_frame(data, offset, header) for offset, header in frames]
+    if all(silent):
+        return 0, 0, [True]
+
+    lead = silent.index(False)
+    trail = silent[::-1].index(False)
+
+    # 比特池: 非静音帧的主数据可能从前面几帧的数据区开始，去掉开头帧时不能去掉被引用的帧
+    payload_start = []  # 每帧数据区在主数据流中的起始位置
+    position = 0
+    reach = position  # 被引用的最早位置
+    for index, ((offset, header), is_silent) in enumerate(zip(frames, silent)):
+        if index > lead and position - 511 > payload_start[lead]:
+            # main_data_begin 最多回退511字节，更后面的帧不会引用开头的静音帧
+            break
+        payload_start.append(position)
+        if index >= lead and not is_silent:
+            main_data_begin, _ = read_side_info(data, offset, header)
+            reach = position - main_data_begin if index == lead else min(reach, position - main_data_begin)
+        crc = 0 if data[offset + 1] & 0x01 else 2
+        position += header['frame_length'] - 4 - crc - _side_info_length(header)
+
+    safe = [payload_start[d] <= reach for d in range(lead + 1)]
+    return lead, trail, safe
+
+
+def join_chunks(parts, gap: float = CHUNK_GAP) -> bytes:
+    """
+    无缝拼接同一段文本分块合成的音频
+
+    每个接缝处去掉多余的首尾静音（保留比特池引用的帧），不足时补静音帧，
+    使块之间的停顿统一为 gap 秒，听起来与整段一次合成相同；
+    片段不是参数一致的 Layer III MP3 时退化为直接拼接
+
+    Args:
+        parts: 各块的MP3数据（按顺序）
+        gap: 块之间的停顿（秒）
+
+    Returns:
+        拼接后的MP3数据
+    """
+    parts = [part for part in parts if part]
+    if len(parts) < 2:
+        return parts[0] if parts else b''
+
+    framed = []
+    for part in parts:
+        frames = [] if bytes(part[:4]) in _CONTAINER_MAGIC else list(iter_frames(part))
+        framed.append(frames)
+
+    signature = stream_signature(framed[0][0][1]) if framed[0] else None
+    if signature is None or signature[1] != 3 or any(
+            not frames or any(stream_signature(h) != signature for _, h in frames) for frames in framed):
+        return join_mp3(parts)
+
+    samples_per_frame = framed[0][0][1]['samples']
+    gap_frames = max(0, round(gap * signature[2] / samples_per_frame))
+    silence = make_silence(gap) if signature == DEFAULT_SIGNATURE else b''
+    silence_frame = silence[:len(silence) // gap_frames] if gap_frames and silence else b''
+
+    plans = [_trim_plan(part, frames) for part, frames in zip(parts, framed)]
+
+    buffer = io.BytesIO()
+    for i, (part, frames) in enumerate(zip(parts, framed)):
+        lead, trail, safe = plans[i]
+        begin, end = 0, len(frames)
+
+        if i > 0:
+            # 接缝处: 前一块结尾保留一半停顿，本块开头补足
+            previous_trail = plans[i - 1][1]
+            keep_trail = min(previous_trail, (gap_frames + 1) // 2)
+            keep_lead = min(lead, gap_frames - keep_trail)
+            begin = lead - keep_lead
+            while not safe[begin]:
+                begin -= 1
+            kept = keep_trail + (lead - begin)
+            if kept < gap_frames and silence_frame:
+                buffer.write(silence_frame * (gap_frames - kept))
+
+        if i < len(parts) - 1:
+            end -= trail - min(trail, (gap_frames + 1) // 2)
+
+        view = memoryview(part)
+        for offset, header in frames[begin:end]:
+            buffer.write(view[offset:offset + header['frame_length']])
+
+    return buffer.getvalue()
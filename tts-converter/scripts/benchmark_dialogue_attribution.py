@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对话说话人识别性能测试
+生成合成小说，分别按 improved_tts、generate_script、fix_dialogue 的配置识别全部对话的说话人，
+再用一个大角色表直接测试识别引擎，测量吞吐（对话/秒）和各策略的命中比例
+"""
+
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+
+import improved_tts
+import generate_script
+import fix_dialogue
+from dialogue_attribution import DialogueAttributor, SPEECH_VERBS, EXTENDED_SPEECH_VERBS
+from benchmark_text_analysis import make_names
+
+
+NAMES = ['和也', '佐藤和也', '艾米', 'AI管家', '星空', '星月星空', '我']
+VERBS = ['说', '道', '问', '喊', '笑道', '解释', '回答', '嘟囔']
+LINES = [
+    '根据数据显示，你的幸福指数下降了', '完蛋了，论文还没写', '意识上传就能永生吗',
+    '你来了', '我们走吧', '等一下', '你到底想说什么', '为什么又是我', '帮忙看看这个算法',
+]
+NARRATION = [
+    '窗外的雨一直没有停。',
+    '星空低头看着手里的书，没有说话。',
+    '艾米的指示灯闪了两下。',
+    '和也叹了口气，把书包扔在桌上。',
+    '走廊里传来脚步声。',
+]
+
+
+def make_novel(quote_count: int, rng: random.Random, names=NAMES) -> str:
+    """
+    生成包含指定数量对话的合成小说
+
+    混合同一行带说话人的对话、无说话人的对话（需要从内容或上下文推断）和旁白
+    """
+    lines = []
+    quotes = 0
+    while quotes < quote_count:
+        r = rng.random()
+        quote = rng.choice(LINES)
+        if r < 0.3:
+            lines.append(f"{rng.choice(names)}{rng.choice(VERBS)}：「{quote}」")
+        elif r < 0.45:
+            lines.append(f"「{quote}」{rng.choice(names)}{rng.choice(VERBS)}。")
+        elif r < 0.65:
+            lines.append(f"「{quote}」")
+        elif r < 0.75:
+            lines.append(f"{rng.choice(names)}看了{rng.choice(names)}一眼，{rng.choice(NARRATION)}")
+            continue
+        else:
+            lines.append(rng.choice(NARRATION))
+            continue
+        quotes += 1
+    return '\n'.join(lines)
+
+
+def make_cast(names):
+    """大角色表: 每个角色有全名和名两个变体"""
+    return {name: {'keywords': [], 'name_variations': [name, name[1:]] if len(name) > 2 else [name]}
+            for name in names}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对话说话人识别性能测试')
+    parser.add_argument('--quotes', type=int, nargs='+', default=[10000, 50000, 200000],
+                        help='对话数量（默认: 10000 50000 200000）')
+    parser.add_argument('--cast', type=int, default=100,
+                        help='直接测试识别引擎时的角色数量（默认: 100）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子（默认: 42）')
+
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    extractors = [
+        ('improved_tts', improved_tts.extract_dialogues_with_context),
+        ('generate_script', generate_script.extract_dialogues_with_speakers),
+        ('fix_dialogue', fix_dialogue.extract_dialogues_with_speakers),
+    ]
+
+    cast_names = make_names(args.cast, rng)
+    cast_engine = DialogueAttributor(make_cast(cast_names), before_verbs=EXTENDED_SPEECH_VERBS,
+                                     after_verbs=SPEECH_VERBS, context_threshold=2)
+
+    print(f"{'对话数':>8} {'配置':<16} {'耗时':>9} {'吞吐':>14}")
+
+    for quote_count in args.quotes:
+        text = make_novel(quote_count, rng)
+        cast_text = make_novel(quote_count, rng, cast_names)
+        runs = [(label, extract, text) for label, extract in extractors]
+        runs.append((f"{args.cast}个角色", cast_engine.attribute, cast_text))
+
+        for label, extract, novel in runs:
+            start = time.perf_counter()
+            dialogues = extract(novel)
+            elapsed = time.perf_counter() - start
+            print(f"{len(dialogues):>8} {label:<16} {elapsed:>8.2f}s {len(dialogues) / elapsed:>10.0f}对话/秒")
+
+    # 各策略的命中比例（最后一个规模，improved_tts 配置带有 strategy 字段）
+    strategies = Counter(d['strategy'] for d in improved_tts.extract_dialogues_with_context(text))
+    total = sum(strategies.values())
+    print("\n[INFO] improved_tts 各策略命中比例: " +
+          ", ".join(f"{name} {count / total:.0%}" for name, count in strategies.most_common()))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GPT-SoVITS服务池性能测试
+启动多个模拟服务（每个节点的并发容量很小，模拟CPU推理），
+分别用1个到N个节点组成服务池发送同样数量的请求，比较吞吐是否随节点数线性增长；
+再模拟运行中一个节点故障并恢复，检查剔除、改发和重新接纳
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+
+from gptsovits_stub_server import start_stub_server
+from tts_factory import TTSFactory
+
+
+async def run_requests(backend, count: int, concurrency: int, during=None):
+    """以固定并发发送count个请求，返回 (成功数, 耗时)；during 为与请求同时运行的协程"""
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(i):
+        async with semaphore:
+            try:
+                audio = await backend.synthesize(f"第{i}句测试文本。", 'narrator')
+            except Exception:
+                audio = b''
+            results.append(bool(audio))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)), *([during] if during else []))
+    elapsed = time.perf_counter() - start
+
+    await backend.close()
+    return sum(results), elapsed
+
+
+def create_pool(api_urls, args):
+    """创建服务池（或单个节点）"""
+    return TTSFactory.create_backend('gptsovits', api_urls=api_urls, max_concurrency=args.node_capacity,
+                                     health_interval=0.5, eject_seconds=1.0)
+
+
+async def outage(server, after: float, duration: float):
+    """after 秒后让节点故障，duration 秒后恢复"""
+    await asyncio.sleep(after)
+    server.state.healthy = False
+    await asyncio.sleep(duration)
+    server.state.healthy = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GPT-SoVITS服务池性能测试')
+    parser.add_argument('--nodes', type=int, default=4, help='最多使用的节点数（默认: 4）')
+    parser.add_argument('--requests', type=int, default=200, help='每轮请求数（默认: 200）')
+    parser.add_argument('--concurrency', type=int, default=32, help='客户端并发数（默认: 32）')
+    parser.add_argument('--node-capacity', type=int, default=2,
+                        help='每个节点的并发容量（默认: 2，模拟CPU推理）')
+    parser.add_argument('--latency', type=float, default=0.1, help='模拟服务的延迟，单位秒（默认: 0.1）')
+
+    args = parser.parse_args()
+
+    servers = [start_stub_server(latency=args.latency, capacity=args.node_capacity) for _ in range(args.nodes)]
+    api_urls = [api_url for _, api_url in servers]
+
+    print(f"[INFO] {args.nodes} 个模拟节点, 每个并发容量 {args.node_capacity}, 延迟 {args.latency:g}s; "
+          f"客户端并发 {args.concurrency}\n")
+    print(f"{'节点数':<8} {'成功':>6} {'耗时':>8} {'吞吐':>12} {'加速比':>8}")
+
+    baseline = None
+    for count in range(1, args.nodes + 1):
+        backend = create_pool(api_urls[:count], args)
+        ok, elapsed = asyncio.run(run_requests(backend, args.requests, args.concurrency))
+        throughput = ok / elapsed
+        baseline = baseline or throughput
+        print(f"{count:<8} {ok:>6} {elapsed:>7.2f}s {throughput:>8.1f}请求/秒 {throughput / baseline:>7.2f}x")
+
+    # 故障和恢复: 运行中第一个节点故障，之后恢复
+    print(f"\n[INFO] 故障测试: {args.nodes} 个节点, 第1个节点在0.3秒后故障、1.5秒后恢复")
+    backend = create_pool(api_urls, args)
+    requests = args.requests * 4
+    ok, elapsed = asyncio.run(run_requests(backend, requests, args.concurrency,
+                                           outage(servers[0][0], 0.3, 1.5)))
+    print(f"[INFO] 成功 {ok}/{requests}, 耗时 {elapsed:.2f}s")
+    if hasattr(backend, 'print_stats'):
+        backend.print_stats()
+
+    for server, _ in servers:
+        server.shutdown()
+
+    return 0 if ok == requests else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对冲请求性能测试
+比较混合后端开启和关闭对冲时特殊声音请求的延迟分布：
+1. 长尾：特殊后端延迟为对数正态分布，超过p95的请求向备用后端发出对冲请求
+2. 卡住：特殊后端为模拟的GPT-SoVITS服务，运行中一段时间不再响应（直到请求超时）
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+
+from gptsovits_stub_server import start_stub_server
+from tts_factory import TTSFactory, HybridTTSBackend
+
+
+async def run_requests(backend, count: int, concurrency: int, during=None):
+    """以固定并发发送count个特殊声音的请求，返回 (成功数, [每个请求的耗时])"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    ok = 0
+
+    async def one(i):
+        nonlocal ok
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                audio = await backend.synthesize(f"第{i}句测试文本。", 'child_male')
+            except Exception:
+                audio = b''
+            latencies.append(time.perf_counter() - start)
+            ok += bool(audio)
+
+    await asyncio.gather(*(one(i) for i in range(count)), *([during] if during else []))
+    return ok, latencies
+
+
+def quantile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(label: str, ok: int, count: int, latencies, backend: HybridTTSBackend):
+    print(f"{label:<10} {ok:>5}/{count:<5} {quantile(latencies, 0.5):>7.2f}s {quantile(latencies, 0.95):>7.2f}s "
+          f"{quantile(latencies, 0.99):>7.2f}s {max(latencies):>7.2f}s "
+          f"{backend.hedges:>6} {backend.hedge_wins:>6} {backend.failovers:>6}")
+
+
+def header():
+    print(f"{'对冲':<10} {'成功':>11} {'p50':>8} {'p95':>8} {'p99':>8} {'最大':>8} "
+          f"{'对冲数':>6} {'备用先返回':>6} {'切换':>6}")
+
+
+async def tail_scenario(hedge: bool, args):
+    """特殊后端延迟长尾，备用后端延迟稳定"""
+    primary = TTSFactory.create_backend('synthetic', latency=args.latency, jitter=args.jitter, seed=1)
+    fallback = TTSFactory.create_backend('synthetic', latency=args.latency, jitter=0.2, seed=2)
+    backend = HybridTTSBackend(fallback, {'gptsovits': primary}, hedge=hedge)
+    ok, latencies = await run_requests(backend, args.requests, args.concurrency)
+    await backend.close()
+    return backend, ok, latencies
+
+
+async def stall(server, after: float, duration: float, latency: float):
+    """after 秒后让服务卡住（每个请求都等待很久），duration 秒后恢复"""
+    await asyncio.sleep(after)
+    normal = server.state.latency
+    server.state.latency = latency
+    await asyncio.sleep(duration)
+    server.state.latency = normal
+
+
+async def stall_scenario(hedge: bool, server, api_url: str, args):
+    """特殊后端为模拟GPT-SoVITS服务，运行中卡住一段时间"""
+    primary = TTSFactory.create_backend('gptsovits', api_url=api_url, max_concurrency=args.concurrency,
+                                        timeout=args.timeout)
+    fallback = TTSFactory.create_backend('synthetic', latency=args.latency, jitter=0.2, seed=2)
+    backend = HybridTTSBackend(fallback, {'gptsovits': primary}, hedge=hedge)
+    ok, latencies = await run_requests(backend, args.requests, args.concurrency,
+                                       stall(server, 1.0, args.stall, args.timeout * 3))
+    await backend.close()
+    return backend, ok, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对冲请求性能测试')
+    parser.add_argument('--requests', type=int, default=400, help='每轮请求数（默认: 400）')
+    parser.add_argument('--concurrency', type=int, default=8, help='客户端并发数（默认: 8）')
+    parser.add_argument('--latency', type=float, default=0.1, help='延迟中位数，单位秒（默认: 0.1）')
+    parser.add_argument('--jitter', type=float, default=1.0, help='特殊后端延迟的对数正态sigma（默认: 1.0）')
+    parser.add_argument('--stall', type=float, default=3.0, help='模拟服务卡住的时长，单位秒（默认: 3）')
+    parser.add_argument('--timeout', type=float, default=10.0, help='GPT-SoVITS请求超时，单位秒（默认: 10）')
+
+    args = parser.parse_args()
+
+    print(f"[INFO] 长尾: 特殊后端延迟中位数 {args.latency:g}s, sigma {args.jitter:g}; "
+          f"{args.requests} 个请求, 并发 {args.concurrency}\n")
+    header()
+    results = {}
+    for hedge in (False, True):
+        backend, ok, latencies = asyncio.run(tail_scenario(hedge, args))
+        report('开' if hedge else '关', ok, args.requests, latencies, backend)
+        results[('tail', hedge)] = (ok, latencies)
+
+    server, api_url = start_stub_server(latency=args.latency)
+    print(f"\n[INFO] 卡住: 模拟GPT-SoVITS服务在1秒后卡住 {args.stall:g} 秒, 请求超时 {args.timeout:g}s\n")
+    header()
+    for hedge in (False, True):
+        backend, ok, latencies = asyncio.run(stall_scenario(hedge, server, api_url, args))
+        report('开' if hedge else '关', ok, args.requests, latencies, backend)
+        results[('stall', hedge)] = (ok, latencies)
+    server.shutdown()
+
+    ok, latencies = results[('stall', True)]
+    return 0 if ok == args.requests else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
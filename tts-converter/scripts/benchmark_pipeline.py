@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端合成流水线性能测试
+用离线的 synthetic 后端（不访问网络，生成确定的MP3）分别运行 smart_tts、drama_to_audio_v2、
+generate_audio_from_script 的完整流程（解析、声音分配、合成、合并），
+每次运行在独立进程中进行，测量吞吐（片段/秒、音频秒数/秒）、峰值内存（RSS）和合并耗时；
+--json 输出结果，便于与上次的结果比较、发现性能回退
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from benchmark_dialogue_attribution import make_novel, LINES, NARRATION
+
+
+# drama_to_audio_v2 脚本的角色列表
+CAST = [
+    ('旁白', '全知视角，负责交代背景、环境渲染及转场衔接。'),
+    ('和也', '男主角，十七岁的高中生，内心充满槽点。'),
+    ('艾米', 'AI管家，少女的声音，说话急切。'),
+    ('星空', '女主角，十六岁，冷静的少女。'),
+    ('佐藤', '和也的父亲，五十岁，沉稳。'),
+]
+
+PIPELINES = ('smart_tts', 'drama_to_audio_v2', 'generate_audio_from_script')
+
+
+def make_lines(count: int, rng: random.Random):
+    """生成 count 个 (角色, 台词) 片段，约三分之一为旁白"""
+    speakers = [name for name, _ in CAST[1:]]
+    lines = []
+    for _ in range(count):
+        if rng.random() < 0.35:
+            lines.append(('旁白', ''.join(rng.choice(NARRATION) for _ in range(rng.randint(1, 4)))))
+        else:
+            lines.append((rng.choice(speakers), rng.choice(LINES) + rng.choice('。！？')))
+    return lines
+
+
+def make_drama_script(lines) -> str:
+    """drama_to_audio_v2 格式的脚本（角色列表 + 【角色】台词）"""
+    header = ['### **角色列表**'] + [f"【{name}】{description}" for name, description in CAST]
+    body = [f"【{speaker}】{text}" for speaker, text in lines]
+    return '\n'.join(header) + '\n\n---\n\n' + '\n\n'.join(body) + '\n'
+
+
+def make_markdown_script(lines) -> str:
+    """generate_audio_from_script 的Markdown文稿格式"""
+    blocks = [f"### [{i}] 第{i}行 - **{speaker}**\n**对话**：{text}\n"
+              for i, (speaker, text) in enumerate(lines, 1)]
+    return '# 广播剧文稿\n\n' + '\n'.join(blocks)
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值RSS（MB），不支持时返回0"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def audio_seconds(path) -> float:
+    """MP3文件的时长（秒）"""
+    from audio_assembler import iter_frames
+    data = Path(path).read_bytes()
+    return sum(header['samples'] / header['sample_rate'] for _, header in iter_frames(data))
+
+
+async def run_smart_tts(work_dir: Path, size: int, backend, rng, timings, args):
+    """smart_tts: 小说 → 角色分析 → 合成 → 合并"""
+    import smart_tts
+
+    text = make_novel(size, rng)
+    output = work_dir / 'smart_tts.mp3'
+
+    merge = smart_tts.merge_audio_files
+
+    async def timed_merge(audio_files, output_file):
+        start = time.perf_counter()
+        try:
+            return await merge(audio_files, output_file)
+        finally:
+            timings['merge'] = time.perf_counter() - start
+
+    smart_tts.merge_audio_files = timed_merge
+    characters, _ = smart_tts.analyze_and_assign_voices(text)
+    success = await smart_tts.generate_multi_voice_audio(text, str(output), characters, backend, args.chunk_chars)
+    return success, output
+
+
+async def run_drama_to_audio_v2(work_dir: Path, size: int, backend, rng, timings, args):
+    """drama_to_audio_v2: 脚本 → 角色识别、声音匹配 → 并发合成 → 合并"""
+    from drama_to_audio_v2 import SmartDramaToAudio
+
+    class TimedGenerator(SmartDramaToAudio):
+        async def _merge_audio(self, clips, output_file):
+            start = time.perf_counter()
+            try:
+                return await super()._merge_audio(clips, output_file)
+            finally:
+                timings['merge'] = time.perf_counter() - start
+
+    script = work_dir / 'drama.md'
+    script.write_text(make_drama_script(make_lines(size, rng)), encoding='utf-8')
+    output = work_dir / 'drama_to_audio_v2.mp3'
+
+    generator = TimedGenerator(concurrency=args.concurrency, backend=backend, incremental=False,
+                               chunk_chars=args.chunk_chars)
+    success = await generator.generate(str(script), str(output))
+    return success, output
+
+
+async def run_generate_audio_from_script(work_dir: Path, size: int, backend, rng, timings, args):
+    """generate_audio_from_script: Markdown文稿 → 逐段合成到片段包 → 顺序读取合并"""
+    import generate_audio_from_script as gafs
+    from clip_pack import scratch_pack
+
+    script = work_dir / 'script.md'
+    script.write_text(make_markdown_script(make_lines(size, rng)), encoding='utf-8')
+    output = work_dir / 'generate_audio_from_script.mp3'
+
+    segments = gafs.parse_markdown_script(str(script))
+    pack = scratch_pack(output)
+    await gafs.generate_audio_segments(segments, pack, backend)
+
+    start = time.perf_counter()
+    success = gafs.merge_pack(pack, output)
+    timings['merge'] = time.perf_counter() - start
+    pack.remove()
+    return success, output
+
+
+RUNNERS = {
+    'smart_tts': run_smart_tts,
+    'drama_to_audio_v2': run_drama_to_audio_v2,
+    'generate_audio_from_script': run_generate_audio_from_script,
+}
+
+
+def run_pipeline(pipeline: str, size: int, args) -> dict:
+    """在子进程中运行一次流水线，返回测量结果"""
+    from tts_factory import TTSFactory
+
+    rng = random.Random(args.seed)
+    backend = TTSFactory.create_backend('synthetic', latency=args.latency, jitter=args.jitter,
+                                        error_rate=args.error_rate, seed=args.seed)
+    timings = {}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        start = time.perf_counter()
+        # 流水线的逐段日志不输出
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                contextlib.redirect_stderr(devnull):
+            success, output = asyncio.run(RUNNERS[pipeline](Path(work_dir), size, backend, rng, timings, args))
+        elapsed = time.perf_counter() - start
+        duration = audio_seconds(output) if output.exists() else 0.0
+
+    return {
+        'pipeline': pipeline,
+        'size': size,
+        'success': bool(success),
+        'requests': backend.requests,
+        'failures': backend.failures,
+        'elapsed': elapsed,
+        'segments_per_second': size / elapsed,
+        'audio_seconds': duration,
+        'realtime_factor': duration / elapsed,
+        'merge': timings.get('merge', 0.0),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='端到端合成流水线性能测试（离线synthetic后端）')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 1000],
+                        help='每次运行的对话/片段数量（默认: 200 1000）')
+    parser.add_argument('--pipelines', nargs='+', choices=PIPELINES, default=list(PIPELINES),
+                        help='要测试的流水线（默认: 全部）')
+    parser.add_argument('--latency', type=float, default=0.002,
+                        help='synthetic 后端每个请求的延迟中位数，单位秒（默认: 0.002）')
+    parser.add_argument('--jitter', type=float, default=0.5,
+                        help='延迟的对数正态分布参数sigma（默认: 0.5）')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='synthetic 后端的请求失败概率（默认: 0）')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='drama_to_audio_v2 的合成并发数（默认: 4）')
+    parser.add_argument('--chunk-chars', type=int, default=300,
+                        help='长片段的分块长度，0表示不切分（默认: 300）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子（默认: 42）')
+    parser.add_argument('--json', default=None, help='把结果写入JSON文件')
+
+    args = parser.parse_args()
+
+    print(f"{'流水线':<28} {'规模':>6} {'请求':>6} {'耗时':>8} {'片段/秒':>9} {'实时倍数':>8} "
+          f"{'合并':>8} {'峰值RSS':>9}")
+
+    results = []
+    # 每次运行使用新进程，峰值RSS互不影响
+    context = multiprocessing.get_context('spawn')
+    for size in args.sizes:
+        for pipeline in args.pipelines:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_pipeline, pipeline, size, args).result()
+            results.append(result)
+
+            status = '' if result['success'] else '  [失败]'
+            print(f"{pipeline:<28} {size:>6} {result['requests']:>6} {result['elapsed']:>7.2f}s "
+                  f"{result['segments_per_second']:>9.0f} {result['realtime_factor']:>7.0f}x "
+                  f"{result['merge']:>7.3f}s {result['peak_rss_mb']:>7.1f}MB{status}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n[INFO] 结果已保存: {args.json}")
+
+    return 0 if all(result['success'] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应限流性能测试
+启动按速率和并发限流的GPT-SoVITS模拟服务，分别用固定并发和自适应限流（令牌桶 + AIMD）发送请求，
+比较吞吐、被限流的请求数和失败数，以及限流器收敛到的速率
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+
+from gptsovits_stub_server import start_stub_server
+from tts_factory import TTSFactory, RateLimitedTTSBackend, _rate_limiters
+
+
+async def run_requests(backend, count: int, concurrency: int):
+    """以固定并发发送count个请求，返回 (成功数, 失败数, 耗时)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(i):
+        async with semaphore:
+            try:
+                audio = await backend.synthesize(f"第{i}句测试文本。", 'narrator')
+            except Exception:
+                audio = b''
+            results.append(bool(audio))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    elapsed = time.perf_counter() - start
+
+    await backend.close()
+    return sum(results), len(results) - sum(results), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='自适应限流性能测试')
+    parser.add_argument('--requests', type=int, default=300, help='请求数（默认: 300）')
+    parser.add_argument('--concurrency', type=int, default=32, help='客户端并发数（默认: 32）')
+    parser.add_argument('--server-rate', type=float, default=20.0,
+                        help='模拟服务每秒最多接受的请求数（默认: 20）')
+    parser.add_argument('--server-capacity', type=int, default=8,
+                        help='模拟服务的最大并发（默认: 8）')
+    parser.add_argument('--latency', type=float, default=0.1, help='模拟服务的延迟，单位秒（默认: 0.1）')
+
+    args = parser.parse_args()
+
+    print(f"[INFO] 模拟服务: {args.server_rate:g} 请求/秒, 最大并发 {args.server_capacity}, "
+          f"延迟 {args.latency:g}s; 客户端并发 {args.concurrency}\n")
+    print(f"{'模式':<10} {'成功':>6} {'失败':>6} {'429次数':>8} {'耗时':>8} {'吞吐':>12}")
+
+    for mode in ('fixed', 'adaptive'):
+        server, api_url = start_stub_server(latency=args.latency, capacity=args.server_capacity,
+                                            rate_limit=args.server_rate)
+        _rate_limiters.clear()
+        # 放开默认的速率和窗口上限，由限流器自己找到服务的容量
+        rate_limit = {'max_rate': 1000.0, 'max_concurrency': float(args.concurrency)} if mode == 'adaptive' else None
+        backend = TTSFactory.create_backend('gptsovits', api_url=api_url, max_concurrency=args.concurrency,
+                                            pool_size=args.concurrency, rate_limit=rate_limit)
+
+        ok, failed, elapsed = asyncio.run(run_requests(backend, args.requests, args.concurrency))
+        throttled = server.state.to_dict()['throttled']
+        server.shutdown()
+
+        print(f"{mode:<10} {ok:>6} {failed:>6} {throttled:>8} {elapsed:>7.2f}s {ok / elapsed:>8.1f}请求/秒")
+
+        if isinstance(backend, RateLimitedTTSBackend):
+            stats = backend.limiter.snapshot()
+            print(f"\n[INFO] 限流器收敛到 {stats['rate']:.1f} 请求/秒, 并发窗口 {stats['concurrency']:.1f}, "
+                  f"降速 {stats['decreases']} 次, 重试 {backend.retries} 次")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
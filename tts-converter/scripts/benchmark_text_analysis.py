@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本分析性能测试
+生成指定大小的合成长篇小说，测量 smart_tts 角色分析、性别推断和按说话人分割的耗时，
+检查耗时是否随文本长度线性增长
+"""
+
+import sys
+import time
+import random
+import argparse
+
+from smart_tts import analyze_characters, split_text_by_speaker, Character
+from gender_index import GenderIndex
+
+
+SURNAMES = '赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨朱秦尤许何吕施张孔曹严华金魏陶姜'
+GIVEN_CHARS = '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰萍红'
+VERBS = ['说', '道', '问', '喊', '笑道', '回答', '解释', '补充', '嘟囔', '平静地说']
+NARRATION = [
+    '天色渐渐暗了下来，远处传来几声犬吠。',
+    '风吹过走廊，窗帘轻轻晃动。',
+    '他们沉默了很久，谁也没有再开口。',
+    '街角的路灯一盏接一盏地亮了起来。',
+    '她低头看着手里的信，久久没有说话。',
+]
+PRONOUNS = ['他', '她']
+LINES = ['你来了', '我们走吧', '这件事没那么简单', '等一下', '你到底想说什么', '明天见', '好的']
+
+
+def make_names(count: int, rng: random.Random):
+    """生成不重复的角色名"""
+    names = set()
+    while len(names) < count:
+        names.add(rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_CHARS) for _ in range(rng.randint(1, 2))))
+    return sorted(names)
+
+
+def make_novel(size_bytes: int, names, rng: random.Random) -> str:
+    """
+    生成合成小说
+
+    混合旁白、带说话人的对话、无说话人的对话（需要从上文推断）和对话后的动作描写
+
+    Args:
+        size_bytes: 目标大小（UTF-8字节数）
+        names: 角色名列表
+        rng: 随机数生成器
+
+    Returns:
+        小说文本
+    """
+    lines = []
+    size = 0
+    while size < size_bytes:
+        r = rng.random()
+        name = rng.choice(names)
+        quote = rng.choice(LINES)
+        if r < 0.35:
+            line = f"{name}{rng.choice(VERBS)}：「{quote}」{rng.choice(PRONOUNS)}说完看了看四周。"
+        elif r < 0.5:
+            line = f"「{quote}」"
+        elif r < 0.6:
+            line = f"「{quote}」{name}{rng.choice(VERBS)}，转身走了。"
+        elif r < 0.65:
+            line = ''
+        else:
+            line = rng.choice(NARRATION)
+        lines.append(line)
+        size += len(line.encode('utf-8')) + 1
+    return '\n'.join(lines)
+
+
+def measure(func, *args):
+    """执行一次并返回 (结果, 耗时秒)"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='smart_tts 文本分析性能测试')
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 2, 5],
+                        help='合成小说大小，单位MB（默认: 1 2 5）')
+    parser.add_argument('--characters', type=int, default=300,
+                        help='角色数量（默认: 300）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子（默认: 42）')
+
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = make_names(args.characters, rng)
+
+    print(f"[INFO] 角色数量: {len(names)}")
+    print(f"{'大小':>8} {'行数':>9} {'分析角色':>10} {'性别推断':>10} {'分割文本':>10} {'片段数':>9} {'吞吐':>12}")
+
+    per_mb = []
+    for size_mb in args.sizes:
+        text = make_novel(int(size_mb * 1024 * 1024), names, rng)
+        line_count = text.count('\n') + 1
+
+        (characters, _), analyze_time = measure(analyze_characters, text)
+        _, gender_time = measure(GenderIndex, text, list(characters))
+        characters['我（旁白）'] = Character('我（旁白）')
+        segments, split_time = measure(split_text_by_speaker, text, characters)
+
+        total = analyze_time + gender_time + split_time
+        per_mb.append(total / size_mb)
+        print(f"{size_mb:>6.1f}MB {line_count:>9} {analyze_time:>9.2f}s {gender_time:>9.2f}s {split_time:>9.2f}s "
+              f"{len(segments):>9} {size_mb / total:>9.2f}MB/s")
+
+    # 线性扫描时每MB耗时应基本不变
+    if len(per_mb) > 1:
+        ratio = max(per_mb) / min(per_mb)
+        print(f"\n[INFO] 每MB耗时最大/最小比: {ratio:.2f}（接近1表示耗时随长度线性增长）")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
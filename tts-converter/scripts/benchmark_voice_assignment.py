@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+声音分配性能测试
+生成不同规模的合成角色表，测量 VoiceMatcher 全局最优分配的耗时和分配质量
+"""
+
+import io
+import sys
+import time
+import contextlib
+import random
+import argparse
+from collections import Counter
+
+from voice_matcher import VoiceMatcher
+
+
+GENDERS = ['男', '女']
+AGES = ['小孩', '年轻', '成熟', '中年', '老人']
+PERSONALITIES = ['急躁', '沉稳', '活泼', '正常']
+
+
+def make_cast(size: int, rng: random.Random) -> dict:
+    """生成合成角色表（含旁白）"""
+    characters = {'旁白': {'name': '旁白', 'gender': '旁白', 'age': '成熟', 'personality': '正常'}}
+    for i in range(size - 1):
+        name = f"角色{i + 1:04d}"
+        characters[name] = {
+            'name': name,
+            'gender': rng.choice(GENDERS),
+            'age': rng.choices(AGES, weights=[1, 5, 3, 2, 1])[0],
+            'personality': rng.choice(PERSONALITIES),
+        }
+    return characters
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VoiceMatcher 声音分配性能测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 100, 300, 600],
+                        help='角色数量（默认: 10 50 100 300 600）')
+    parser.add_argument('--repeat', type=int, default=5, help='每个规模重复次数，取中位数（默认: 5）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子（默认: 42）')
+
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    print(f"{'角色数':>6} {'耗时':>10} {'不同组合':>8} {'不同声音':>8} {'最多共用':>8} {'保持推荐':>8}")
+
+    for size in args.sizes:
+        characters = make_cast(size, rng)
+
+        timings = []
+        for _ in range(args.repeat):
+            matcher = VoiceMatcher()
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                assignments = matcher.assign_voices(characters)
+                timings.append(time.perf_counter() - start)
+        elapsed = sorted(timings)[len(timings) // 2]
+
+        # 分配质量: 组合/声音的区分度，以及保持规则推荐声音的比例
+        variants = Counter((a['voice'], a['rate']) for a in assignments.values())
+        voices = {a['voice'] for a in assignments.values()}
+        matcher = VoiceMatcher()
+        kept = sum(1 for name, info in characters.items()
+                   if matcher._assign_voice_by_rules(info)[0] == assignments[name]['voice'])
+
+        print(f"{size:>6} {elapsed * 1000:>8.1f}ms {len(variants):>8} {len(voices):>8} "
+              f"{max(variants.values()):>8} {kept / size:>8.0%}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按章节并行渲染长篇小说
+在章节标题处切分输入，每章作为独立任务在进程池中渲染，各自输出一个音频文件，可选最后合并；
+章节状态记录在状态文件中，失败或中断后重新运行只渲染未完成的章节
+"""
+
+import re
+import json
+import hashlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from audio_assembler import MP3Assembler
+from tts_metrics import merge_prometheus_files
+
+
+# 章节标题: "第一章 xxx"、"## 第12回"、"Chapter 3" 等
+CHAPTER_HEADING_RE = re.compile(
+    r'^\s*(?:#{1,6}\s*)?(?:\*\*)?\s*(?:第[0-9０-９零〇一二三四五六七八九十百千万两]+[章回节卷集幕]|chapter\s+\d+)',
+    re.IGNORECASE
+)
+
+
+def split_chapters(text: str) -> List[Tuple[str, str]]:
+    """
+    在章节标题处切分文本
+
+    第一个标题之前的非空内容作为"开篇"章节；没有任何章节标题时整篇作为一章
+
+    Args:
+        text: 全文
+
+    Returns:
+        [(章节标题, 章节文本), ...]，章节文本包含标题行
+    """
+    chapters = []
+    title = '开篇'
+    current = []
+
+    for line in text.split('\n'):
+        if CHAPTER_HEADING_RE.match(line):
+            if '\n'.join(current).strip():
+                chapters.append((title, '\n'.join(current)))
+            title = line.strip().strip('#*').strip()
+            current = []
+        current.append(line)
+
+    if '\n'.join(current).strip():
+        chapters.append((title, '\n'.join(current)))
+
+    return chapters
+
+
+def file_digest(path: Optional[str]) -> Optional[str]:
+    """
+    文件内容的哈希（用于章节哈希，文件修改后相关章节重新渲染）
+
+    Returns:
+        SHA-256 十六进制摘要，未指定或文件不存在时返回None
+    """
+    if not path or not Path(path).exists():
+        return None
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class ChapterRenderer:
+    """章节并行渲染器"""
+
+    VERSION = 1
+
+    def __init__(self, output_file: str, render_func: Callable[[str, str, Dict], bool],
+                 options: Optional[Dict] = None, jobs: int = 2, source_suffix: str = '.txt',
+                 prometheus_file: Optional[str] = None, audio_options: Optional[Dict] = None):
+        """
+        初始化渲染器
+
+        章节文本、章节音频和状态文件保存在 <输出文件名>_chapters/ 目录
+
+        Args:
+            output_file: 最终输出的音频文件路径
+            render_func: 渲染单个章节的模块级函数 render_func(章节文件, 输出文件, options) -> 是否成功，
+                         在子进程中调用
+            options: 传给render_func的参数（需可序列化）
+            jobs: 同时渲染的章节数（进程数）
+            source_suffix: 章节文本文件的扩展名
+            prometheus_file: 合并后的Prometheus指标文件（子进程把各章指标导出到 chNNN.prom，
+                             本次渲染完成后由父进程相加写出一个文件）
+            audio_options: 影响音频内容的参数，参与章节哈希（默认为全部options）；
+                           并发数、缓存、限流等只影响渲染过程的参数不应放入，否则修改后会重新渲染已完成的章节，
+                           配置文件应放入其内容的哈希（见 file_digest）而不是路径
+        """
+        output_path = Path(output_file)
+        self.output_file = output_path
+        self.chapters_dir = output_path.parent / f"{output_path.stem}_chapters"
+        self.state_path = self.chapters_dir / 'chapters.json'
+        self.render_func = render_func
+        self.options = options or {}
+        self.audio_options = self.options if audio_options is None else audio_options
+        self.jobs = max(1, jobs)
+        self.source_suffix = source_suffix
+        self.prometheus_file = prometheus_file
+        self.state = {}  # {章节序号: 状态条目}
+
+    def _chapter_hash(self, source_text: str) -> str:
+        """章节哈希: 覆盖章节文本和影响音频内容的参数"""
+        raw = json.dumps([source_text, self.audio_options], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _load_state(self):
+        """读取上次运行的章节状态"""
+        self.state = {}
+        if not self.state_path.exists():
+            return
+
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] 章节状态读取失败，将重新渲染全部章节: {e}")
+            return
+
+        if data.get('version') == self.VERSION:
+            self.state = {entry['index']: entry for entry in data.get('chapters', [])}
+
+    def _save_state(self):
+        """写入章节状态（先写临时文件再替换，避免中断时损坏）"""
+        data = {
+            'version': self.VERSION,
+            'chapters': [self.state[i] for i in sorted(self.state)]
+        }
+        temp_path = self.state_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        temp_path.replace(self.state_path)
+
+    def render(self, chapters: List[Tuple[str, str]], header: str = '', join: bool = True) -> bool:
+        """
+        渲染所有章节
+
+        Args:
+            chapters: [(章节标题, 章节文本), ...]
+            header: 拼接在每章开头的公共内容（如广播剧的角色列表，保证各章声音分配一致）
+            join: 全部章节完成后是否合并为一个输出文件
+
+        Returns:
+            是否全部章节渲染成功（join时还包括合并成功）
+        """
+        self.chapters_dir.mkdir(parents=True, exist_ok=True)
+        self._load_state()
+
+        # 写出章节文本，找出需要渲染的章节
+        pending = []
+        for index, (title, body) in enumerate(chapters, 1):
+            source_text = f"{header}\n{body}" if header else body
+            source = self.chapters_dir / f"ch{index:03d}{self.source_suffix}"
+            output = self.chapters_dir / f"ch{index:03d}.mp3"
+            chapter_hash = self._chapter_hash(source_text)
+
+            previous = self.state.get(index)
+            if (previous and previous['hash'] == chapter_hash and previous['status'] == 'done'
+                    and output.exists()):
+                continue
+
+            source.write_text(source_text, encoding='utf-8')
+            self.state[index] = {
+                'index': index,
+                'title': title,
+                'hash': chapter_hash,
+                'source': str(source),
+                'output': str(output),
+                'status': 'pending',
+            }
+            pending.append(index)
+
+        # 删除多余的旧章节（章节数变少时）
+        for index in [i for i in self.state if i > len(chapters)]:
+            del self.state[index]
+        self._save_state()
+
+        print(f"\n[INFO] 共 {len(chapters)} 章, 已完成 {len(chapters) - len(pending)} 章, "
+              f"需要渲染 {len(pending)} 章, 进程数 {self.jobs}")
+
+        if pending:
+            self._render_pending(pending)
+            if self.prometheus_file:
+                # 只合并本次渲染的章节（与不分章节时一样，指标只覆盖本次运行）
+                merge_prometheus_files([self.metrics_path(i) for i in pending], self.prometheus_file)
+
+        failed = [self.state[i] for i in sorted(self.state) if self.state[i]['status'] != 'done']
+        if failed:
+            print(f"\n[WARN] {len(failed)} 章渲染失败，重新运行同一命令即可只渲染这些章节:")
+            for entry in failed:
+                print(f"  第{entry['index']}章 {entry['title']}: {entry.get('error', '未完成')}")
+            return False
+
+        print(f"\n[OK] 全部 {len(chapters)} 章已完成: {self.chapters_dir}")
+
+        if join:
+            return self._join(len(chapters))
+        return True
+
+    def metrics_path(self, index: int) -> Path:
+        """章节的Prometheus指标文件（与章节音频同名，扩展名为 .prom）"""
+        return Path(self.state[index]['output']).with_suffix('.prom')
+
+    def _render_pending(self, pending: List[int]):
+        """在进程池中渲染章节，每完成一章立即更新状态文件"""
+        # 删除上次运行留下的章节指标，失败的章节不会把旧指标计入合并结果
+        for index in pending:
+            self.metrics_path(index).unlink(missing_ok=True)
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            futures = {}
+            for index in pending:
+                entry = self.state[index]
+                futures[executor.submit(self.render_func, entry['source'], entry['output'], self.options)] = index
+
+            for future in as_completed(futures):
+                index = futures[future]
+                entry = self.state[index]
+                try:
+                    success = future.result()
+                    error = None if success else '渲染未成功'
+                except Exception as e:
+                    success = False
+                    error = repr(e)
+
+                entry['status'] = 'done' if success else 'failed'
+                if error:
+                    entry['error'] = error
+                    print(f"[ERROR] 第{index}章 {entry['title']} 渲染失败: {error}")
+                else:
+                    entry.pop('error', None)
+                    print(f"[OK] 第{index}章 {entry['title']} 完成")
+                self._save_state()
+
+    def _join(self, count: int) -> bool:
+        """按顺序合并各章音频"""
+        print(f"[INFO] 正在合并 {count} 章音频...")
+        try:
+            with MP3Assembler(self.output_file) as assembler:
+                for index in range(1, count + 1):
+                    assembler.add_file(self.state[index]['output'])
+        except Exception as e:
+            print(f"[ERROR] 合并失败: {e}")
+            return False
+
+        size_mb = self.output_file.stat().st_size / (1024 * 1024)
+        print(f"[OK] 音频已生成: {self.output_file}")
+        print(f"[INFO] 文件大小: {size_mb:.1f} MB, 时长 {assembler.duration / 60:.1f} 分钟")
+        return True
@@ -5,8 +5,151 @@
 从脚本中识别和解析角色特征（年龄、性别、性格）
 """
 
+import os
 import re
-from typing import Dict, List, Tuple
+import json
+from typing import Dict, List, Optional, Tuple
+
+
+# 角色列表可能的标题（支持markdown加粗格式）
+ROLE_LIST_RE = re.compile(
+    r'^#+\s*\*{0,2}\s*(?:角色列表|人物|角色设定|Cast|角色介绍)\s*\*{0,2}',
+    re.IGNORECASE
+)
+
+# 【角色名】描述
+ROLE_LINE_RE = re.compile(r'^【(.+?)】(.+)$')
+
+# 章节标题
+SECTION_RE = re.compile(r'^#+\s')
+
+# 具体数字年龄
+AGE_NUMBER_RE = re.compile(r'(\d+)岁')
+
+
+class TraitClassifier:
+    """
+    角色特征分类器
+
+    把各特征的关键词表编译成一个多关键词正则（按长度从长到短交替），扫描一遍描述即可得到所有特征；
+    同一特征命中多个取值时，取关键词表中排在前面的取值（与逐个检查关键词的结果一致）
+    """
+
+    def __init__(self, tables: Dict[str, Dict[str, List[str]]]):
+        """
+        编译关键词表
+
+        Args:
+            tables: {特征: {取值: [关键词, ...]}}，取值按优先级从高到低排列
+        """
+        self.labels = {trait: list(values) for trait, values in tables.items()}
+
+        # 同一关键词可能属于多个特征（如"国王"既表示男性也表示中年）
+        keyword_hits = {}
+        for trait, values in tables.items():
+            for rank, keywords in enumerate(values.values()):
+                for keyword in keywords:
+                    if keyword:
+                        keyword_hits.setdefault(keyword, set()).add((trait, rank))
+
+        # 每个位置只匹配最长的关键词，被它包含的较短关键词（如"中年人"中的"中年"）的特征一并计入
+        keywords = sorted(keyword_hits, key=len, reverse=True)
+        self.hits = {}
+        for keyword in keywords:
+            hits = set()
+            for other in keywords:
+                if len(other) <= len(keyword) and other in keyword:
+                    hits |= keyword_hits[other]
+            self.hits[keyword] = sorted(hits)
+
+        self.pattern = re.compile('|'.join(map(re.escape, keywords))) if keywords else None
+
+    def classify(self, text: str) -> Dict[str, str]:
+        """
+        一次扫描识别文本中的所有特征
+
+        Args:
+            text: 角色名或描述
+
+        Returns:
+            {特征: 取值}，只包含命中的特征
+        """
+        return self.classify_parts([text])[0]
+
+    def classify_parts(self, parts: List[str]) -> List[Dict[str, str]]:
+        """
+        一次扫描分别识别多段文本（如角色名和描述）的特征
+
+        Args:
+            parts: 文本列表（各段不含换行）
+
+        Returns:
+            与parts顺序一致的 [{特征: 取值}, ...]
+        """
+        best = [{} for _ in parts]
+        if self.pattern is not None and parts:
+            # 用换行连接各段，关键词不含换行，不会跨段匹配
+            text = '\n'.join(parts)
+            ends = []
+            position = -1
+            for part in parts:
+                position += len(part) + 1
+                ends.append(position)
+
+            # 从上一个匹配的下一个字符继续查找，不遗漏相互重叠的关键词
+            search = self.pattern.search
+            hits_table = self.hits
+            part = 0
+            match = search(text)
+            while match is not None:
+                start = match.start()
+                while start > ends[part]:
+                    part += 1
+                ranks = best[part]
+                for trait, rank in hits_table[match.group()]:
+                    if trait not in ranks or rank < ranks[trait]:
+                        ranks[trait] = rank
+                match = search(text, start + 1)
+
+        labels = self.labels
+        return [{trait: labels[trait][rank] for trait, rank in ranks.items()} for ranks in best]
+
+
+def load_lexicon(path: str) -> Dict[str, Dict[str, List[str]]]:
+    """
+    读取用户词库文件
+
+    文件为JSON格式，按特征和取值列出额外的关键词，例如:
+        {"gender": {"男": ["将军"], "女": ["女侠"]},
+         "age": {"老人": ["白发", "老者"]},
+         "personality": {"沉稳": ["淡定"]}}
+
+    Args:
+        path: 词库文件路径
+
+    Returns:
+        {特征: {取值: [关键词, ...]}}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if not isinstance(data, dict):
+        raise ValueError(f"词库格式错误，应为JSON对象: {path}")
+
+    lexicon = {}
+    for trait, values in data.items():
+        if trait not in CharacterParser.TRAITS:
+            print(f"[WARN] 词库中的未知特征已忽略: {trait}")
+            continue
+        if not isinstance(values, dict):
+            raise ValueError(f"词库格式错误，{trait} 应为 {{取值: [关键词, ...]}}: {path}")
+        lexicon[trait] = {label: [str(k).strip() for k in keywords if str(k).strip()]
+                          for label, keywords in values.items()}
+    return lexicon
+
+
+# 已编译的分类器 {(词库路径, 修改时间): TraitClassifier}，批量解析时只编译一次
+_classifier_cache = {}
 
 
 class CharacterParser:
@@ -32,9 +175,59 @@ class CharacterParser:
         '活泼': ['活泼', '开朗', '欢快', '愉快', '兴奋', '天真']
     }
 
-    def __init__(self):
-        """初始化解析器"""
-        pass
+    # 可由词库扩展的特征
+    TRAITS = ('gender', 'age', 'personality')
+
+    def __init__(self, lexicon_file: Optional[str] = None):
+        """
+        初始化解析器
+
+        Args:
+            lexicon_file: 用户词库文件（JSON），其中的关键词追加到内置关键词表之后；
+                          新的取值优先级低于内置取值
+        """
+        self.lexicon_file = lexicon_file
+        self.classifier = self._get_classifier(lexicon_file)
+
+    @classmethod
+    def build_tables(cls, lexicon: Optional[Dict[str, Dict[str, List[str]]]] = None) -> Dict:
+        """
+        合并内置关键词表和用户词库
+
+        Args:
+            lexicon: load_lexicon 返回的用户词库
+
+        Returns:
+            {特征: {取值: [关键词, ...]}}，另含只用于识别旁白的 narrator 特征
+        """
+        tables = {
+            'narrator': {'旁白': ['旁白']},
+            # 男性关键词优先于女性关键词
+            'gender': {'男': list(cls.MALE_KEYWORDS), '女': list(cls.FEMALE_KEYWORDS)},
+            'age': {label: list(keywords) for label, keywords in cls.AGE_KEYWORDS.items()},
+            'personality': {label: list(keywords) for label, keywords in cls.PERSONALITY_KEYWORDS.items()},
+        }
+
+        for trait, values in (lexicon or {}).items():
+            for label, keywords in values.items():
+                tables[trait].setdefault(label, []).extend(keywords)
+
+        return tables
+
+    @classmethod
+    def _get_classifier(cls, lexicon_file: Optional[str]) -> TraitClassifier:
+        """获取（必要时编译）特征分类器，词库文件修改后重新编译"""
+        if lexicon_file:
+            key = (os.path.abspath(lexicon_file), os.path.getmtime(lexicon_file))
+        else:
+            key = (None, None)
+
+        classifier = _classifier_cache.get(key)
+        if classifier is None:
+            lexicon = load_lexicon(lexicon_file) if lexicon_file else None
+            classifier = TraitClassifier(cls.build_tables(lexicon))
+            _classifier_cache[key] = classifier
+        return classifier
 
     def parse_script(self, script_text: str) -> Dict:
         """
@@ -85,25 +278,10 @@ class CharacterParser:
         role_start = -1
         role_end = -1
 
-        # 角色列表可能的标题（支持markdown加粗格式）
-        role_list_patterns = [
-            r'^#+\s*\*{0,2}\s*角色列表\s*\*{0,2}',
-            r'^#+\s*\*{0,2}\s*人物\s*\*{0,2}',
-            r'^#+\s*\*{0,2}\s*角色设定\s*\*{0,2}',
-            r'^#+\s*\*{0,2}\s*Cast\s*\*{0,2}',
-            r'^#+\s*\*{0,2}\s*角色介绍\s*\*{0,2}'
-        ]
-
         # 查找角色列表标题
         for i, line in enumerate(lines):
-            line = line.strip()
-
-            for pattern in role_list_patterns:
-                if re.match(pattern, line, re.IGNORECASE):
-                    role_start = i
-                    break
-
-            if role_start != -1:
+            if ROLE_LIST_RE.match(line.strip()):
+                role_start = i
                 break
 
         if role_start == -1:
@@ -123,12 +301,12 @@ class CharacterParser:
                 continue
 
             # 如果已经找到过空行，现在遇到对话，说明角色列表结束
-            if found_gap and re.match(r'^【.+?】.+$', line):
+            if found_gap and ROLE_LINE_RE.match(line):
                 role_end = i - 1
                 break
 
             # 如果遇到新的章节标题，角色列表结束
-            if re.match(r'^#+\s', line) and '角色' not in line:
+            if SECTION_RE.match(line) and '角色' not in line:
                 role_end = i - 1
                 break
 
@@ -148,45 +326,55 @@ class CharacterParser:
         Returns:
             角色信息字典 {角色名: {gender, age, personality, description}}
         """
-        characters = {}
+        roles = []
 
         for line in role_lines:
             line = line.strip()
 
             # 匹配【角色名】描述格式
-            match = re.match(r'^【(.+?)】(.+)$', line)
+            match = ROLE_LINE_RE.match(line)
             if not match:
                 continue
 
-            name = match.group(1).strip()
-            description = match.group(2).strip()
+            roles.append((match.group(1).strip(), match.group(2).strip()))
 
-            # 解析角色特征
-            char_info = self._parse_character_info(name, description)
+        # 整个角色列表的角色名和描述一起扫描一遍
+        parts = [text for role in roles for text in role]
+        traits = self.classifier.classify_parts(parts)
 
-            characters[name] = char_info
+        characters = {}
+        for i, (name, description) in enumerate(roles):
+            # 解析角色特征
+            characters[name] = self._parse_character_info(name, description, traits[2 * i], traits[2 * i + 1])
 
         return characters
 
-    def _parse_character_info(self, name: str, description: str) -> Dict:
+    def _parse_character_info(self, name: str, description: str, name_traits: Optional[Dict[str, str]] = None,
+                              traits: Optional[Dict[str, str]] = None) -> Dict:
         """
         解析单个角色的特征
 
         Args:
             name: 角色名
             description: 角色描述
+            name_traits: 角色名的分类结果（已扫描过时传入）
+            traits: 描述的分类结果（已扫描过时传入）
 
         Returns:
             {gender, age, personality, description}
         """
+        # 角色名和描述一起扫描一遍，同时得到性别、年龄、性格关键词
+        if name_traits is None or traits is None:
+            name_traits, traits = self.classifier.classify_parts([name, description])
+
         # 解析性别
-        gender = self._identify_gender(name, description)
+        gender = self._identify_gender(name, description, traits, name_traits)
 
         # 解析年龄
-        age = self._identify_age(description)
+        age = self._identify_age(description, traits)
 
         # 解析性格
-        personality = self._identify_personality(description)
+        personality = self._identify_personality(description, traits)
 
         return {
             'name': name,
@@ -196,58 +384,49 @@ class CharacterParser:
             'description': description
         }
 
-    def _identify_gender(self, name: str, description: str) -> str:
+    def _identify_gender(self, name: str, description: str, traits: Optional[Dict[str, str]] = None,
+                         name_traits: Optional[Dict[str, str]] = None) -> str:
         """
         识别角色性别
 
         Args:
             name: 角色名
             description: 角色描述
+            traits: 描述的分类结果（已扫描过时传入，避免重复扫描）
+            name_traits: 角色名的分类结果
 
         Returns:
             '男', '女', 或 '旁白'
         """
+        if traits is None or name_traits is None:
+            name_traits, traits = self.classifier.classify_parts([name, description])
+
         # 特殊角色：旁白
-        if '旁白' in name or '旁白' in description:
+        if 'narrator' in name_traits or 'narrator' in traits:
             return '旁白'
 
-        # 先检查角色名中的关键词（优先级更高）
-        # 检查男性关键词
-        for keyword in self.MALE_KEYWORDS:
-            if keyword in name:
-                return '男'
-
-        # 检查女性关键词
-        for keyword in self.FEMALE_KEYWORDS:
-            if keyword in name:
-                return '女'
-
-        # 再检查描述中的关键词
-        # 检查男性关键词
-        for keyword in self.MALE_KEYWORDS:
-            if keyword in description:
-                return '男'
-
-        # 检查女性关键词
-        for keyword in self.FEMALE_KEYWORDS:
-            if keyword in description:
-                return '女'
+        # 先检查角色名中的关键词（优先级更高），再检查描述；男性关键词优先
+        if 'gender' in name_traits:
+            return name_traits['gender']
+        if 'gender' in traits:
+            return traits['gender']
 
         # 默认：女
         return '女'
 
-    def _identify_age(self, description: str) -> str:
+    def _identify_age(self, description: str, traits: Optional[Dict[str, str]] = None) -> str:
         """
         识别角色年龄
 
         Args:
             description: 角色描述
+            traits: 描述的分类结果（已扫描过时传入，避免重复扫描）
 
         Returns:
-            '年轻', '成熟', 或 '中年'
+            '年轻', '成熟', '中年', 或词库中定义的年龄
         """
         # 检查具体数字年龄
-        age_match = re.search(r'(\d+)岁', description)
+        age_match = AGE_NUMBER_RE.search(description)
         if age_match:
             age = int(age_match.group(1))
             if age <= 25:
@@ -258,31 +437,28 @@ class CharacterParser:
                 return '中年'
 
         # 检查关键词
-        for age_type, keywords in self.AGE_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in description:
-                    return age_type
+        if traits is None:
+            traits = self.classifier.classify(description)
 
         # 默认：年轻
-        return '年轻'
+        return traits.get('age', '年轻')
 
-    def _identify_personality(self, description: str) -> str:
+    def _identify_personality(self, description: str, traits: Optional[Dict[str, str]] = None) -> str:
         """
         识别角色性格
 
         Args:
             description: 角色描述
+            traits: 描述的分类结果（已扫描过时传入，避免重复扫描）
 
         Returns:
-            '急躁', '沉稳', '活泼', 或 '正常'
+            '急躁', '沉稳', '活泼', '正常', 或词库中定义的性格
         """
-        for personality, keywords in self.PERSONALITY_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in description:
-                    return personality
+        if traits is None:
+            traits = self.classifier.classify(description)
 
         # 默认：正常
-        return '正常'
+        return traits.get('personality', '正常')
 
 
 # 测试代码
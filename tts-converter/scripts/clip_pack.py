@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+片段包
+把大量合成片段追加写入同一个数据文件，另用一个偏移索引文件记录 键 → (偏移, 长度)；
+读取时内存映射数据文件，返回的片段是映射上的 memoryview（零拷贝）。
+替代每个片段一个文件的临时目录和缓存目录：不再产生成千上万个小文件，
+按写入顺序合并时只需顺序读一遍数据文件
+
+写入只追加（O_APPEND，每条数据、每条索引各一次写入），多个进程可以同时向同一个包追加；
+删除只追加删除标记，无效数据由 compact() 重写回收。创建和整理时持有锁文件，
+其他进程发现文件被替换后在锁内重新打开，不会读到新旧混合的索引
+"""
+
+import contextlib
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+
+# 索引文件头（格式变化时修改版本号，旧索引作废）
+_INDEX_MAGIC = b'CLIPIDX1'
+
+# 索引记录: 偏移、长度、键长度，后接UTF-8键
+_RECORD = struct.Struct('<QQH')
+
+# 删除标记的偏移
+_DELETED = 0xFFFFFFFFFFFFFFFF
+
+_BINARY = getattr(os, 'O_BINARY', 0)
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path):
+    """进程间互斥锁（POSIX用flock，Windows用msvcrt.locking）"""
+    fd = os.open(path, os.O_CREAT | os.O_RDWR | _BINARY, 0o644)
+    try:
+        try:
+            import fcntl
+        except ImportError:
+            import msvcrt
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+class ClipPack:
+    """只追加的片段包"""
+
+    def __init__(self, path: Union[str, Path], truncate: bool = False):
+        """
+        打开（或创建）片段包
+
+        数据保存在 path，索引保存在 path + '.idx'
+
+        Args:
+            path: 数据文件路径
+            truncate: 清空已有的片段（用作一次运行的临时片段包时）
+        """
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + '.idx')
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._entries = OrderedDict()  # {键: (偏移, 长度)}，按最后一次写入或访问的顺序排列
+        self.live_bytes = 0
+        self.index_records = 0  # 索引文件中的记录数（包括被覆盖的、删除标记和访问记录）
+        if truncate:
+            self.index_path.unlink(missing_ok=True)
+        self._open()
+
+    def _open(self):
+        """打开数据和索引文件，读取全部索引"""
+        flags = os.O_CREAT | os.O_APPEND | os.O_RDWR | _BINARY
+        with _file_lock(self.lock_path):
+            self._data_fd = os.open(self.path, flags, 0o644)
+            self._index_fd = os.open(self.index_path, flags, 0o644)
+            self._identity = self._identities()
+            self._map = None
+            self._entries.clear()
+            self.live_bytes = 0
+            self.index_records = 0
+
+            if self._read_index(0, len(_INDEX_MAGIC)) != _INDEX_MAGIC:
+                # 新建的包或旧格式的索引：清空后重新开始
+                os.ftruncate(self._index_fd, 0)
+                os.ftruncate(self._data_fd, 0)
+                os.write(self._index_fd, _INDEX_MAGIC)
+            self._index_position = len(_INDEX_MAGIC)
+            self._refresh(truncate_partial=True)
+
+    def _identities(self, paths: bool = False) -> Tuple:
+        """数据和索引文件的 (设备, inode)，paths为True时按路径查询当前文件"""
+        stats = [os.stat(p) for p in (self.path, self.index_path)] if paths else \
+            [os.fstat(fd) for fd in (self._data_fd, self._index_fd)]
+        return tuple((stat.st_dev, stat.st_ino) for stat in stats)
+
+    def _read_index(self, position: int, size: int) -> bytes:
+        """从已打开的索引文件的指定位置读取"""
+        if hasattr(os, 'pread'):
+            chunks = []
+            while size > 0:
+                chunk = os.pread(self._index_fd, size, position)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                position += len(chunk)
+                size -= len(chunk)
+            return b''.join(chunks)
+        # Windows: 文件不会在打开期间被替换，按路径读取即可
+        with open(self.index_path, 'rb') as f:
+            f.seek(position)
+            return f.read(size)
+
+    def _refresh(self, truncate_partial: bool = False):
+        """
+        读取索引文件中新追加的记录（包括其他进程写入的）
+
+        Args:
+            truncate_partial: 截掉末尾不完整的记录（上次写入中断），只在打开时进行
+        """
+        # 其他进程 compact() 替换了文件：重新打开
+        if not truncate_partial:
+            try:
+                replaced = self._identities(paths=True) != self._identity
+            except FileNotFoundError:
+                replaced = False
+            if replaced:
+                self._close_files()
+                self._open()
+                return
+
+        size = os.fstat(self._index_fd).st_size
+        if size <= self._index_position:
+            return
+        data = self._read_index(self._index_position, size - self._index_position)
+
+        position = 0
+        while position + _RECORD.size <= len(data):
+            offset, length, key_length = _RECORD.unpack_from(data, position)
+            end = position + _RECORD.size + key_length
+            if end > len(data):
+                break
+            key = data[position + _RECORD.size:end].decode('utf-8')
+            position = end
+            self.index_records += 1
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.live_bytes -= old[1]
+            if offset != _DELETED:
+                self._entries[key] = (offset, length)
+                self.live_bytes += length
+
+        self._index_position += position
+        if truncate_partial and position < len(data):
+            os.ftruncate(self._index_fd, self._index_position)
+
+    def _append_record(self, key: str, offset: int, length: int):
+        """追加一条索引记录（一次写入）"""
+        encoded = key.encode('utf-8')
+        os.write(self._index_fd, _RECORD.pack(offset, length, len(encoded)) + encoded)
+        self.index_records += 1
+
+    def put(self, key: str, data) -> None:
+        """
+        追加一个片段（同一键再次写入时以最后一次为准）
+
+        Args:
+            key: 键（如内容哈希）
+            data: 音频数据
+        """
+        data = bytes(data) if not isinstance(data, (bytes, bytearray, memoryview)) else data
+        written = os.write(self._data_fd, data)
+        if written != len(data):
+            raise OSError(f"片段包写入不完整: {self.path}")
+        # O_APPEND 写入后文件位置在本次数据末尾，其他进程的追加不影响
+        offset = os.lseek(self._data_fd, 0, os.SEEK_CUR) - written
+        self._append_record(key, offset, written)
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.live_bytes -= old[1]
+        self._entries[key] = (offset, written)
+        self.live_bytes += written
+
+    def get(self, key: str, touch: bool = False) -> Optional[memoryview]:
+        """
+        读取片段
+
+        Args:
+            key: 键
+            touch: 是否记录这次访问（追加一条索引记录，重新打开后按访问顺序排列，用于LRU）
+
+        Returns:
+            片段数据（数据文件映射上的只读 memoryview），不存在时返回None
+        """
+        location = self._entries.get(key)
+        if location is None:
+            self._refresh()
+            location = self._entries.get(key)
+            if location is None:
+                return None
+
+        offset, length = location
+        view = self._view(offset, length)
+        if view is None:
+            return None
+
+        if touch:
+            self._entries.move_to_end(key)
+            self._append_record(key, offset, length)
+        return view
+
+    def _view(self, offset: int, length: int) -> Optional[memoryview]:
+        """映射上的一段（映射不够长时重新映射整个文件）"""
+        if length == 0:
+            return memoryview(b'')
+        if self._map is None or offset + length > len(self._map):
+            size = os.fstat(self._data_fd).st_size
+            if offset + length > size:
+                return None
+            # 旧映射不显式关闭：仍被已返回的 memoryview 引用时由它们保持有效
+            self._map = mmap.mmap(self._data_fd, size, access=mmap.ACCESS_READ)
+        return memoryview(self._map)[offset:offset + length]
+
+    def delete(self, key: str):
+        """删除片段（追加删除标记，数据在 compact() 时才回收）"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.live_bytes -= old[1]
+            self._append_record(key, _DELETED, 0)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> Iterable[str]:
+        """所有键（按最后一次写入或访问的顺序，从旧到新）"""
+        return list(self._entries)
+
+    def size(self, key: str) -> int:
+        """片段长度"""
+        return self._entries[key][1]
+
+    def items(self) -> Iterator[Tuple[str, memoryview]]:
+        """按数据文件中的位置依次产出 (键, 片段)，顺序读取整个文件"""
+        for key, (offset, length) in sorted(self._entries.items(), key=lambda item: item[1][0]):
+            view = self._view(offset, length)
+            if view is not None:
+                yield key, view
+
+    @property
+    def file_bytes(self) -> int:
+        """数据文件大小"""
+        return os.fstat(self._data_fd).st_size
+
+    @property
+    def dead_bytes(self) -> int:
+        """已删除或被覆盖、尚未回收的数据量"""
+        return max(0, self.file_bytes - self.live_bytes)
+
+    @property
+    def stale_records(self) -> int:
+        """索引中不再有效的记录数（被覆盖的写入、删除标记、访问记录），由 compact_index() 回收"""
+        return max(0, self.index_records - len(self._entries))
+
+    def compact_index(self) -> bool:
+        """
+        只重写索引文件（每个有效片段一条记录，按当前顺序），数据文件不变
+
+        频繁读取（get(touch=True)）的包索引会不断增长，而数据没有变化，用它回收索引比 compact() 快得多；
+        其他进程此后追加的索引记录会丢失（对应数据变为无效数据，由 compact() 回收）
+
+        Returns:
+            是否完成
+        """
+        temp_index = self.index_path.with_name(self.index_path.name + f".{os.getpid()}.tmp")
+        try:
+            with _file_lock(self.lock_path), open(temp_index, 'wb') as index_file:
+                index_file.write(_INDEX_MAGIC)
+                for key, (offset, length) in self._entries.items():
+                    encoded = key.encode('utf-8')
+                    index_file.write(_RECORD.pack(offset, length, len(encoded)) + encoded)
+
+                index_file.close()
+                self._close_files()
+                os.replace(temp_index, self.index_path)
+        except OSError as e:
+            print(f"[WARN] 片段包索引整理失败: {e}")
+            try:
+                temp_index.unlink()
+            except OSError:
+                pass
+            if self._data_fd is None:
+                self._open()
+            return False
+
+        self._open()
+        return True
+
+    def compact(self, keep: Optional[Iterable[str]] = None) -> bool:
+        """
+        重写片段包，只保留有效的片段（按当前顺序），先写临时文件再替换
+
+        其他进程此后追加到旧文件的片段会丢失，只在缓存等可以丢失数据的场合并发使用
+
+        Args:
+            keep: 只保留这些键（默认保留全部有效片段）
+
+        Returns:
+            是否完成（Windows下文件仍被映射时无法替换，返回False）
+        """
+        keep = set(self._entries) if keep is None else set(keep)
+        temp_path = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        temp_index = self.index_path.with_name(self.index_path.name + f".{os.getpid()}.tmp")
+
+        try:
+            with _file_lock(self.lock_path), open(temp_path, 'wb') as data_file, \
+                    open(temp_index, 'wb') as index_file:
+                index_file.write(_INDEX_MAGIC)
+                for key, (offset, length) in self._entries.items():
+                    if key not in keep:
+                        continue
+                    view = self._view(offset, length)
+                    if view is None:
+                        continue
+                    encoded = key.encode('utf-8')
+                    index_file.write(_RECORD.pack(data_file.tell(), length, len(encoded)) + encoded)
+                    data_file.write(view)
+
+                data_file.close()
+                index_file.close()
+                self._close_files()
+                os.replace(temp_path, self.path)
+                os.replace(temp_index, self.index_path)
+        except OSError as e:
+            print(f"[WARN] 片段包整理失败: {e}")
+            for path in (temp_path, temp_index):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            if self._data_fd is None:
+                self._open()
+            return False
+
+        self._open()
+        return True
+
+    def _close_files(self):
+        """关闭文件描述符（映射由仍在使用的 memoryview 保持）"""
+        for fd in (self._data_fd, self._index_fd):
+            if fd is not None:
+                os.close(fd)
+        self._data_fd = self._index_fd = None
+        self._map = None
+
+    def close(self):
+        """关闭片段包"""
+        if self._data_fd is not None:
+            self._close_files()
+
+    def remove(self):
+        """关闭并删除片段包的文件"""
+        self.close()
+        for path in (self.path, self.index_path, self.lock_path):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def scratch_pack(output_file: Union[str, Path]) -> ClipPack:
+    """
+    一次运行的临时片段包 <输出文件>.parts.pack（清空上次残留的片段，合并成功后由调用方删除）
+
+    Args:
+        output_file: 最终输出的音频文件路径
+    """
+    return ClipPack(Path(output_file).with_suffix('.parts.pack'), truncate=True)
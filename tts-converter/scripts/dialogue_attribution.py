@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对话说话人识别引擎
+improved_tts、generate_script、fix_dialogue 共用的多策略说话人识别:
+对话内容特征、同一行的"XX说"、前几行的"XX说"、上下文中的角色名提及、沿用上一个说话人；
+正则和关键词表在初始化时编译一次，每行文本只分析一次，结果保存在滑动窗口中供前后的对话复用
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from keyword_automaton import KeywordPattern
+
+
+# 对话: 「」或『』
+DIALOGUE_RE = re.compile(r'[「『]([^「」『』]+)[」』]')
+
+# 说话动词
+SPEECH_VERBS = ['说', '道', '问', '喊', '笑道', '解释', '回答']
+
+# 对话前的说话动词（包括"摊摊手""平静地"等动作和修饰）
+EXTENDED_SPEECH_VERBS = SPEECH_VERBS + ['嘟囔', '摊摊手', '平静地']
+
+# 第一人称旁白
+NARRATOR = '我（旁白）'
+
+
+def compile_speaker_pattern(verbs: List[str]) -> re.Pattern:
+    """编译"XX说"形式的说话人正则，第1组为说话人"""
+    return re.compile(r'(\w{2,4})(' + '|'.join(map(re.escape, verbs)) + ')')
+
+
+class NameIndex:
+    """
+    角色名索引
+
+    把所有角色的名字变体编译成一个多关键词正则，扫描一行即可得到每个角色被提及的变体数，
+    也用于把"XX说"中的XX标准化为角色名
+    """
+
+    def __init__(self, characters: Dict[str, Dict]):
+        """
+        Args:
+            characters: {角色名: {'name_variations': [...], ...}}
+        """
+        self.characters = list(characters)
+
+        variations = {}
+        for name, info in characters.items():
+            for variation in info.get('name_variations', []):
+                variations.setdefault(variation, []).append(name)
+        self._variations = variations
+        self._pattern = KeywordPattern(variations)
+
+        # 标准化时只使用两个字以上的变体（"她""我"等代词只用于上下文提及）
+        self._name_variations = [(variation, names[0]) for variation, names in variations.items()
+                                 if len(variation) >= 2]
+
+    def mentions(self, line: str) -> Dict[str, int]:
+        """
+        统计一行中每个角色被提及的变体数（同一变体出现多次只计一次）
+
+        Returns:
+            {角色名: 提及的变体数}
+        """
+        found = self._pattern.find_set(line)
+        if not found:
+            return {}
+
+        counts = {}
+        for variation in found:
+            for name in self._variations[variation]:
+                counts[name] = counts.get(name, 0) + 1
+        return {name: counts[name] for name in self.characters if name in counts}
+
+    def normalize(self, name: str) -> Optional[str]:
+        """
+        把说话人标准化为角色名
+
+        Returns:
+            包含某个角色名字变体时返回该角色名，否则返回None
+        """
+        if name in self._variations and len(name) >= 2:
+            return self._variations[name][0]
+        for variation, canonical in self._name_variations:
+            if variation in name:
+                return canonical
+        return None
+
+
+class DialogueAttributor:
+    """对话说话人识别引擎"""
+
+    def __init__(self, characters: Optional[Dict[str, Dict]] = None,
+                 before_verbs: Optional[List[str]] = None,
+                 after_verbs: Optional[List[str]] = None,
+                 lookback_verbs: Optional[List[str]] = None,
+                 lookback_lines: int = 0,
+                 content_threshold: int = 2,
+                 context_before: int = 5,
+                 context_after: int = 5,
+                 context_threshold: int = 2,
+                 sticky: bool = False,
+                 narrator: str = NARRATOR,
+                 default_speaker: Optional[str] = None,
+                 unknown_speaker: Optional[str] = None):
+        """
+        初始化引擎，编译正则和关键词表
+
+        各策略按下面的顺序尝试，前一个策略识别出说话人时不再尝试后面的策略
+
+        Args:
+            characters: 角色特征 {角色名: {'keywords': [...], 'name_variations': [...]}}，
+                        keywords 用于内容特征识别，name_variations 用于上下文提及和名字标准化
+            before_verbs: 同一行对话前"XX说"的动词（None表示不检查）
+            after_verbs: 同一行对话后"XX说"的动词（None表示不检查）
+            lookback_verbs: 前几行"XX说"的动词（默认 SPEECH_VERBS）
+            lookback_lines: 检查"XX说"的前几行行数（0表示不检查）
+            content_threshold: 内容特征词达到多少个时确定说话人（没有特征词时不使用该策略）
+            context_before: 上下文提及向前看的行数（前一行权重为3，更早的行权重为1）
+            context_after: 上下文提及向后看的行数（权重为3）
+            context_threshold: 上下文提及得分达到多少时确定说话人（没有名字变体时不使用该策略）
+            sticky: 都没有识别出时是否沿用上一个明确的说话人（旁白除外）
+            narrator: "我说"中的"我"对应的说话人
+            default_speaker: 都没有识别出时的说话人（默认为narrator）
+            unknown_speaker: "XX说"中的XX不是已知角色时使用的说话人（None表示直接使用XX）
+        """
+        characters = characters or {}
+
+        self.before_re = compile_speaker_pattern(before_verbs) if before_verbs else None
+        self.after_re = compile_speaker_pattern(after_verbs) if after_verbs else None
+        self.lookback_re = compile_speaker_pattern(lookback_verbs or SPEECH_VERBS)
+        self.lookback_lines = lookback_lines
+
+        self.content_threshold = content_threshold
+        self.context_before = context_before
+        self.context_after = context_after
+        self.context_threshold = context_threshold
+        self.sticky = sticky
+        self.narrator = narrator
+        self.default_speaker = default_speaker or narrator
+        self.unknown_speaker = unknown_speaker
+
+        # 内容特征词 -> 角色名
+        keyword_owners = {}
+        for name, info in characters.items():
+            for keyword in info.get('keywords', []):
+                keyword_owners.setdefault(keyword, []).append(name)
+        self.character_order = {name: i for i, name in enumerate(characters)}
+        self.content_pattern = KeywordPattern(keyword_owners) if keyword_owners else None
+
+        self.names = NameIndex(characters)
+        self.use_context = any(info.get('name_variations') for info in characters.values())
+
+    def normalize(self, name: str) -> str:
+        """把"XX说"中的XX标准化为角色名"""
+        if name == '我':
+            return self.narrator
+
+        result = self.names.normalize(name)
+        if result:
+            return result
+
+        return self.unknown_speaker or name
+
+    def identify_by_content(self, dialogue_text: str) -> Optional[str]:
+        """根据对话内容特征识别说话人（特征词最多且达到阈值的角色，并列时取靠前的角色）"""
+        if self.content_pattern is None:
+            return None
+
+        scores = {}
+        for keyword in self.content_pattern.find_set(dialogue_text):
+            for name in self.content_pattern.value(keyword):
+                scores[name] = scores.get(name, 0) + 1
+
+        if not scores:
+            return None
+
+        best = min(scores, key=lambda name: (-scores[name], self.character_order[name]))
+        if scores[best] >= self.content_threshold:
+            return best
+        return None
+
+    def identify_by_same_line(self, line: str, start: int, end: int) -> Optional[str]:
+        """
+        检查同一行的说话人标识
+
+        Args:
+            line: 对话所在行
+            start: 对话（含引号）在行中的起始位置
+            end: 对话（含引号）在行中的结束位置
+        """
+        if self.before_re is not None:
+            match = self.before_re.search(line, 0, start)
+            if match:
+                return self.normalize(match.group(1))
+
+        if self.after_re is not None:
+            match = self.after_re.search(line, end)
+            if match:
+                return self.normalize(match.group(1))
+
+        return None
+
+    def attribute(self, text: str) -> List[Dict]:
+        """
+        识别全文所有对话的说话人
+
+        Args:
+            text: 全文
+
+        Returns:
+            [{line_number, speaker, dialogue, full_line, strategy}, ...]，
+            strategy 为识别出说话人的策略: content/same_line/lookback/context/sticky/default
+        """
+        lines = text.split('\n')
+        total = len(lines)
+
+        # 滑动窗口: 每行的角色提及和"XX说"只计算一次，离开窗口后丢弃
+        mention_cache = {}
+        speaker_cache = {}
+        horizon = max(self.context_before, self.lookback_lines)
+        evicted = 0
+
+        def mentions_at(j):
+            result = mention_cache.get(j)
+            if result is None:
+                result = mention_cache[j] = self.names.mentions(lines[j])
+            return result
+
+        def speaker_at(j):
+            if j not in speaker_cache:
+                match = self.lookback_re.search(lines[j])
+                speaker_cache[j] = match.group(1) if match else None
+            return speaker_cache[j]
+
+        dialogues = []
+        current_speaker = self.default_speaker
+
+        for index, line in enumerate(lines):
+            if '「' not in line and '『' not in line:
+                continue
+
+            # 丢弃离开窗口的行
+            while evicted < index - horizon:
+                mention_cache.pop(evicted, None)
+                speaker_cache.pop(evicted, None)
+                evicted += 1
+
+            # 前几行和上下文的识别结果只与行有关，同一行的多段对话共用
+            line_result = None
+
+            for match in DIALOGUE_RE.finditer(line):
+                dialogue_text = match.group(1)
+
+                # 策略1: 对话内容特征
+                speaker = self.identify_by_content(dialogue_text)
+                strategy = 'content'
+
+                # 策略2: 同一行的"XX说"
+                if not speaker:
+                    speaker = self.identify_by_same_line(line, match.start(), match.end())
+                    strategy = 'same_line'
+
+                # 策略3、4: 前几行的"XX说"、上下文中的角色名提及
+                if not speaker:
+                    if line_result is None:
+                        line_result = self._identify_by_lines(index, total, mentions_at, speaker_at)
+                    speaker, strategy = line_result
+
+                # 策略5: 沿用上一个说话人
+                if not speaker:
+                    if self.sticky:
+                        speaker, strategy = current_speaker, 'sticky'
+                    else:
+                        speaker, strategy = self.default_speaker, 'default'
+
+                dialogues.append({
+                    'line_number': index + 1,
+                    'speaker': speaker,
+                    'dialogue': dialogue_text,
+                    'full_line': line.strip(),
+                    'strategy': strategy,
+                })
+
+                if self.sticky and strategy != 'sticky' and speaker != self.narrator:
+                    current_speaker = speaker
+
+        return dialogues
+
+    def _identify_by_lines(self, index, total, mentions_at, speaker_at):
+        """
+        根据前几行的"XX说"和上下文中的角色名提及识别说话人
+
+        Returns:
+            (说话人, 策略)，未识别时说话人为None
+        """
+        # 前几行的"XX说"（从近到远）
+        for j in range(index - 1, max(-1, index - 1 - self.lookback_lines), -1):
+            name = speaker_at(j)
+            if name:
+                return self.normalize(name), 'lookback'
+
+        # 上下文中的角色名提及（前一行和后几行权重为3，更早的行权重为1）
+        if self.use_context:
+            scores = {}
+            for j in range(max(0, index - self.context_before), min(total, index + self.context_after + 1)):
+                if j == index:
+                    continue
+                mentions = mentions_at(j)
+                if mentions:
+                    weight = 3 if j >= index - 1 else 1
+                    for name, count in mentions.items():
+                        scores[name] = scores.get(name, 0) + weight * count
+
+            if scores:
+                # 并列时取先被提及的角色
+                best = max(scores, key=scores.get)
+                if scores[best] >= self.context_threshold:
+                    return best, 'context'
+
+        return None, None
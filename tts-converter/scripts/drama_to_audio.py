@@ -12,6 +12,7 @@ import subprocess
 from pathlib import Path
 import sys
 import tempfile
+from segment_ir import SegmentIR
 
 
 # 角色声音映射
@@ -63,122 +64,95 @@ def parse_script(text):
     2. 【角色名】对话内容
     3. 【角色名】\n对话内容（角色名和对话分行）
     4. ## 角色名（Markdown格式）
+
+    Returns:
+        片段列表 [{speaker, voice, rate, text, span}]，span 为片段在稿子中的 [起始行, 结束行]
     """
     segments = []
 
-    lines = text.strip().split('\n')
+    lines = text.split('\n')
 
     current_speaker = None
     current_dialogue = []
-    expect_dialogue = False  # 标记是否期待对话内容
+    start_line = end_line = 0  # 当前片段的行范围
 
-    for line in lines:
+    def flush():
+        """保存当前对话"""
+        dialogue_text = ' '.join(current_dialogue).strip()
+        if dialogue_text:
+            segments.append({
+                'speaker': current_speaker,
+                'voice': get_voice(current_speaker),
+                'rate': '+0%',
+                'text': clean_dialogue_text(dialogue_text),
+                'span': [start_line, end_line]
+            })
+        current_dialogue.clear()
+
+    for line_number, line in enumerate(lines, 1):
         line = line.strip()
 
         if not line:
             # 空行，保存当前对话
             if current_speaker and current_dialogue:
-                dialogue_text = ' '.join(current_dialogue).strip()
-                if dialogue_text:
-                    dialogue_text = clean_dialogue_text(dialogue_text)
-                    segments.append({
-                        'speaker': current_speaker,
-                        'text': dialogue_text
-                    })
-                current_dialogue = []
-                expect_dialogue = False
+                flush()
             continue
 
         # 格式1：角色名：对话内容
-        match = re.match(r'^([^：:]+)[：:](.+)$', line)
-        if match:
-            # 保存之前的对话
-            if current_speaker and current_dialogue:
-                dialogue_text = ' '.join(current_dialogue).strip()
-                if dialogue_text:
-                    dialogue_text = clean_dialogue_text(dialogue_text)
-                    segments.append({
-                        'speaker': current_speaker,
-                        'text': dialogue_text
-                    })
-                current_dialogue = []
-
-            current_speaker = match.group(1).strip()
-            current_dialogue.append(match.group(2).strip())
-            expect_dialogue = False
-            continue
-
         # 格式2：【角色名】对话内容（同行）
-        match = re.match(r'^【(.+?)】(.+)$', line)
+        match = re.match(r'^([^：:]+)[：:](.+)$', line) or re.match(r'^【(.+?)】(.+)$', line)
         if match:
             # 保存之前的对话
             if current_speaker and current_dialogue:
-                dialogue_text = ' '.join(current_dialogue).strip()
-                if dialogue_text:
-                    dialogue_text = clean_dialogue_text(dialogue_text)
-                    segments.append({
-                        'speaker': current_speaker,
-                        'text': dialogue_text
-                    })
-                current_dialogue = []
+                flush()
 
             current_speaker = match.group(1).strip()
             current_dialogue.append(match.group(2).strip())
-            expect_dialogue = False
+            start_line = end_line = line_number
             continue
 
         # 格式3：【角色名】单独一行（期待对话）
-        match = re.match(r'^【(.+?)】$', line)
-        if match:
-            # 保存之前的对话
-            if current_speaker and current_dialogue:
-                dialogue_text = ' '.join(current_dialogue).strip()
-                if dialogue_text:
-                    dialogue_text = clean_dialogue_text(dialogue_text)
-                    segments.append({
-                        'speaker': current_speaker,
-                        'text': dialogue_text
-                    })
-                current_dialogue = []
-
-            current_speaker = match.group(1).strip()
-            expect_dialogue = True
-            continue
-
-        # 格式3：## 角色名（Markdown标题）
-        match = re.match(r'^#+\s*(.+)$', line)
+        # 格式4：## 角色名（Markdown标题）
+        match = re.match(r'^【(.+?)】$', line) or re.match(r'^#+\s*(.+)$', line)
         if match:
             # 保存之前的对话
             if current_speaker and current_dialogue:
-                dialogue_text = ' '.join(current_dialogue).strip()
-                if dialogue_text:
-                    dialogue_text = clean_dialogue_text(dialogue_text)
-                    segments.append({
-                        'speaker': current_speaker,
-                        'text': dialogue_text
-                    })
-                current_dialogue = []
+                flush()
 
             current_speaker = match.group(1).strip()
+            start_line = end_line = line_number
             continue
 
         # 普通文本，作为对话内容
         if current_speaker:
             current_dialogue.append(line)
+            end_line = line_number
 
     # 保存最后的对话
     if current_speaker and current_dialogue:
-        dialogue_text = ' '.join(current_dialogue).strip()
-        if dialogue_text:
-            dialogue_text = clean_dialogue_text(dialogue_text)
-            segments.append({
-                'speaker': current_speaker,
-                'text': dialogue_text
-            })
+        flush()
 
     return segments
 
 
+def load_script(input_file, use_cache=True):
+    """
+    读取并解析稿子文件
+
+    解析结果保存为稿子旁的IR（<稿子>.ir.json），稿子未修改时直接读取
+
+    Args:
+        input_file: 稿子文件
+        use_cache: 是否使用IR缓存
+
+    Returns:
+        片段列表
+    """
+    ir = SegmentIR(input_file, 'drama_to_audio', {'voices': VOICE_MAP})
+    segments, _ = ir.load_or_compile(lambda text: (parse_script(text), {}), use_cache)
+    return segments
+
+
 def get_voice(speaker):
     """获取角色的声音"""
     # 直接匹配
@@ -204,7 +178,7 @@ async def generate_audio(segments, output_file):
     for i, seg in enumerate(segments, 1):
         speaker = seg['speaker']
         text = seg['text']
-        voice = get_voice(speaker)
+        voice = seg.get('voice') or get_voice(speaker)
 
         print(f"[{i}/{len(segments)}] {speaker}: {text[:30]}...")
 
@@ -270,11 +244,8 @@ def main():
 
     print(f"[INFO] 读取稿子: {input_file}")
 
-    with open(input_file, 'r', encoding='utf-8') as f:
-        text = f.read()
-
-    # 解析稿子
-    segments = parse_script(text)
+    # 解析稿子（稿子未修改时直接读取上次的解析结果）
+    segments = load_script(input_file)
 
     if not segments:
         print("[ERROR] 稿子中没有识别到对话内容")
@@ -286,8 +257,7 @@ def main():
     # 显示前几个片段
     print("\n[预览] 前3个片段：")
     for seg in segments[:3]:
-        voice = get_voice(seg['speaker'])
-        print(f"  {seg['speaker']} ({voice}): {seg['text'][:40]}...")
+        print(f"  {seg['speaker']} ({seg['voice']}): {seg['text'][:40]}...")
 
     # 生成音频
     asyncio.run(generate_audio(segments, output_file))
@@ -5,30 +5,67 @@
 自动识别角色、智能声音匹配、性格语速调整
 """
 
+import os
 import re
-import edge_tts
+import time
+import hashlib
 import asyncio
-import subprocess
 from pathlib import Path
 import sys
 import argparse
 from character_parser import CharacterParser
 from voice_matcher import VoiceMatcher
+from voice_catalog import get_catalog
+from synthesis_scheduler import SynthesisScheduler
+from text_chunker import DEFAULT_CHUNK_CHARS
+from segment_packer import DEFAULT_PACK_CHARS
+from tts_factory import (TTSFactory, CachedTTSBackend, HybridTTSBackend, RateLimitedTTSBackend,
+                         TimeStretchTTSBackend)
+from tts_metrics import SynthesisMetrics
+from segment_manifest import SegmentManifest
+from segment_ir import SegmentIR
+from audio_assembler import MP3Assembler, join_mp3
+from chapter_renderer import ChapterRenderer, file_digest, split_chapters
 
 
 class SmartDramaToAudio:
     """智能广播剧音频生成器"""
 
-    def __init__(self, add_name_prompt=True, use_speed_adjustment=True):
+    def __init__(self, add_name_prompt=True, use_speed_adjustment=True, concurrency=4, max_retries=3,
+                 backend=None, incremental=True, lexicon_file=None, use_ir_cache=True,
+                 chunk_chars=DEFAULT_CHUNK_CHARS, metrics=None, prometheus_file=None,
+                 pack_chars=DEFAULT_PACK_CHARS):
         """
         初始化生成器
 
         Args:
             add_name_prompt: 是否在对话前添加角色名提示
             use_speed_adjustment: 是否使用语速调整
+            concurrency: 同时进行的合成任务数
+            max_retries: 单个片段失败后的最大重试次数
+            backend: TTS后端（默认Edge TTS）
+            incremental: 是否复用上次运行生成的片段（根据片段清单）
+            lexicon_file: 角色特征用户词库（JSON），补充内置的性别/年龄/性格关键词
+            use_ir_cache: 是否复用脚本旁的片段IR（脚本未修改时跳过角色识别、声音分配和解析）
+            chunk_chars: 超过此长度的片段（通常是大段旁白）按句切分为多块并发合成后拼接（0表示不切分）
+            metrics: 合成指标收集器（与backend共用，见 TTSFactory.create_backend），
+                     生成结束后打印并保存为输出文件旁的 <输出>.metrics.json
+            prometheus_file: 同时导出Prometheus文本格式指标的路径
+            pack_chars: 相邻的同声音、同语速短片段（如旁白和下一句的"XX说"）合并为一个请求，
+                        每个请求的最大字符数（0表示不合并）
         """
         self.add_name_prompt = add_name_prompt
         self.use_speed_adjustment = use_speed_adjustment
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backend = backend if backend is not None else TTSFactory.create_backend('edge')
+        self.incremental = incremental
+        self.lexicon_file = lexicon_file
+        self.use_ir_cache = use_ir_cache
+        self.chunk_chars = chunk_chars
+        self.metrics = metrics
+        self.prometheus_file = prometheus_file
+        self.pack_chars = pack_chars
 
         # 兼容旧版VOICE_MAP（用于没有角色列表的情况）
         self.voice_map = {
@@ -47,26 +84,33 @@ class SmartDramaToAudio:
             '国王': 'zh-CN-YunjianNeural',
         }
 
-    def parse_script(self, text: str, voice_assignments: dict = None):
+    def parse_script(self, text: str, voice_assignments: dict = None, first_line: int = 1):
         """
         解析广播剧脚本
 
         Args:
             text: 脚本文本
             voice_assignments: 声音分配字典（如果有角色列表）
+            first_line: text 第一行在源文件中的行号（用于记录片段的行范围）
 
         Returns:
-            对话片段列表
+            对话片段列表，每个片段的 span 为其在源文件中的 [起始行, 结束行]
         """
         segments = []
-        lines = text.strip().split('\n')
+        lines = text.split('\n')
 
         current_speaker = None
         current_dialogue = []
+        start_line = end_line = 0  # 当前片段的行范围
         in_role_list = False  # 是否在角色列表区域
         found_role_list_title = False  # 是否找到角色列表标题
 
-        for line in lines:
+        def emit(dialogue_text):
+            segment = self._create_segment(current_speaker, dialogue_text, voice_assignments)
+            segment['span'] = [start_line, end_line]
+            segments.append(segment)
+
+        for line_number, line in enumerate(lines, first_line):
             line_stripped = line.strip()
 
             # 检测角色列表标题
@@ -87,7 +131,7 @@ class SmartDramaToAudio:
                     if current_speaker and current_dialogue:
                         dialogue_text = ' '.join(current_dialogue).strip()
                         if dialogue_text:
-                            segments.append(self._create_segment(current_speaker, dialogue_text, voice_assignments))
+                            emit(dialogue_text)
                         current_dialogue = []
                 continue
 
@@ -112,11 +156,12 @@ class SmartDramaToAudio:
                 if current_speaker and current_dialogue:
                     dialogue_text = ' '.join(current_dialogue).strip()
                     if dialogue_text:
-                        segments.append(self._create_segment(current_speaker, dialogue_text, voice_assignments))
+                        emit(dialogue_text)
                     current_dialogue = []
 
                 current_speaker = match.group(1).strip()
                 dialogue_text = match.group(2).strip()
+                start_line = end_line = line_number
 
                 if dialogue_text:
                     # 【角色名】后面有对话内容（同行）
@@ -128,12 +173,13 @@ class SmartDramaToAudio:
             # 普通文本
             if not in_role_list and current_speaker:
                 current_dialogue.append(line_stripped)
+                end_line = line_number
 
         # 保存最后的对话
         if current_speaker and current_dialogue:
             dialogue_text = ' '.join(current_dialogue).strip()
             if dialogue_text:
-                segments.append(self._create_segment(current_speaker, dialogue_text, voice_assignments))
+                emit(dialogue_text)
 
         return segments
 
@@ -204,190 +250,269 @@ class SmartDramaToAudio:
         """
         生成音频
 
+        每次运行都会在输出文件旁写入片段清单；再次运行时只重新合成内容有变化的片段，
+        其余片段直接复用上次生成的音频
+
         Args:
             segments: 对话片段列表
             output_file: 输出文件路径
             voice_assignments: 声音分配字典(用于获取旁白声音)
         """
-        import tempfile
+        narrator_voice = self._get_narrator_voice(voice_assignments)
+
+        manifest = SegmentManifest(output_file)
+        if self.incremental:
+            manifest.load()
+
+        # 计算片段哈希，查找可复用的片段
+        segment_hashes = [SegmentManifest.segment_hash(seg, narrator_voice) for seg in segments]
+        reused = {}
+        for i, segment_hash in enumerate(segment_hashes, 1):
+            clip = manifest.lookup(segment_hash)
+            if clip is not None:
+                reused[i] = clip
 
-        temp_dir = tempfile.mkdtemp()
-        audio_files = []
+        print(f"\n[INFO] 共 {len(segments)} 个片段, 复用 {len(reused)} 个, "
+              f"需要合成 {len(segments) - len(reused)} 个, 并发数 {self.concurrency}\n")
 
-        print(f"\n[INFO] 共 {len(segments)} 个片段\n")
+        # 展开为合成任务: 每个片段可能包含"角色说"介绍和对话内容两部分
+        jobs = []
+        job_owners = []  # 每个任务所属的片段序号
 
         for i, seg in enumerate(segments, 1):
+            if i in reused:
+                continue
+
             speaker = seg['speaker']
             text = seg['text']
-            voice = seg['voice']
             rate = seg['rate']
-            need_intro = seg.get('need_intro', False)
 
             # 预览文本
             preview = text[:40] + "..." if len(text) > 40 else text
             rate_str = f" [语速{rate}]" if rate != '+0%' else ""
 
-            # 如果需要角色介绍,显示特殊标记
-            if need_intro:
-                print(f"[{i}/{len(segments)}] {speaker}说: {preview}{rate_str}")
+            # 如果需要角色介绍(非旁白且有add_name_prompt),用旁白声音生成"角色说"
+            if seg.get('need_intro', False):
+                jobs.append({
+                    'text': seg['intro_text'],
+                    'voice': narrator_voice,
+                    'rate': '+0%',
+                    'label': f"片段{i} 角色介绍: {seg['intro_text']}"
+                })
+                job_owners.append(i)
+
+            jobs.append({
+                'text': text,
+                'voice': seg['voice'],
+                'rate': rate,
+                'label': f"片段{i} {speaker}: {preview}{rate_str}"
+            })
+            job_owners.append(i)
+
+        scheduler = SynthesisScheduler(
+            self.backend,
+            concurrency=self.concurrency,
+            max_retries=self.max_retries,
+            chunk_chars=self.chunk_chars,
+            pack_chars=self.pack_chars
+        )
+        results = await scheduler.run(jobs)
+        if jobs:
+            scheduler.print_summary()
+        self._print_backend_stats(self.backend)
+
+        # 按片段收集音频部分(可能包含角色介绍), 记录失败的片段
+        segment_parts = {}
+        failed = set()
+        for owner, audio in zip(job_owners, results):
+            if audio is None:
+                failed.add(owner)
+                continue
+            segment_parts.setdefault(owner, []).append(audio)
+
+        clips = []
+        manifest_entries = []
+        for i, (seg, segment_hash) in enumerate(zip(segments, segment_hashes), 1):
+            if i in reused:
+                clip = reused[i]
             else:
-                print(f"[{i}/{len(segments)}] {speaker}: {preview}{rate_str}")
-
-            # 收集当前片段的所有音频文件(可能包含角色介绍)
-            segment_audio_parts = []
-
-            # 如果需要角色介绍(非旁白且有add_name_prompt)
-            if need_intro:
-                intro_text = seg['intro_text']
-                narrator_voice = self._get_narrator_voice(voice_assignments)
-
-                # 生成"角色说"(用旁白声音)
-                intro_file = Path(temp_dir) / f"segment_{i:04d}_intro.mp3"
-                try:
-                    intro_communicate = edge_tts.Communicate(intro_text, narrator_voice)
-                    await intro_communicate.save(str(intro_file))
-                    segment_audio_parts.append(str(intro_file))
-                except Exception as e:
-                    print(f"  [ERROR] 生成角色介绍失败: {e}")
-
-            # 生成对话内容
-            dialogue_file = Path(temp_dir) / f"segment_{i:04d}_dialogue.mp3"
-            try:
-                # 创建communicate对象
-                communicate = edge_tts.Communicate(text, voice)
-
-                # 设置语速
-                if rate != '+0%':
-                    communicate = edge_tts.Communicate(text, voice, rate=rate)
-
-                await communicate.save(str(dialogue_file))
-                segment_audio_parts.append(str(dialogue_file))
-            except Exception as e:
-                print(f"  [ERROR] 生成对话失败: {e}")
-
-            # 如果有角色介绍和对话内容,需要合并
-            if len(segment_audio_parts) > 1:
-                # 合并角色介绍和对话内容
-                merged_file = Path(temp_dir) / f"segment_{i:04d}.mp3"
-                await self._merge_segment_parts(segment_audio_parts, str(merged_file), temp_dir)
-                audio_files.append(str(merged_file))
-            elif len(segment_audio_parts) == 1:
-                # 只有一个音频文件,直接使用
-                audio_files.append(segment_audio_parts[0])
-
-        # 合并音频
-        return await self._merge_audio(audio_files, output_file, temp_dir)
-
-    async def _merge_segment_parts(self, audio_parts: list, output_file: str, temp_dir: str):
+                segment_audio_parts = segment_parts.get(i, [])
+                if not segment_audio_parts:
+                    continue
+
+                # 角色介绍和对话内容在内存中按帧拼接
+                clip = join_mp3(segment_audio_parts) if len(segment_audio_parts) > 1 else segment_audio_parts[0]
+
+                # 完整生成的片段追加到片段包供下次复用; 部分失败的片段只用于本次输出
+                if i not in failed:
+                    clip = manifest.store(segment_hash, clip)
+
+            clips.append(clip)
+            if i not in failed:
+                manifest_entries.append({
+                    'index': i,
+                    'speaker': seg['speaker'],
+                    'voice': seg['voice'],
+                    'rate': seg['rate'],
+                    'hash': segment_hash
+                })
+
+        manifest.save(manifest_entries)
+        print(f"[INFO] 片段清单已保存: {manifest.manifest_path}")
+
+        # 合并音频; 有片段失败时输出仍然生成，但返回失败，以便按章节渲染时重试该章
+        merged = await self._merge_audio(clips, output_file)
+        # 释放对片段包映射的引用后再整理（Windows下仍被映射的文件无法替换）
+        clips.clear()
+        reused.clear()
+        clip = None
+        manifest.compact()
+        manifest.close()
+        if failed:
+            print(f"[WARN] {len(failed)} 个片段合成失败，重新运行将只合成这些片段")
+        return merged and not failed
+
+    async def _merge_audio(self, clips: list, output_file: str):
         """
-        合并单个片段的多个音频部分(如角色介绍+对话内容)
+        合并音频片段
+
+        所有片段按MP3帧依次写入输出文件，只顺序写一次，不启动ffmpeg
 
         Args:
-            audio_parts: 音频部分文件列表
+            clips: 片段音频列表(复用和新生成的片段直接引用片段包的映射)
             output_file: 输出文件路径
-            temp_dir: 临时目录
 
         Returns:
             是否成功
         """
-        if not audio_parts:
+        if not clips:
+            print("[ERROR] 没有成功生成任何音频片段")
             return False
 
-        # 如果只有一个文件,直接复制
-        if len(audio_parts) == 1:
-            import shutil
-            shutil.copy(audio_parts[0], output_file)
-            return True
-
-        # 多个文件,使用ffmpeg合并
-        list_file = Path(temp_dir) / f"temp_{Path(output_file).stem}_list.txt"
-        with open(list_file, 'w', encoding='utf-8') as f:
-            for audio_part in audio_parts:
-                f.write(f"file '{audio_part}'\n")
+        print(f"\n[INFO] 成功生成 {len(clips)} 个片段")
+        print(f"[INFO] 正在合并音频...")
 
+        start = time.perf_counter()
         try:
-            subprocess.run([
-                'ffmpeg', '-f', 'concat', '-safe', '0',
-                '-i', str(list_file),
-                '-c', 'copy',
-                str(output_file)
-            ], check=True, capture_output=True)
-            return True
+            with MP3Assembler(output_file) as assembler:
+                for clip in clips:
+                    assembler.add(clip)
         except Exception as e:
-            print(f"  [ERROR] 合并片段部分失败: {e}")
+            print(f"[ERROR] 合并失败: {e}")
             return False
 
-    async def _merge_audio(self, audio_files: list, output_file: str, temp_dir: str):
+        print(f"[OK] 音频已生成: {output_file}")
+
+        # 显示文件大小和时长
+        size_mb = Path(output_file).stat().st_size / (1024 * 1024)
+        print(f"[INFO] 文件大小: {size_mb:.1f} MB, 时长 {assembler.duration / 60:.1f} 分钟, "
+              f"合并耗时 {time.perf_counter() - start:.2f}s")
+
+        return True
+
+    def _print_backend_stats(self, backend):
+        """打印后端各层（本地变速、缓存、限流）的统计，混合后端逐个打印其中的后端"""
+        if isinstance(backend, HybridTTSBackend):
+            for sub_backend in [backend.default_backend, *backend.special_backends.values()]:
+                self._print_backend_stats(sub_backend)
+            backend.print_stats()
+            return
+
+        if isinstance(backend, TimeStretchTTSBackend):
+            backend.print_stats()
+            backend = backend.backend
+        if isinstance(backend, CachedTTSBackend):
+            backend.cache.print_stats()
+            backend = backend.backend
+        if isinstance(backend, RateLimitedTTSBackend):
+            backend.print_stats()
+
+    def _assign_special_voices(self, voice_assignments: dict):
         """
-        合并音频文件
+        混合后端有特殊声音（如GPT-SoVITS的小孩、老人模型）时，对应的角色改用特殊声音
+
+        特殊声音的模型本身就是小孩、老人的音色，不再按年龄调整语速
 
         Args:
-            audio_files: 音频文件列表
-            output_file: 输出文件路径
-            temp_dir: 临时目录
+            voice_assignments: 声音分配结果（就地修改）
+        """
+        if not isinstance(self.backend, HybridTTSBackend):
+            return
+
+        for assignment in voice_assignments.values():
+            voice = self.backend.special_voice(assignment['gender'], assignment['age'])
+            if voice is not None:
+                assignment['voice'] = voice
+                assignment['voice_description'] = self.backend.get_voice_description(voice)
+                assignment['rate'] = '+0%'
+
+    def compile_script(self, text: str):
+        """
+        把脚本文本编译为片段IR: 识别角色、分配声音、解析对话
+
+        Args:
+            text: 脚本全文
 
         Returns:
-            是否成功
+            (片段列表, {characters, voice_assignments})，没有角色列表时后两者为None
         """
-        if audio_files:
-            print(f"\n[INFO] 成功生成 {len(audio_files)} 个片段")
-            print(f"[INFO] 正在合并音频...")
-
-            list_file = Path(temp_dir) / "file_list.txt"
-            with open(list_file, 'w', encoding='utf-8') as f:
-                for audio_file in audio_files:
-                    f.write(f"file '{audio_file}'\n")
-
-            # 使用ffmpeg合并
-            try:
-                subprocess.run([
-                    'ffmpeg', '-f', 'concat', '-safe', '0',
-                    '-i', str(list_file),
-                    '-c', 'copy',
-                    str(output_file)
-                ], check=True, capture_output=True)
-
-                print(f"[OK] 音频已生成: {output_file}")
-
-                # 显示文件大小
-                size_mb = Path(output_file).stat().st_size / (1024 * 1024)
-                print(f"[INFO] 文件大小: {size_mb:.1f} MB")
-
-                return True
-
-            except Exception as e:
-                print(f"[ERROR] 合并失败: {e}")
-                print(f"[INFO] 音频片段保存在: {temp_dir}")
-                return False
-        else:
-            print("[ERROR] 没有成功生成任何音频片段")
-            return False
+        parse_result = CharacterParser(self.lexicon_file).parse_script(text)
+
+        characters = None
+        voice_assignments = None
+        first_line = 1
+
+        if parse_result['characters']:
+            # 有角色列表，使用智能声音匹配
+            characters = parse_result['characters']
+            voice_assignments = VoiceMatcher().assign_voices(characters)
+            self._assign_special_voices(voice_assignments)
+
+            # 过滤掉角色列表部分
+            if parse_result['role_list_end'] != -1:
+                lines = text.split('\n')
+                text = '\n'.join(lines[parse_result['role_list_end'] + 1:])
+                first_line = parse_result['role_list_end'] + 2
+
+        segments = self.parse_script(text, voice_assignments, first_line)
+        return segments, {'characters': characters, 'voice_assignments': voice_assignments}
+
+    def _ir_options(self) -> dict:
+        """影响片段IR的参数: 生成选项、角色词库内容、声音目录版本和混合后端的特殊声音"""
+        lexicon_hash = None
+        if self.lexicon_file:
+            with open(self.lexicon_file, 'rb') as f:
+                lexicon_hash = hashlib.sha256(f.read()).hexdigest()
+
+        return {
+            'add_name_prompt': self.add_name_prompt,
+            'use_speed_adjustment': self.use_speed_adjustment,
+            'voice_map': self.voice_map,
+            'lexicon': lexicon_hash,
+            'catalog': get_catalog().updated_at,
+            'special_voices': (self.backend.special_voices
+                               if isinstance(self.backend, HybridTTSBackend) else None),
+        }
 
     async def generate(self, input_file: str, output_file: str):
         """
         从脚本文件生成音频
 
+        解析结果（角色、声音分配、片段）保存为脚本旁的IR（<脚本>.ir.json），
+        脚本和参数未变化时直接读取，不再重新解析
+
         Args:
             input_file: 输入脚本文件
             output_file: 输出音频文件
         """
         print(f"[INFO] 读取脚本: {input_file}")
 
-        with open(input_file, 'r', encoding='utf-8') as f:
-            text = f.read()
-
-        # 尝试解析角色信息
-        parser = CharacterParser()
-        parse_result = parser.parse_script(text)
-
-        voice_assignments = None
-
-        if parse_result['characters']:
-            # 有角色列表，使用智能声音匹配
-            characters = parse_result['characters']
-            matcher = VoiceMatcher()
-            voice_assignments = matcher.assign_voices(characters)
+        ir = SegmentIR(input_file, 'drama_to_audio_v2', self._ir_options())
+        segments, meta = ir.load_or_compile(self.compile_script, self.use_ir_cache)
+        characters = meta['characters']
+        voice_assignments = meta['voice_assignments']
 
+        if characters:
             print(f"\n[INFO] 识别到 {len(characters)} 个角色")
             for name, info in characters.items():
                 print(f"  - {name}: {info['gender']}, {info['age']}, {info['personality']}")
@@ -396,18 +521,10 @@ class SmartDramaToAudio:
             for name, assignment in voice_assignments.items():
                 rate_str = f" 语速{assignment['rate']}" if assignment['rate'] != '+0%' else ""
                 print(f"  {name}: {assignment['voice_description']}{rate_str}")
-
-            # 过滤掉角色列表部分
-            if parse_result['role_list_end'] != -1:
-                lines = text.split('\n')
-                text = '\n'.join(lines[parse_result['role_list_end'] + 1:])
         else:
             print("\n[WARN] 未识别到角色列表，使用默认声音映射")
             print(f"[INFO] 对话前{'会' if self.add_name_prompt else '不会'}添加角色名")
 
-        # 解析脚本
-        segments = self.parse_script(text, voice_assignments)
-
         if not segments:
             print("[ERROR] 脚本中没有识别到对话内容")
             print("[INFO] 请检查脚本格式是否正确")
@@ -415,8 +532,17 @@ class SmartDramaToAudio:
 
         print(f"\n[INFO] 识别到 {len(segments)} 个对话片段")
 
-        # 生成音频
-        return await self.generate_audio(segments, output_file, voice_assignments)
+        # 生成音频（结束后关闭后端持有的HTTP会话）
+        try:
+            success = await self.generate_audio(segments, output_file, voice_assignments)
+        finally:
+            await self.backend.close()
+
+        if self.metrics is not None:
+            self.metrics.print_summary()
+            self.metrics.save(Path(output_file).with_suffix('.metrics.json'), self.prometheus_file)
+
+        return success
 
 
 def main():
@@ -433,6 +559,21 @@ def main():
 
   # 不使用语速调整
   python drama_to_audio_v2.py 脚本.md 广播剧.mp3 --no-speed-adjustment
+
+  # 同时合成8个片段
+  python drama_to_audio_v2.py 脚本.md 广播剧.mp3 --concurrency 8
+
+  # 使用合成缓存（修改脚本后只重新合成改动的台词）
+  python drama_to_audio_v2.py 脚本.md 广播剧.mp3 --cache-dir .tts_cache
+
+  # 忽略上次的片段清单，重新合成全部片段
+  python drama_to_audio_v2.py 脚本.md 广播剧.mp3 --full-render
+
+  # 长篇: 按章节并行渲染，4个章节同时进行
+  python drama_to_audio_v2.py 脚本.md 广播剧.mp3 --chapters --jobs 4
+
+  # 使用自定义角色特征词库
+  python drama_to_audio_v2.py 脚本.md 广播剧.mp3 --lexicon 词库.json
         """
     )
 
@@ -442,17 +583,144 @@ def main():
                        help='不在对话前添加角色名提示')
     parser.add_argument('--no-speed-adjustment', action='store_true',
                        help='不使用性格语速调整')
+    parser.add_argument('--concurrency', type=int, default=4,
+                       help='同时合成的片段数（默认: 4）')
+    parser.add_argument('--max-retries', type=int, default=3,
+                       help='片段合成失败后的最大重试次数（默认: 3）')
+    parser.add_argument('--cache-dir', default=None,
+                       help='合成缓存目录（相同声音、语速、文本只合成一次）')
+    parser.add_argument('--cache-max-mb', type=int, default=2048,
+                       help='合成缓存容量上限，单位MB（默认: 2048）')
+    parser.add_argument('--full-render', action='store_true',
+                       help='忽略上次的片段清单，重新合成全部片段')
+    parser.add_argument('--chapters', action='store_true',
+                       help='按章节标题切分，各章在独立进程中并行渲染（中断后重新运行只渲染未完成的章节）')
+    parser.add_argument('--jobs', type=int, default=2,
+                       help='按章节渲染时同时渲染的章节数（默认: 2）')
+    parser.add_argument('--no-join', action='store_true',
+                       help='按章节渲染时只输出各章音频，不合并')
+    parser.add_argument('--lexicon', default=None,
+                       help='角色特征词库（JSON），补充识别性别、年龄、性格的关键词')
+    parser.add_argument('--chunk-chars', type=int, default=DEFAULT_CHUNK_CHARS,
+                       help=f'长片段按句切分并发合成的分块长度，0表示不切分（默认: {DEFAULT_CHUNK_CHARS}）')
+    parser.add_argument('--pack-chars', type=int, default=DEFAULT_PACK_CHARS,
+                       help=f'相邻的同声音短片段合并为一个请求的最大字符数，0表示不合并（默认: {DEFAULT_PACK_CHARS}）')
+    parser.add_argument('--no-ir-cache', action='store_true',
+                       help='忽略脚本旁的片段IR（<脚本>.ir.json），重新识别角色和解析脚本')
+    parser.add_argument('--adaptive', action='store_true',
+                       help='自适应限流: 按服务端的限流响应（429/503、超时）自动调整请求速率和并发')
+    parser.add_argument('--local-rate', action='store_true',
+                       help='以原速合成后在本地变速（不变调，需要NumPy；MP3还需要ffmpeg），各语速共用同一份合成缓存')
+    parser.add_argument('--tts-config', default=None,
+                       help='TTS配置文件（如 tts_config.yaml），按其中的 default_backend 和后端设置创建后端（默认使用Edge TTS）')
+    parser.add_argument('--metrics-prom', default=None,
+                       help='同时导出Prometheus文本格式的合成指标（JSON摘要总是保存为 <输出>.metrics.json）')
 
     args = parser.parse_args()
 
-    # 创建生成器
-    generator = SmartDramaToAudio(
-        add_name_prompt=not args.no_name_prompt,
-        use_speed_adjustment=not args.no_speed_adjustment
+    options = {
+        'add_name_prompt': not args.no_name_prompt,
+        'use_speed_adjustment': not args.no_speed_adjustment,
+        'concurrency': args.concurrency,
+        'max_retries': args.max_retries,
+        'cache_dir': args.cache_dir,
+        'cache_max_bytes': args.cache_max_mb * 1024 * 1024,
+        'incremental': not args.full_render,
+        'lexicon': os.path.abspath(args.lexicon) if args.lexicon else None,
+        'use_ir_cache': not args.no_ir_cache,
+        'chunk_chars': args.chunk_chars,
+        'pack_chars': args.pack_chars,
+        'adaptive': args.adaptive,
+        'local_rate': args.local_rate,
+        'metrics_prom': os.path.abspath(args.metrics_prom) if args.metrics_prom else None,
+        'tts_config': os.path.abspath(args.tts_config) if args.tts_config else None,
+    }
+
+    if args.chapters:
+        success = render_chapters(args.input, args.output, options, jobs=args.jobs, join=not args.no_join)
+    else:
+        success = asyncio.run(create_generator(options).generate(args.input, args.output))
+
+    sys.exit(0 if success else 1)
+
+
+def create_generator(options: dict) -> SmartDramaToAudio:
+    """按命令行参数创建生成器"""
+    metrics = SynthesisMetrics()
+    backend_options = dict(
+        cache_dir=options['cache_dir'],
+        cache_max_bytes=options['cache_max_bytes'],
+        adaptive=options.get('adaptive', False),
+        metrics=metrics,
+        local_rate=options.get('local_rate', False)
+    )
+    if options.get('tts_config'):
+        backend = TTSFactory.create_from_config(options['tts_config'], **backend_options)
+    else:
+        backend = TTSFactory.create_backend('edge', **backend_options)
+
+    return SmartDramaToAudio(
+        add_name_prompt=options['add_name_prompt'],
+        use_speed_adjustment=options['use_speed_adjustment'],
+        concurrency=options['concurrency'],
+        max_retries=options['max_retries'],
+        backend=backend,
+        incremental=options['incremental'],
+        lexicon_file=options.get('lexicon'),
+        use_ir_cache=options.get('use_ir_cache', True),
+        chunk_chars=options.get('chunk_chars', DEFAULT_CHUNK_CHARS),
+        pack_chars=options.get('pack_chars', DEFAULT_PACK_CHARS),
+        metrics=metrics,
+        prometheus_file=options.get('metrics_prom')
     )
 
-    # 生成音频
-    asyncio.run(generator.generate(args.input, args.output))
+
+def render_chapter(input_file: str, output_file: str, options: dict) -> bool:
+    """渲染单个章节（在子进程中执行）"""
+    # 各章导出到自己的 .prom 文件，由父进程合并
+    if options.get('metrics_prom'):
+        options = dict(options, metrics_prom=str(Path(output_file).with_suffix('.prom')))
+    return asyncio.run(create_generator(options).generate(input_file, output_file))
+
+
+def render_chapters(input_file: str, output_file: str, options: dict, jobs: int = 2, join: bool = True) -> bool:
+    """
+    按章节并行渲染
+
+    角色列表拼接在每章开头，保证各章声音分配一致
+
+    Args:
+        input_file: 输入脚本文件
+        output_file: 最终输出的音频文件
+        options: 生成器参数
+        jobs: 同时渲染的章节数
+        join: 是否合并为一个文件
+
+    Returns:
+        是否全部成功
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    lines = text.split('\n')
+    role_list_end = CharacterParser(options.get('lexicon')).parse_script(text)['role_list_end']
+    header = '\n'.join(lines[:role_list_end + 1]) if role_list_end != -1 else ''
+    body = '\n'.join(lines[role_list_end + 1:]) if role_list_end != -1 else text
+
+    chapters = split_chapters(body)
+    # 章节哈希只覆盖影响音频的参数（词库按内容），调整并发、缓存、限流后重新运行不会重新渲染已完成的章节
+    audio_options = {
+        'add_name_prompt': options['add_name_prompt'],
+        'use_speed_adjustment': options['use_speed_adjustment'],
+        'lexicon': file_digest(options.get('lexicon')),
+        'chunk_chars': options.get('chunk_chars', DEFAULT_CHUNK_CHARS),
+        'pack_chars': options.get('pack_chars', DEFAULT_PACK_CHARS),
+        'local_rate': options.get('local_rate', False),
+        'tts_config': file_digest(options.get('tts_config')),
+    }
+    renderer = ChapterRenderer(output_file, render_chapter, options, jobs=jobs, source_suffix='.md',
+                               prometheus_file=options.get('metrics_prom'), audio_options=audio_options)
+    return renderer.render(chapters, header=header, join=join)
 
 
 if __name__ == '__main__':
@@ -8,6 +8,7 @@
 import re
 import sys
 import argparse
+from segment_ir import SegmentIR
 
 class DialogueExtractor:
     def __init__(self, skip_role_list=True, min_dialogue_len=80):
@@ -20,16 +21,33 @@ class DialogueExtractor:
         """
         self.skip_role_list = skip_role_list
         self.min_dialogue_len = min_dialogue_len
-        self.in_role_list = True  # 是否在角色列表部分
 
-    def extract_dialogues(self, input_file):
-        """从脚本中提取对话"""
-        with open(input_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+    def extract_dialogues(self, input_file, use_cache=True):
+        """
+        从脚本中提取对话
+
+        提取结果保存为脚本旁的IR（<脚本>.ir.json），脚本和参数未变化时直接读取
+
+        Args:
+            input_file: 脚本文件
+            use_cache: 是否使用IR缓存
+
+        Returns:
+            对话列表 [{speaker, voice, rate, text, span}]，声音和语速留空由合成工具分配
+        """
+        ir = SegmentIR(input_file, 'extract_dialogues_v2', {
+            'skip_role_list': self.skip_role_list,
+            'min_dialogue_len': self.min_dialogue_len,
+        })
+        dialogues, _ = ir.load_or_compile(lambda text: (self.compile_dialogues(text), {}), use_cache)
+        return dialogues
 
+    def compile_dialogues(self, text):
+        """把脚本文本编译为对话列表"""
         dialogues = []
+        in_role_list = True  # 是否在角色列表部分
 
-        for line in lines:
+        for line_number, line in enumerate(text.split('\n'), 1):
             line = line.strip()
 
             # 匹配【角色名】对话内容格式
@@ -39,10 +57,10 @@ class DialogueExtractor:
                 dialogue = match.group(2)
 
                 # 检查是否是角色列表部分
-                if self.skip_role_list and self.in_role_list:
+                if self.skip_role_list and in_role_list:
                     # 遇到第一个长对话，说明角色列表结束
                     if len(dialogue) >= self.min_dialogue_len:
-                        self.in_role_list = False
+                        in_role_list = False
                     else:
                         # 仍在角色列表部分，跳过
                         continue
@@ -52,8 +70,11 @@ class DialogueExtractor:
 
                 if dialogue:
                     dialogues.append({
-                        'role': role,
-                        'text': dialogue
+                        'speaker': role,
+                        'voice': None,
+                        'rate': None,
+                        'text': dialogue,
+                        'span': [line_number, line_number]
                     })
 
         return dialogues
@@ -66,10 +87,7 @@ class DialogueExtractor:
             # 去除多余空格
             text = ' '.join(d['text'].split())
 
-            optimized.append({
-                'role': d['role'],
-                'text': text
-            })
+            optimized.append(dict(d, text=text))
 
         return optimized
 
@@ -77,11 +95,11 @@ class DialogueExtractor:
         """保存对话到文件"""
         with open(output_file, 'w', encoding='utf-8') as f:
             for d in dialogues:
-                f.write(f"【{d['role']}】{d['text']}\n")
+                f.write(f"【{d['speaker']}】{d['text']}\n")
 
     def get_stats(self, dialogues):
         """获取对话统计信息"""
-        roles = set(d['role'] for d in dialogues)
+        roles = set(d['speaker'] for d in dialogues)
 
         stats = {
             'total': len(dialogues),
@@ -104,6 +122,8 @@ def main():
                        help='判断为对话的最小长度（默认：80字）')
     parser.add_argument('--no-replace-colons', action='store_true',
                        help='不替换冒号为逗号')
+    parser.add_argument('--no-ir-cache', action='store_true',
+                       help='忽略脚本旁的IR缓存（<脚本>.ir.json），重新提取')
 
     args = parser.parse_args()
 
@@ -118,7 +138,7 @@ def main():
     )
 
     # 提取对话
-    dialogues = extractor.extract_dialogues(args.input)
+    dialogues = extractor.extract_dialogues(args.input, use_cache=not args.no_ir_cache)
 
     # 如果不替换冒号
     if args.no_replace_colons:
@@ -144,7 +164,7 @@ def main():
     print(f"\n[预览] 前5条对话:")
     for i, d in enumerate(dialogues[:5], 1):
         preview = d['text'][:60] + '...' if len(d['text']) > 60 else d['text']
-        print(f"  {i}. 【{d['role']}】{preview}")
+        print(f"  {i}. 【{d['speaker']}】{preview}")
 
     print(f"\n[提示] 下一步，使用以下命令生成音频:")
     print(f"  python drama_to_audio.py {args.output} 输出音频.mp3")
@@ -5,78 +5,26 @@
 显示每段对话及其识别的说话人，允许手动修正
 """
 
-import re
 import json
 from pathlib import Path
 import sys
 
+from dialogue_attribution import DialogueAttributor, SPEECH_VERBS, EXTENDED_SPEECH_VERBS
+
 
 def extract_dialogues_with_speakers(text):
     """
     提取所有对话及其识别的说话人
+
+    依次检查同一行中的"XX说"、前3行中的"XX说"，都没有时沿用上一个说话人（默认是主角/旁白）
     """
-    lines = text.split('\n')
-    dialogues = []
-
-    # 当前说话人（默认是主角/旁白）
-    current_speaker = '我（旁白）'
-
-    for i, line in enumerate(lines, 1):
-        # 查找对话
-        pattern = r'[「『]([^「」『』]+)[」』]'
-        matches = re.finditer(pattern, line)
-
-        for match in matches:
-            dialogue_text = match.group(1)
-            full_line = line
-
-            # 尝试识别说话人
-            speaker = None
-
-            # 策略1: 同一行中的"XX说"
-            before = full_line[:full_line.find(dialogue_text)]
-            after = full_line[full_line.find(dialogue_text) + len(dialogue_text):]
-
-            # 检查对话前
-            speaker_match_before = re.search(r'(\w{2,4})(说|道|问|喊|笑道|解释|回答|嘟囔|摊摊手|平静地)', before)
-            if speaker_match_before:
-                speaker = speaker_match_before.group(1)
-
-            # 检查对话后
-            if not speaker:
-                speaker_match_after = re.search(r'(\w{2,4})(说|道|问|喊|笑道|解释|回答)', after)
-                if speaker_match_after:
-                    speaker = speaker_match_after.group(1)
-
-            # 策略2: 如果没找到，查看前几行
-            if not speaker:
-                for j in range(max(0, i-3), i):
-                    context_line = lines[j]
-                    speaker_match = re.search(r'(\w{2,4})(说|道|问|喊|笑道|解释|回答)', context_line)
-                    if speaker_match:
-                        speaker = speaker_match.group(1)
-                        break
-
-            # 如果还是没找到，使用当前说话人
-            if not speaker:
-                speaker = current_speaker
-
-            # 特殊处理：如果是"我"，标记为旁白
-            if speaker == '我':
-                speaker = '我（旁白）'
-
-            dialogues.append({
-                'line_number': i,
-                'speaker': speaker,
-                'dialogue': dialogue_text,
-                'full_line': full_line.strip()
-            })
-
-            # 如果有明确的说话人，更新当前说话人
-            if speaker and speaker != '我（旁白）':
-                current_speaker = speaker
-
-    return dialogues
+    attributor = DialogueAttributor(
+        before_verbs=EXTENDED_SPEECH_VERBS,
+        after_verbs=SPEECH_VERBS,
+        lookback_lines=3,
+        sticky=True
+    )
+    return attributor.attribute(text)
 
 
 def load_character_config(config_file):
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+角色性别共现索引
+扫描一遍全文，统计每个角色名前后窗口内的他/她和性别名词，
+一次得到所有角色的性别和置信度，耗时与文本长度成线性关系，与角色数量基本无关
+"""
+
+import re
+from typing import Dict, Iterable, Tuple
+
+
+# 女性线索（代词和性别名词）
+FEMALE_WORDS = ['她', '姐姐', '妹妹', '少女', '女孩', '小姐', '女王', '妈', '娘', '女']
+
+# 男性线索
+MALE_WORDS = ['他', '哥哥', '弟弟', '少年', '男孩', '先生', '国王', '学长', '爸', '爹', '男']
+
+# 复数和泛指，不计入（按最长匹配，避免其中的他/她被单独计数）
+NEUTRAL_WORDS = ['他们', '她们', '其他', '他人', '其她']
+
+# 默认窗口: 角色名前后各20个字符
+DEFAULT_WINDOW = 20
+
+FEMALE = 1
+MALE = -1
+NEUTRAL = 0
+
+
+class GenderIndex:
+    """角色性别共现索引"""
+
+    def __init__(self, text: str, names: Iterable[str], window: int = DEFAULT_WINDOW):
+        """
+        扫描全文建立索引
+
+        Args:
+            text: 全文
+            names: 角色名列表
+            window: 线索与角色名的最大距离（字符数）
+        """
+        self.window = window
+        self.names = [name for name in dict.fromkeys(names) if name]
+        self.mentions = {name: 0 for name in self.names}
+        self.female = {name: 0 for name in self.names}
+        self.male = {name: 0 for name in self.names}
+
+        # 角色名和线索词合成一个正则，按长度从长到短交替，同一位置优先匹配较长的词；
+        # 角色名与线索词相同时（如角色就叫"国王"）按角色名处理
+        tokens = {word: FEMALE for word in FEMALE_WORDS}
+        tokens.update({word: MALE for word in MALE_WORDS})
+        tokens.update({word: NEUTRAL for word in NEUTRAL_WORDS})
+        tokens.update({name: name for name in self.names})
+
+        if self.names:
+            pattern = re.compile('|'.join(map(re.escape, sorted(tokens, key=len, reverse=True))))
+            self._scan(text, pattern, tokens)
+
+    def _scan(self, text: str, pattern: re.Pattern, tokens: Dict):
+        """
+        按出现顺序处理角色名和线索词
+
+        代词通常指向前面最近提到的角色: 每个线索计入窗口内前一个角色名，
+        前面窗口内没有角色名时计入窗口内后一个角色名
+        """
+        window = self.window
+        female, male, mentions = self.female, self.male, self.mentions
+
+        last_name = None
+        last_end = 0
+        pending = []  # 前面没有角色名的线索 [(位置, 类型)]
+
+        for match in pattern.finditer(text):
+            kind = tokens[match.group()]
+            if kind == NEUTRAL:
+                continue
+
+            start = match.start()
+            if kind == FEMALE or kind == MALE:
+                if last_name is not None and start - last_end < window:
+                    counter = female if kind == FEMALE else male
+                    counter[last_name] += 1
+                else:
+                    pending.append((start, kind))
+                continue
+
+            # 角色名
+            mentions[kind] += 1
+            for position, cue in pending:
+                if start - position <= window:
+                    counter = female if cue == FEMALE else male
+                    counter[kind] += 1
+            pending = []
+            last_name = kind
+            last_end = match.end()
+
+    def counts(self, name: str) -> Tuple[int, int]:
+        """角色名附近的 (女性线索数, 男性线索数)"""
+        return self.female.get(name, 0), self.male.get(name, 0)
+
+    def gender(self, name: str) -> Tuple[str, str]:
+        """
+        推断单个角色的性别
+
+        Args:
+            name: 角色名
+
+        Returns:
+            (性别, 置信度)，性别为'男'/'女'/'未知'，置信度为'高'/'中'/'低'；
+            一方线索超过另一方两倍时置信度为高
+        """
+        female, male = self.counts(name)
+
+        if female > male * 2:
+            return '女', '高'
+        elif male > female * 2:
+            return '男', '高'
+        elif female > male:
+            return '女', '中'
+        elif male > female:
+            return '男', '中'
+        else:
+            return '未知', '低'
+
+    def genders(self) -> Dict[str, Tuple[str, str]]:
+        """所有角色的 {角色名: (性别, 置信度)}"""
+        return {name: self.gender(name) for name in self.names}
@@ -7,10 +7,16 @@
 
 import re
 import json
-import edge_tts
 import asyncio
+import argparse
 from pathlib import Path
 import sys
+from bisect import bisect_right
+from tts_factory import TTSFactory, CachedTTSBackend
+from tts_metrics import SynthesisMetrics
+from audio_assembler import MP3Assembler
+from clip_pack import scratch_pack
+from segment_ir import SegmentIR, line_starts
 
 
 # 角色声音配置
@@ -24,49 +30,81 @@ CHARACTER_VOICES = {
 }
 
 
-def parse_markdown_script(script_file):
+def parse_markdown_script(script_file, use_cache=True):
     """
     解析Markdown格式的广播剧文稿
+
+    Args:
+        script_file: 文稿文件
+        use_cache: 是否使用文稿旁的IR缓存（文稿未修改时不再重新解析）
+
+    Returns:
+        片段列表 [{speaker, voice, rate, text, span, index}]
+    """
+    ir = SegmentIR(script_file, 'markdown_script', {'voices': CHARACTER_VOICES})
+    segments, _ = ir.load_or_compile(lambda content: (compile_markdown_script(content), {}), use_cache)
+    return segments
+
+
+def compile_markdown_script(content):
     """
-    with open(script_file, 'r', encoding='utf-8') as f:
-        content = f.read()
+    把Markdown文稿文本编译为片段列表
 
+    格式：### [序号] 第XX行 - **角色名**，下一行为 **对话**：内容
+    """
     segments = []
+    starts = line_starts(content)
 
     # 提取对话片段
-    # 格式：### [序号] 第XX行 - **角色名**
     pattern = r'###\s*\[(\d+)\].*?\*\*(.+?)\*\*\s*\n\s*\*\*对话\*\*：([^\n]+)'
 
-    matches = re.findall(pattern, content)
-
-    for match in matches:
-        index = int(match[0])
-        speaker = match[1].strip()
-        dialogue = match[2].strip()
+    for match in re.finditer(pattern, content):
+        index = int(match.group(1))
+        speaker = match.group(2).strip()
+        dialogue = match.group(3).strip()
 
         segments.append({
-            'index': index,
             'speaker': speaker,
-            'dialogue': dialogue
+            'voice': get_voice_for_speaker(speaker),
+            'rate': '+0%',
+            'text': dialogue,
+            'span': [bisect_right(starts, match.start()), bisect_right(starts, match.end() - 1)],
+            'index': index
         })
 
     return segments
 
 
-def parse_json_script(script_file):
+def parse_json_script(script_file, use_cache=True):
     """
     解析JSON格式的广播剧文稿
+
+    Args:
+        script_file: 文稿文件
+        use_cache: 是否使用文稿旁的IR缓存
+
+    Returns:
+        片段列表 [{speaker, voice, rate, text, span, index}]，JSON文稿没有行范围（span为None）
     """
-    with open(script_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    ir = SegmentIR(script_file, 'json_script', {'voices': CHARACTER_VOICES})
+    segments, _ = ir.load_or_compile(lambda content: (compile_json_script(content), {}), use_cache)
+    return segments
+
+
+def compile_json_script(content):
+    """把JSON文稿文本编译为片段列表"""
+    data = json.loads(content)
 
     segments = []
 
     for i, seg in enumerate(data['segments'], 1):
         segments.append({
-            'index': i,
             'speaker': seg['speaker'],
-            'dialogue': seg['dialogue']
+            'voice': get_voice_for_speaker(seg['speaker']),
+            'rate': '+0%',
+            'text': seg['dialogue'],
+            'span': None,
+            'index': i
         })
 
     return segments
@@ -87,62 +125,103 @@ def get_voice_for_speaker(speaker):
     return CHARACTER_VOICES['和也']
 
 
-async def generate_audio_segments(segments, temp_dir):
+async def generate_audio_segments(segments, pack, backend=None):
     """
-    生成所有音频片段
+    生成所有音频片段，依次追加到片段包
+
+    Returns:
+        成功生成的片段数
     """
-    audio_files = []
+    if backend is None:
+        backend = TTSFactory.create_backend('edge')
+
+    generated = 0
 
     for i, seg in enumerate(segments):
         speaker = seg['speaker']
-        dialogue = seg['dialogue']
+        dialogue = seg['text']
 
-        # 获取声音
-        voice = get_voice_for_speaker(speaker)
+        # 获取声音（IR中已解析）
+        voice = seg.get('voice') or get_voice_for_speaker(speaker)
 
         print(f"[{i+1}/{len(segments)}] {speaker}: {dialogue[:40]}...")
 
         # 生成音频
-        temp_file = Path(temp_dir) / f"segment_{i:04d}.mp3"
-
         try:
-            communicate = edge_tts.Communicate(dialogue, voice)
-            await communicate.save(str(temp_file))
-            audio_files.append(str(temp_file))
+            audio = await backend.synthesize(dialogue, voice)
+            if not audio:
+                raise RuntimeError('未返回音频数据')
+            pack.put(f"segment_{i:04d}", audio)
+            generated += 1
         except Exception as e:
             print(f"[ERROR] 片段 {i+1} 生成失败: {e}")
 
-    return audio_files
+    if isinstance(backend, CachedTTSBackend):
+        backend.cache.print_stats()
 
+    return generated
 
-def generate_ffmpeg_list(audio_files, list_file):
-    """生成ffmpeg合并列表"""
-    with open(list_file, 'w', encoding='utf-8') as f:
-        for audio_file in audio_files:
-            f.write(f"file '{Path(audio_file).absolute()}'\n")
 
+def merge_pack(pack, output_file):
+    """
+    按写入顺序顺序读取片段包，按MP3帧合并为输出文件
 
-async def main():
-    if len(sys.argv) < 2:
-        print("用法: python generate_audio_from_script.py <文稿文件>")
-        print("\n支持的格式：")
-        print("  - Markdown文稿 (*.md)")
-        print("  - JSON文稿 (*.json)")
-        print("\n示例：")
-        print("  python generate_audio_from_script.py 科幻小说_广播剧文稿.md")
-        print("  python generate_audio_from_script.py 科幻小说_广播剧文稿.json")
-        sys.exit(1)
+    Returns:
+        是否成功
+    """
+    try:
+        with MP3Assembler(output_file) as assembler:
+            for _, clip in pack.items():
+                assembler.add(clip)
+    except Exception as e:
+        print(f"[ERROR] 合并失败: {e}")
+        return False
 
-    script_file = sys.argv[1]
+    print(f"[OK] 音频已生成: {output_file}")
+
+    # 获取文件大小
+    file_size = Path(output_file).stat().st_size / (1024 * 1024)
+    print(f"[INFO] 文件大小: {file_size:.1f} MB")
+    return True
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description='根据广播剧文稿生成音频',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+支持的格式：
+  - Markdown文稿 (*.md)
+  - JSON文稿 (*.json)
+
+示例：
+  python generate_audio_from_script.py 科幻小说_广播剧文稿.md
+  python generate_audio_from_script.py 科幻小说_广播剧文稿.json
+  python generate_audio_from_script.py 科幻小说_广播剧文稿.md --cache-dir .tts_cache
+        """
+    )
+    parser.add_argument('script', help='文稿文件')
+    parser.add_argument('--cache-dir', default=None,
+                        help='合成缓存目录（相同声音、语速、文本只合成一次）')
+    parser.add_argument('--cache-max-mb', type=int, default=2048,
+                        help='合成缓存容量上限，单位MB（默认: 2048）')
+    parser.add_argument('--no-ir-cache', action='store_true',
+                        help='忽略文稿旁的IR缓存（<文稿>.ir.json），重新解析文稿')
+    parser.add_argument('--metrics-prom', default=None,
+                        help='同时导出Prometheus文本格式的合成指标（JSON摘要总是保存为 <输出>.metrics.json）')
+
+    args = parser.parse_args()
+
+    script_file = args.script
     script_path = Path(script_file)
 
     print(f"[INFO] 读取文稿: {script_file}")
 
     # 解析文稿
     if script_path.suffix == '.json':
-        segments = parse_json_script(script_file)
+        segments = parse_json_script(script_file, use_cache=not args.no_ir_cache)
     else:
-        segments = parse_markdown_script(script_file)
+        segments = parse_markdown_script(script_file, use_cache=not args.no_ir_cache)
 
     print(f"[INFO] 共 {len(segments)} 个对话片段")
 
@@ -164,50 +243,33 @@ async def main():
     # 生成音频
     print(f"\n[INFO] 开始生成音频...")
 
-    import tempfile
-    temp_dir = tempfile.mkdtemp()
-
-    audio_files = await generate_audio_segments(segments, temp_dir)
-
-    print(f"\n[INFO] 成功生成 {len(audio_files)} 个音频片段")
+    metrics = SynthesisMetrics()
+    backend = TTSFactory.create_backend(
+        'edge',
+        cache_dir=args.cache_dir,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+        metrics=metrics
+    )
 
     # 生成输出文件
     output_file = script_path.parent / (script_path.stem.replace('_广播剧文稿', '') + '_最终版.mp3')
 
-    # 生成ffmpeg列表
-    list_file = script_path.parent / (output_file.stem + '_file_list.txt')
-    generate_ffmpeg_list(audio_files, list_file)
+    # 片段依次追加到输出旁的临时片段包
+    pack = scratch_pack(output_file)
+    generated = await generate_audio_segments(segments, pack, backend)
 
-    print(f"\n[INFO] 音频片段列表: {list_file}")
+    print(f"\n[INFO] 成功生成 {generated} 个音频片段")
 
-    # 使用ffmpeg合并
-    print(f"\n[INFO] 正在合并音频...")
-    import subprocess
-
-    try:
-        result = subprocess.run([
-            'ffmpeg',
-            '-f', 'concat',
-            '-safe', '0',
-            '-i', str(list_file),
-            '-c', 'copy',
-            str(output_file)
-        ], capture_output=True, text=True, timeout=120)
-
-        if result.returncode == 0:
-            print(f"[OK] 音频已生成: {output_file}")
-
-            # 获取文件大小
-            file_size = output_file.stat().st_size / (1024 * 1024)
-            print(f"[INFO] 文件大小: {file_size:.1f} MB")
-        else:
-            print(f"[ERROR] 合并失败")
-            print(result.stderr)
+    metrics.print_summary()
+    metrics.save(output_file.with_suffix('.metrics.json'), args.metrics_prom)
 
-    except Exception as e:
-        print(f"[ERROR] 合并失败: {e}")
-        print(f"\n[INFO] 请手动合并：")
-        print(f"ffmpeg -f concat -safe 0 -i {list_file} -c copy {output_file}")
+    # 顺序读取片段包合并
+    print(f"\n[INFO] 正在合并音频...")
+    if merge_pack(pack, output_file):
+        pack.remove()
+    else:
+        pack.close()
+        print(f"[INFO] 音频片段保存在: {pack.path}")
 
 
 if __name__ == '__main__':
@@ -5,11 +5,12 @@
 第一步：生成可编辑的文稿，标注每段对话的说话人
 """
 
-import re
 import json
 from pathlib import Path
 import sys
 
+from dialogue_attribution import DialogueAttributor, SPEECH_VERBS
+
 
 # 角色特征词汇
 CHARACTER_KEYWORDS = {
@@ -44,125 +45,26 @@ def extract_dialogues_with_speakers(text):
     """
     提取对话并识别说话人
     """
-    lines = text.split('\n')
-    script_segments = []
-
-    for i, line in enumerate(lines, 1):
-        # 查找对话
-        pattern = r'[「『]([^「」『』]+)[」』]'
-        matches = re.finditer(pattern, line)
-
-        for match in matches:
-            dialogue_text = match.group(1)
-
-            # 识别说话人
-            speaker = identify_speaker(text, i, dialogue_text, lines)
+    attributor = DialogueAttributor(
+        CHARACTER_KEYWORDS,
+        before_verbs=SPEECH_VERBS,
+        context_threshold=3,
+        narrator='旁白',
+        unknown_speaker='旁白'
+    )
 
-            script_segments.append({
-                'line_number': i,
-                'speaker': speaker,
-                'dialogue': dialogue_text,
-                'context': line.strip()
-            })
+    script_segments = []
+    for dialogue in attributor.attribute(text):
+        script_segments.append({
+            'line_number': dialogue['line_number'],
+            'speaker': dialogue['speaker'],
+            'dialogue': dialogue['dialogue'],
+            'context': dialogue['full_line']
+        })
 
     return script_segments
 
 
-def identify_speaker(text, line_num, dialogue_text, lines):
-    """
-    多策略识别说话人
-    """
-
-    # 策略1: 内容特征分析（优先级最高）
-    content_result = identify_by_content(dialogue_text)
-    if content_result:
-        return content_result
-
-    # 策略2: 同一行的说话人标识
-    same_line_result = identify_by_same_line(lines[line_num - 1], dialogue_text)
-    if same_line_result:
-        return same_line_result
-
-    # 策略3: 上下文分析（前后5行）
-    context_result = identify_by_context(lines, line_num)
-    if context_result:
-        return context_result
-
-    # 默认：旁白
-    return '旁白'
-
-
-def identify_by_content(dialogue_text):
-    """根据对话内容特征识别说话人"""
-    scores = {}
-
-    for char_name, char_info in CHARACTER_KEYWORDS.items():
-        score = 0
-        for keyword in char_info['keywords']:
-            if keyword in dialogue_text:
-                score += 1
-        scores[char_name] = score
-
-    # 需要至少2个特征词才确定
-    max_score = max(scores.values())
-    if max_score >= 2:
-        return max(scores, key=scores.get)
-
-    return None
-
-
-def identify_by_same_line(line, dialogue_text):
-    """检查同一行的说话人标识"""
-    before = line[:line.find(dialogue_text)]
-
-    # 对话前的"XX说"
-    speaker_match = re.search(r'(\w{2,4})(说|道|问|喊|笑道|解释|回答)', before)
-    if speaker_match:
-        name = speaker_match.group(1)
-        return normalize_character_name(name)
-
-    return None
-
-
-def identify_by_context(lines, line_num):
-    """检查上下文"""
-    start = max(0, line_num - 6)
-    end = min(len(lines), line_num + 5)
-
-    mentions = {}
-
-    for i in range(start, end):
-        if i == line_num - 1:
-            continue
-
-        line = lines[i]
-
-        for char_name, char_info in CHARACTER_KEYWORDS.items():
-            for variation in char_info['name_variations']:
-                if variation in line:
-                    weight = 3 if i >= line_num - 2 else 1
-                    mentions[char_name] = mentions.get(char_name, 0) + weight
-
-    if mentions:
-        max_char = max(mentions, key=mentions.get)
-        if mentions[max_char] >= 3:
-            return max_char
-
-    return None
-
-
-def normalize_character_name(name):
-    """标准化角色名"""
-    if '和也' in name:
-        return '和也'
-    elif '星空' in name:
-        return '星月星空'
-    elif name == '艾米':
-        return '艾米'
-    else:
-        return '旁白'
-
-
 def generate_markdown_script(script_segments, output_file):
     """生成Markdown格式的广播剧文稿"""
 
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GPT-SoVITS模拟服务
+模拟 /tts、/tts/batch 和 /health 接口，返回与文本长度相符的静音MP3，
+用于在没有部署GPT-SoVITS的环境下测试后端、连接池和并发控制；
+可以模拟服务容量（超过并发或速率上限时返回429）和随机限流，用于测试自适应限流；
+把 state.healthy 设为False可以模拟节点故障（/health 返回503，合成请求返回500），用于测试服务池
+"""
+
+import json
+import time
+import base64
+import sys
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from audio_assembler import make_silence
+
+
+# 每个字的朗读时长（秒）
+SECONDS_PER_CHAR = 0.25
+
+
+class StubState:
+    """模拟服务的配置和统计数据"""
+
+    def __init__(self, latency: float = 0.0, capacity: int = 0, rate_limit: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 0.0):
+        self.latency = latency
+        self.capacity = capacity
+        self.rate_limit = rate_limit
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.healthy = True
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+
+        # 服务端令牌桶（模拟按速率限流的网关）
+        self._tokens = max(1.0, rate_limit)
+        self._updated = time.monotonic()
+
+    def admit(self) -> bool:
+        """
+        判断是否接受一个合成请求（调用时需持有lock）
+
+        超过并发容量、超过速率上限或随机命中限流时拒绝
+        """
+        if self.capacity and self.active >= self.capacity:
+            return False
+
+        if self.rate_limit > 0:
+            now = time.monotonic()
+            self._tokens = min(max(1.0, self.rate_limit), self._tokens + (now - self._updated) * self.rate_limit)
+            self._updated = now
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+
+        return not (self.throttle_rate and random.random() < self.throttle_rate)
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'connections': self.connections,
+                'max_active': self.max_active,
+            }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """请求处理器"""
+
+    # 支持长连接
+    protocol_version = 'HTTP/1.1'
+
+    # 响应头和正文分开写出，关闭Nagle算法避免与延迟确认叠加出约40ms的额外延迟
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections += 1
+
+    def log_message(self, format, *args):
+        # 静默日志
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data: dict):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+    def do_GET(self):
+        if self.path == '/health':
+            if self.server.state.healthy:
+                self._send_json(200, {'status': 'ok'})
+            else:
+                self._send_json(503, {'status': 'unavailable'})
+        elif self.path == '/stats':
+            self._send_json(200, self.server.state.to_dict())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+
+        if self.path not in ('/tts', '/tts/batch'):
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            payload = json.loads(body)
+            items = payload['items'] if self.path == '/tts/batch' else [payload]
+            jobs = [(item['text'], float(item.get('speed', 1.0)) or 1.0) for item in items]
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f'bad request: {e}'})
+            return
+
+        state = self.server.state
+        if not state.healthy:
+            self._send_json(500, {'error': 'model not loaded'})
+            return
+
+        with state.lock:
+            state.requests += 1
+            admitted = state.admit()
+            if admitted:
+                state.active += 1
+                state.max_active = max(state.max_active, state.active)
+            else:
+                state.throttled += 1
+
+        if not admitted:
+            self.send_response(429)
+            body = json.dumps({'error': 'too many requests'}).encode('utf-8')
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if state.retry_after > 0:
+                self.send_header('Retry-After', f"{state.retry_after:g}")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        try:
+            if state.latency > 0:
+                time.sleep(state.latency)
+            audios = [make_silence(len(text) * SECONDS_PER_CHAR / speed) for text, speed in jobs]
+        finally:
+            with state.lock:
+                state.active -= 1
+
+        if self.path == '/tts/batch':
+            self._send_json(200, {'audios': [base64.b64encode(audio).decode('ascii') for audio in audios]})
+        else:
+            self._send(200, audios[0], 'audio/mpeg')
+
+
+class StubServer(ThreadingHTTPServer):
+    """模拟服务（客户端关闭长连接时不打印异常）"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def create_stub_server(host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, **limits) -> ThreadingHTTPServer:
+    """
+    创建模拟服务
+
+    Args:
+        host: 监听地址
+        port: 端口（0表示自动分配）
+        latency: 每个合成请求的模拟延迟（秒）
+        **limits: 模拟的服务容量（见 StubState）: capacity 最大并发、rate_limit 每秒请求数、
+                  throttle_rate 随机返回429的比例、retry_after 429响应的 Retry-After 秒数
+
+    Returns:
+        HTTP服务对象
+    """
+    server = StubServer((host, port), StubHandler)
+    server.state = StubState(latency, **limits)
+    return server
+
+
+def start_stub_server(host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, **limits):
+    """
+    在后台线程启动模拟服务
+
+    Returns:
+        (server, api_url)，用 server.shutdown() 停止
+    """
+    server = create_stub_server(host, port, latency, **limits)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GPT-SoVITS模拟服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认: 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=9882, help='端口（默认: 9882）')
+    parser.add_argument('--latency', type=float, default=0.5,
+                        help='每个合成请求的模拟延迟，单位秒（默认: 0.5）')
+    parser.add_argument('--capacity', type=int, default=0,
+                        help='最大并发请求数，超过时返回429（默认: 0，不限制）')
+    parser.add_argument('--rate-limit', type=float, default=0.0,
+                        help='每秒最多接受的合成请求数，超过时返回429（默认: 0，不限制）')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='随机返回429的比例（默认: 0）')
+    parser.add_argument('--retry-after', type=float, default=0.0,
+                        help='429响应的 Retry-After 秒数（默认: 0，不返回）')
+
+    args = parser.parse_args()
+
+    server = create_stub_server(args.host, args.port, args.latency, capacity=args.capacity,
+                                rate_limit=args.rate_limit, throttle_rate=args.throttle_rate,
+                                retry_after=args.retry_after)
+
+    print(f"[INFO] GPT-SoVITS模拟服务已启动: http://{args.host}:{args.port}")
+    print(f"[INFO] 接口: POST /tts, POST /tts/batch, GET /health, GET /stats")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n[INFO] 统计: {server.state.to_dict()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,12 +5,13 @@
 使用更智能的上下文分析
 """
 
-import re
 import json
-import edge_tts
 import asyncio
-from pathlib import Path
-from collections import defaultdict
+import argparse
+from tts_factory import TTSFactory, CachedTTSBackend
+from audio_assembler import MP3Assembler
+from clip_pack import scratch_pack
+from dialogue_attribution import DialogueAttributor, SPEECH_VERBS, EXTENDED_SPEECH_VERBS
 
 
 # 角色特征词汇
@@ -34,148 +35,13 @@ def extract_dialogues_with_context(text):
     """
     提取对话，使用改进的上下文分析
     """
-    lines = text.split('\n')
-    dialogues = []
-
-    for i, line in enumerate(lines, 1):
-        # 查找对话
-        pattern = r'[「『]([^「」『』]+)[」』]'
-        matches = re.finditer(pattern, line)
-
-        for match in matches:
-            dialogue_text = match.group(1)
-
-            # 多策略识别说话人
-            speaker = identify_speaker(text, i, dialogue_text, lines)
-
-            dialogues.append({
-                'line_number': i,
-                'speaker': speaker,
-                'dialogue': dialogue_text,
-                'full_line': line.strip()
-            })
-
-    return dialogues
-
-
-def identify_speaker(text, line_num, dialogue_text, lines):
-    """
-    使用多策略识别说话人
-    """
-
-    # 策略1: 检查对话内容特征
-    content_based_speaker = identify_by_content(dialogue_text)
-    if content_based_speaker:
-        return content_based_speaker
-
-    # 策略2: 检查同一行的说话人标识
-    speaker = identify_by_same_line(lines[line_num - 1], dialogue_text)
-    if speaker:
-        return speaker
-
-    # 策略3: 检查前后5行的上下文
-    speaker = identify_by_context(lines, line_num)
-    if speaker:
-        return speaker
-
-    # 默认：旁白
-    return '我（旁白）'
-
-
-def identify_by_content(dialogue_text):
-    """
-    根据对话内容识别说话人
-    """
-    scores = {}
-
-    for char_name, char_info in CHARACTER_KEYWORDS.items():
-        score = 0
-        for keyword in char_info['keywords']:
-            if keyword in dialogue_text:
-                score += 1
-        scores[char_name] = score
-
-    # 如果有明显的匹配（score >= 2）
-    max_score = max(scores.values())
-    if max_score >= 2:
-        return max(scores, key=scores.get)
-
-    return None
-
-
-def identify_by_same_line(line, dialogue_text):
-    """
-    检查同一行的说话人标识
-    """
-    # 对话前
-    before = line[:line.find(dialogue_text)]
-    speaker_match_before = re.search(r'(\w{2,4})(说|道|问|喊|笑道|解释|回答|嘟囔|摊摊手|平静地)', before)
-    if speaker_match_before:
-        name = speaker_match_before.group(1)
-        if name == '我':
-            return '我（旁白）'
-        return normalize_character_name(name)
-
-    # 对话后
-    after = line[line.find(dialogue_text) + len(dialogue_text):]
-    speaker_match_after = re.search(r'(\w{2,4})(说|道|问|喊|笑道|解释|回答)', after)
-    if speaker_match_after:
-        name = speaker_match_after.group(1)
-        if name == '我':
-            return '我（旁白）'
-        return normalize_character_name(name)
-
-    return None
-
-
-def identify_by_context(lines, line_num):
-    """
-    检查前后几行的上下文
-    """
-    # 查看前后5行
-    start = max(0, line_num - 6)
-    end = min(len(lines), line_num + 5)
-
-    character_mentions = defaultdict(int)
-
-    for i in range(start, end):
-        if i == line_num - 1:  # 跳过对话所在行
-            continue
-
-        line = lines[i]
-
-        # 查找角色名提及
-        for char_name, char_info in CHARACTER_KEYWORDS.items():
-            for variation in char_info['name_variations']:
-                if variation in line:
-                    # 如果在同一句或前一句，权重更高
-                    weight = 3 if i >= line_num - 2 else 1
-                    character_mentions[char_name] += weight
-
-    # 返回提及最多的角色
-    if character_mentions:
-        max_char = max(character_mentions, key=character_mentions.get)
-        if character_mentions[max_char] >= 2:
-            return max_char
-
-    return None
-
-
-def normalize_character_name(name):
-    """
-    标准化角色名
-    """
-    # 如果是名字的变体，统一为标准名
-    if '和也' in name:
-        return '和也'
-    elif '星空' in name:
-        return '星月星空'
-    elif name == '艾米':
-        return '艾米'
-    elif name == '我':
-        return '我（旁白）'
-    else:
-        return name
+    attributor = DialogueAttributor(
+        CHARACTER_KEYWORDS,
+        before_verbs=EXTENDED_SPEECH_VERBS,
+        after_verbs=SPEECH_VERBS,
+        context_threshold=2
+    )
+    return attributor.attribute(text)
 
 
 def split_text_segments(text, dialogues):
@@ -194,18 +60,18 @@ def split_text_segments(text, dialogues):
     return segments
 
 
-async def generate_audio(text, output_file, characters):
+async def generate_audio(text, output_file, characters, backend=None):
     """生成音频"""
+    if backend is None:
+        backend = TTSFactory.create_backend('edge')
+
     dialogues = extract_dialogues_with_context(text)
     segments = split_text_segments(text, dialogues)
 
     print(f"[INFO] 识别到 {len(segments)} 个音频片段")
 
-    # 创建临时目录
-    import tempfile
-    temp_dir = tempfile.mkdtemp()
-
-    audio_files = []
+    # 片段依次追加到输出旁的临时片段包
+    pack = scratch_pack(output_file)
 
     for i, seg in enumerate(segments):
         speaker = seg['speaker']
@@ -228,40 +94,49 @@ async def generate_audio(text, output_file, characters):
         print(f"[{i+1}/{len(segments)}] {speaker}: {text[:30]}...")
 
         # 生成音频
-        temp_file = Path(temp_dir) / f"segment_{i:04d}.mp3"
-
         try:
-            communicate = edge_tts.Communicate(text, voice)
-            await communicate.save(str(temp_file))
-            audio_files.append(str(temp_file))
+            audio = await backend.synthesize(text, voice)
+            if not audio:
+                raise RuntimeError('未返回音频数据')
+            pack.put(f"segment_{i:04d}", audio)
         except Exception as e:
             print(f"[ERROR] 片段 {i+1} 生成失败: {e}")
 
-    print(f"\n[INFO] 成功生成 {len(audio_files)} 个片段")
-
-    # 生成合并列表文件
-    list_file = Path(output_file).parent / (Path(output_file).stem + '_file_list.txt')
-    with open(list_file, 'w', encoding='utf-8') as f:
-        for audio_file in audio_files:
-            f.write(f"file '{Path(audio_file).absolute()}'\n")
-
-    print(f"[INFO] 音频片段列表: {list_file}")
-    print(f"[INFO] 使用 ffmpeg 合并：")
-    print(f"ffmpeg -f concat -safe 0 -i {list_file} -c copy {output_file}")
-
+    print(f"\n[INFO] 成功生成 {len(pack)} 个片段")
+    if isinstance(backend, CachedTTSBackend):
+        backend.cache.print_stats()
+
+    # 顺序读取片段包，按MP3帧合并
+    try:
+        with MP3Assembler(output_file) as assembler:
+            for _, clip in pack.items():
+                assembler.add(clip)
+    except Exception as e:
+        pack.close()
+        print(f"[ERROR] 合并失败: {e}")
+        print(f"[INFO] 音频片段保存在: {pack.path}")
+        return False
+
+    pack.remove()
+    print(f"[OK] 音频已生成: {output_file}")
     return True
 
 
 def main():
-    import sys
+    parser = argparse.ArgumentParser(description='改进版多角色TTS工具')
+    parser.add_argument('input', help='小说文件')
+    parser.add_argument('output', help='输出文件')
+    parser.add_argument('config', help='角色配置文件（JSON）')
+    parser.add_argument('--cache-dir', default=None,
+                        help='合成缓存目录（相同声音、语速、文本只合成一次）')
+    parser.add_argument('--cache-max-mb', type=int, default=2048,
+                        help='合成缓存容量上限，单位MB（默认: 2048）')
 
-    if len(sys.argv) < 4:
-        print("用法: python improved_tts.py <小说文件> <输出文件> <配置文件>")
-        sys.exit(1)
+    args = parser.parse_args()
 
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-    config_file = sys.argv[3]
+    input_file = args.input
+    output_file = args.output
+    config_file = args.config
 
     print(f"[INFO] 读取文件: {input_file}")
     with open(input_file, 'r', encoding='utf-8') as f:
@@ -273,8 +148,14 @@ def main():
 
     characters = config['characters']
 
+    backend = TTSFactory.create_backend(
+        'edge',
+        cache_dir=args.cache_dir,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024
+    )
+
     # 生成音频
-    asyncio.run(generate_audio(text, output_file, characters))
+    asyncio.run(generate_audio(text, output_file, characters, backend))
 
 
 if __name__ == '__main__':
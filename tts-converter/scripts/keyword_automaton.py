@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多关键词匹配自动机（Aho–Corasick）
+一次扫描文本即可找出所有关键词的出现位置，耗时与文本长度和匹配数成线性关系，与关键词数量无关；
+KeywordPattern 提供相同的接口，由正则引擎（C实现）完成扫描，适合对大量短文本反复匹配
+"""
+
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+
+class KeywordAutomaton:
+    """Aho–Corasick 关键词自动机"""
+
+    def __init__(self, keywords: Iterable = ()):
+        """
+        初始化自动机
+
+        Args:
+            keywords: 关键词列表，或 {关键词: 附加值} 字典
+        """
+        # 状态0为根节点; 每个状态: 转移表、失败指针、输出(关键词, 附加值)列表
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, Any]]] = [[]]
+        self._values: Dict[str, Any] = {}
+        self._built = True
+
+        if isinstance(keywords, dict):
+            for keyword, value in keywords.items():
+                self.add(keyword, value)
+        else:
+            for keyword in keywords:
+                self.add(keyword)
+
+    def add(self, keyword: str, value: Any = None):
+        """
+        添加关键词（重复添加时更新附加值）
+
+        Args:
+            keyword: 关键词
+            value: 附加值（匹配时一并返回，默认为关键词本身）
+        """
+        if not keyword:
+            return
+
+        if value is None:
+            value = keyword
+
+        if keyword in self._values:
+            self._values[keyword] = value
+            self._built = False
+            return
+
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+
+        self._values[keyword] = value
+        self._output[state].append((keyword, value))
+        self._built = False
+
+    def build(self):
+        """按广度优先计算失败指针，并把后缀状态的输出合并到当前状态"""
+        # 先还原各状态自身的输出（重复build时去掉上次合并的后缀输出）
+        for state in range(len(self._output)):
+            self._output[state] = []
+        for keyword, value in self._values.items():
+            self._output[self._walk(keyword)].append((keyword, value))
+
+        queue = deque()
+        for next_state in self._goto[0].values():
+            self._fail[next_state] = 0
+            queue.append(next_state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+        self._built = True
+
+    def _walk(self, keyword: str) -> int:
+        """沿转移表走到关键词对应的状态"""
+        state = 0
+        for char in keyword:
+            state = self._goto[state][char]
+        return state
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str, Any]]:
+        """
+        扫描文本，依次返回所有匹配（包括重叠的匹配）
+
+        Args:
+            text: 待扫描文本
+
+        Yields:
+            (起始位置, 结束位置, 关键词, 附加值)，按结束位置排序，同一位置较长的关键词在前
+        """
+        if not self._built:
+            self.build()
+
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for keyword, value in output[state]:
+                yield i + 1 - len(keyword), i + 1, keyword, value
+
+    def find_all(self, text: str) -> List[str]:
+        """返回文本中出现的所有关键词（按出现顺序，可重复）"""
+        return [keyword for _, _, keyword, _ in self.iter_matches(text)]
+
+    def count(self, text: str) -> Dict[str, int]:
+        """统计每个关键词在文本中的出现次数"""
+        counts = {}
+        for _, _, keyword, _ in self.iter_matches(text):
+            counts[keyword] = counts.get(keyword, 0) + 1
+        return counts
+
+    def __contains__(self, keyword: str) -> bool:
+        return keyword in self._values
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class KeywordPattern:
+    """
+    基于正则的多关键词匹配
+
+    关键词按长度从长到短组成一个正则，每个位置匹配最长的关键词，
+    同一位置上较短的关键词（最长关键词的前缀）一并返回；再从下一个字符继续查找，不遗漏重叠的匹配
+    """
+
+    def __init__(self, keywords: Iterable = ()):
+        """
+        编译关键词
+
+        Args:
+            keywords: 关键词列表，或 {关键词: 附加值} 字典（附加值默认为关键词本身）
+        """
+        if isinstance(keywords, dict):
+            items = keywords.items()
+        else:
+            items = ((keyword, None) for keyword in keywords)
+
+        self._values: Dict[str, Any] = {}
+        for keyword, value in items:
+            if keyword:
+                self._values[keyword] = keyword if value is None else value
+
+        ordered = sorted(self._values, key=len, reverse=True)
+
+        # 每个关键词在同一位置上的所有匹配: 自身和作为其前缀的关键词，从长到短
+        self._prefix_matches: Dict[str, List[Tuple[str, Any]]] = {}
+        for keyword in ordered:
+            self._prefix_matches[keyword] = [(other, self._values[other]) for other in ordered
+                                             if len(other) <= len(keyword) and keyword.startswith(other)]
+
+        # 每个关键词包含的所有关键词（不一定在开头），用于 find_set
+        self._contained: Dict[str, List[str]] = {
+            keyword: [other for other in ordered if len(other) <= len(keyword) and other in keyword]
+            for keyword in ordered
+        }
+
+        # 是否存在部分重叠的关键词（一个的结尾是另一个的开头，如"AB"和"BC"）；
+        # 不存在时不重叠地查找一遍就能得到所有出现过的关键词，否则需要在每个位置查找（前瞻）
+        self._partial_overlap = any(
+            keyword[-size:] == other[:size]
+            for keyword in ordered for other in ordered
+            if other != keyword
+            for size in range(1, min(len(keyword), len(other)))
+        )
+
+        alternation = '|'.join(map(re.escape, ordered))
+        self._pattern = re.compile(alternation) if ordered else None
+        self._lookahead = re.compile(f'(?=({alternation}))') if ordered else None
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str, Any]]:
+        """
+        扫描文本，依次返回所有匹配（包括重叠的匹配）
+
+        Args:
+            text: 待扫描文本
+
+        Yields:
+            (起始位置, 结束位置, 关键词, 附加值)，按起始位置排序，同一位置较长的关键词在前
+        """
+        if self._pattern is None:
+            return
+
+        search = self._pattern.search
+        prefix_matches = self._prefix_matches
+        match = search(text)
+        while match is not None:
+            start = match.start()
+            for keyword, value in prefix_matches[match.group()]:
+                yield start, start + len(keyword), keyword, value
+            match = search(text, start + 1)
+
+    def find_all(self, text: str) -> List[str]:
+        """返回文本中出现的所有关键词（按出现顺序，可重复）"""
+        return [keyword for _, _, keyword, _ in self.iter_matches(text)]
+
+    def find_set(self, text: str) -> Set[str]:
+        """返回文本中出现过的关键词集合（不关心位置和次数时比 iter_matches 快）"""
+        if self._pattern is None:
+            return set()
+        found = set()
+        if self._partial_overlap:
+            # 每个位置上最长的关键词，同一位置上较短的关键词是它的前缀
+            prefix_matches = self._prefix_matches
+            for keyword in set(self._lookahead.findall(text)):
+                found.update(other for other, _ in prefix_matches[keyword])
+        else:
+            contained = self._contained
+            for keyword in set(self._pattern.findall(text)):
+                found.update(contained[keyword])
+        return found
+
+    def value(self, keyword: str) -> Any:
+        """关键词的附加值"""
+        return self._values[keyword]
+
+    def count(self, text: str) -> Dict[str, int]:
+        """统计每个关键词在文本中的出现次数"""
+        counts = {}
+        for _, _, keyword, _ in self.iter_matches(text):
+            counts[keyword] = counts.get(keyword, 0) + 1
+        return counts
+
+    def __contains__(self, keyword: str) -> bool:
+        return keyword in self._values
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -2,24 +2,33 @@
 # -*- coding: utf-8 -*-
 """
 列出所有可用的中文TTS声音
+从本地声音目录读取，目录超过有效期时才在线刷新
 """
 
-import edge_tts
+import sys
 import asyncio
 
+from voice_catalog import get_catalog
 
-async def list_chinese_voices():
+
+async def list_chinese_voices(refresh=False):
     """列出所有中文声音"""
-    voices = await edge_tts.list_voices()
-    zh_voices = [v for v in voices if v['Locale'].startswith('zh-CN')]
+    catalog = get_catalog()
+    if refresh:
+        await catalog.refresh()
+    else:
+        await catalog.refresh_if_stale()
+
+    zh_voices = [v for locale in catalog.locales() if locale.startswith('zh-CN')
+                 for v in catalog.find(locale=locale, backend='edge')]
 
     print(f"\n共找到 {len(zh_voices)} 个中文声音:\n")
     print("=" * 80)
 
-    for v in sorted(zh_voices, key=lambda x: x['Name']):
-        print(f"名称: {v['Name']}")
-        print(f"描述: {v['FriendlyName']}")
-        print(f"性别: {v.get('Gender', '未知')}")
+    for v in sorted(zh_voices, key=lambda x: x['name']):
+        print(f"名称: {v['name']}")
+        print(f"描述: {v.get('description') or v.get('friendly_name', '')}")
+        print(f"性别: {v.get('gender', '未知')}")
         print("-" * 80)
 
     print("\n按声音名称分组:\n")
@@ -33,7 +42,7 @@ async def list_chinese_voices():
     }
 
     for v in zh_voices:
-        gender = v.get('Gender', '未知')
+        gender = v.get('gender', '未知')
         if gender == 'Male':
             categories['男声'].append(v)
         elif gender == 'Female':
@@ -44,9 +53,9 @@ async def list_chinese_voices():
     for category, voice_list in categories.items():
         if voice_list:
             print(f"\n{category} ({len(voice_list)}个):")
-            for v in sorted(voice_list, key=lambda x: x['Name']):
-                print(f"  - {v['Name']}: {v['FriendlyName']}")
+            for v in sorted(voice_list, key=lambda x: x['name']):
+                print(f"  - {v['name']}: {v.get('description') or v.get('friendly_name', '')}")
 
 
 if __name__ == '__main__':
-    asyncio.run(list_chinese_voices())
+    asyncio.run(list_chinese_voices(refresh='--refresh' in sys.argv[1:]))
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+片段中间表示（IR）缓存
+各入口的脚本解析结果统一为 (说话人, 声音, 语速, 文本, 源文件行范围) 片段列表，
+按列压缩保存在源文件旁的 <源文件>.ir.json 中，以源文件内容哈希、解析器和解析参数为键；
+源文件不变时分析、声音分配和合成工具直接读取，不再重复正则解析
+"""
+
+import json
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# 所有片段都有的字段；span 为源文件中的 [起始行, 结束行]（从1开始，无法定位时为None）
+CORE_FIELDS = ['speaker', 'voice', 'rate', 'text', 'span']
+
+# IR 文件后缀
+IR_SUFFIX = '.ir.json'
+
+
+class SegmentIR:
+    """片段中间表示缓存"""
+
+    VERSION = 1
+
+    def __init__(self, source_file: str, parser: str, options: Optional[Dict] = None):
+        """
+        初始化缓存
+
+        Args:
+            source_file: 脚本源文件路径
+            parser: 解析器名称（不同解析器的结果互不复用）
+            options: 影响解析结果的参数（可JSON序列化），参数变化时重新解析
+        """
+        self.source_path = Path(source_file)
+        self.ir_path = self.source_path.with_name(self.source_path.name + IR_SUFFIX)
+        self.parser = parser
+        self.options = options or {}
+
+    def source_hash(self, content: bytes) -> str:
+        """源文件内容哈希"""
+        return hashlib.sha256(content).hexdigest()
+
+    def options_hash(self) -> str:
+        """解析器和解析参数的哈希"""
+        raw = json.dumps([self.parser, self.options], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _read(self) -> Dict:
+        """读取IR文件，不存在或损坏时返回空字典"""
+        if not self.ir_path.exists():
+            return {}
+
+        try:
+            with open(self.ir_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] IR读取失败，将重新解析: {e}")
+            return {}
+
+        if data.get('version') != self.VERSION:
+            return {}
+        return data
+
+    def load(self, source_hash: str) -> Optional[Tuple[List[Dict], Dict]]:
+        """
+        读取本解析器的IR
+
+        Args:
+            source_hash: 本次源文件的内容哈希
+
+        Returns:
+            (片段列表, 附加数据)，源文件或参数变化时返回None
+        """
+        data = self._read()
+        if data.get('source_hash') != source_hash:
+            return None
+
+        entry = data.get('entries', {}).get(self.parser)
+        if not entry or entry.get('options_hash') != self.options_hash():
+            return None
+
+        fields = entry['fields']
+        segments = []
+        for row in entry['rows']:
+            segment = {}
+            for field, value in zip(fields, row):
+                # 附加字段只保留有值的（与解析器直接输出的片段一致）
+                if value is not None or field in CORE_FIELDS:
+                    segment[field] = value
+            segments.append(segment)
+
+        return segments, entry.get('meta', {})
+
+    def save(self, source_hash: str, segments: List[Dict], meta: Optional[Dict] = None):
+        """
+        写入本解析器的IR（先写临时文件再替换，中断时不会留下半个文件）
+
+        同一源文件的不同解析器共用一个IR文件，源文件变化后旧的结果全部丢弃；
+        片段按列保存: fields 为字段名，rows 中每行为一个片段的字段值
+
+        Args:
+            source_hash: 源文件内容哈希
+            segments: 片段列表
+            meta: 附加数据（如角色信息、声音分配）
+        """
+        fields = list(CORE_FIELDS)
+        for segment in segments:
+            for field in segment:
+                if field not in fields:
+                    fields.append(field)
+
+        data = self._read()
+        entries = data.get('entries', {}) if data.get('source_hash') == source_hash else {}
+        entries[self.parser] = {
+            'options_hash': self.options_hash(),
+            'meta': meta or {},
+            'fields': fields,
+            'rows': [[segment.get(field) for field in fields] for segment in segments],
+        }
+
+        data = {
+            'version': self.VERSION,
+            'source': self.source_path.name,
+            'source_hash': source_hash,
+            'entries': entries,
+        }
+
+        temp_path = self.ir_path.with_name(self.ir_path.name + '.tmp')
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            temp_path.replace(self.ir_path)
+        except OSError as e:
+            print(f"[WARN] IR写入失败，下次运行将重新解析: {e}")
+
+    def load_or_compile(self, compile_func: Callable[[str], Tuple[List[Dict], Dict]],
+                        use_cache: bool = True) -> Tuple[List[Dict], Dict]:
+        """
+        读取IR，源文件或参数变化时重新解析并保存
+
+        Args:
+            compile_func: 解析函数，参数为源文件文本，返回 (片段列表, 附加数据)
+            use_cache: 是否使用IR缓存（False时总是重新解析，并覆盖旧的IR）
+
+        Returns:
+            (片段列表, 附加数据)
+        """
+        content = self.source_path.read_bytes()
+        source_hash = self.source_hash(content)
+
+        if use_cache:
+            cached = self.load(source_hash)
+            if cached is not None:
+                print(f"[INFO] 使用已解析的IR: {self.ir_path.name}（{len(cached[0])} 个片段）")
+                return cached
+
+        segments, meta = compile_func(content.decode('utf-8'))
+        self.save(source_hash, segments, meta)
+        return segments, meta
+
+
+def line_starts(text: str) -> List[int]:
+    """每行起始位置的字符偏移，配合 bisect 把字符位置换算为行号"""
+    starts = [0]
+    index = text.find('\n')
+    while index != -1:
+        starts.append(index + 1)
+        index = text.find('\n', index + 1)
+    return starts
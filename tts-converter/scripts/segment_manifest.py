@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+片段清单
+记录每个片段的说话人、声音、语速和内容哈希，片段音频按哈希保存在片段包中，用于增量重新生成
+"""
+
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from clip_pack import ClipPack
+
+
+class SegmentManifest:
+    """片段清单"""
+
+    VERSION = 2
+
+    def __init__(self, output_file: str):
+        """
+        初始化清单
+
+        清单保存为 <输出文件>.manifest.json，片段音频保存在片段包 <输出文件>.clips.pack 中
+
+        Args:
+            output_file: 最终输出的音频文件路径
+        """
+        output_path = Path(output_file)
+        self.manifest_path = output_path.with_suffix('.manifest.json')
+        self.pack_path = output_path.with_suffix('.clips.pack')
+        # 旧版本每个片段一个文件的目录（读取旧清单时导入片段包）
+        self.clips_dir = output_path.parent / f"{output_path.stem}_clips"
+        self.entries = {}  # {hash: 清单条目}
+        self._pack = None
+
+    @property
+    def pack(self) -> ClipPack:
+        """片段包（首次使用时打开）"""
+        if self._pack is None:
+            self._pack = ClipPack(self.pack_path)
+        return self._pack
+
+    @staticmethod
+    def segment_hash(segment: Dict, narrator_voice: str) -> str:
+        """
+        计算片段内容哈希
+
+        哈希覆盖所有影响音频的字段：声音、语速、文本，以及角色介绍的文本和声音
+
+        Args:
+            segment: 片段字典
+            narrator_voice: 旁白声音（用于角色介绍）
+
+        Returns:
+            十六进制哈希
+        """
+        key = [segment['voice'], segment['rate'], segment['text']]
+        if segment.get('need_intro', False):
+            key += [segment['intro_text'], narrator_voice]
+
+        raw = json.dumps(key, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def store(self, segment_hash: str, clip: bytes) -> memoryview:
+        """
+        把片段音频追加到片段包
+
+        Returns:
+            片段包中的数据（合并输出时直接从映射读取）
+        """
+        self.pack.put(segment_hash, clip)
+        return self.pack.get(segment_hash)
+
+    def load(self) -> bool:
+        """
+        读取上次运行的清单
+
+        Returns:
+            是否读取成功
+        """
+        if not self.manifest_path.exists():
+            return False
+
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] 清单读取失败，将重新生成全部片段: {e}")
+            return False
+
+        if data.get('version') == 1:
+            self.entries = {entry['hash']: entry for entry in data.get('segments', [])}
+            self._import_clips_dir()
+            return True
+
+        if data.get('version') != self.VERSION:
+            return False
+
+        self.entries = {entry['hash']: entry for entry in data.get('segments', [])}
+        return True
+
+    def _import_clips_dir(self):
+        """把旧版本清单目录中的片段导入片段包，然后删除目录"""
+        if not self.clips_dir.is_dir():
+            return
+
+        for segment_hash in self.entries:
+            clip = self.clips_dir / f"{segment_hash}.mp3"
+            if clip.exists() and segment_hash not in self.pack:
+                self.pack.put(segment_hash, clip.read_bytes())
+        shutil.rmtree(self.clips_dir, ignore_errors=True)
+
+    def lookup(self, segment_hash: str) -> Optional[memoryview]:
+        """
+        查找可复用的片段音频
+
+        Returns:
+            片段包中的音频数据（不复制），清单或片段包中没有时返回None
+        """
+        if segment_hash not in self.entries or not self.pack_path.exists():
+            return None
+        return self.pack.get(segment_hash)
+
+    def save(self, segments: List[Dict]):
+        """
+        写入本次运行的清单，并从片段包中删除不再使用的片段
+
+        Args:
+            segments: 清单条目列表 [{index, speaker, voice, rate, hash}]
+        """
+        data = {
+            'version': self.VERSION,
+            'segments': segments
+        }
+
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+        self.entries = {entry['hash']: entry for entry in segments}
+
+        # 删除已不在清单中的片段
+        if self._pack is not None or self.pack_path.exists():
+            for segment_hash in self.pack.keys():
+                if segment_hash not in self.entries:
+                    self.pack.delete(segment_hash)
+
+    def compact(self):
+        """无效数据多于有效数据时整理片段包（在合并输出之后调用，整理会替换数据文件）"""
+        if self._pack is not None and self._pack.dead_bytes > self._pack.live_bytes:
+            self._pack.compact()
+
+    def close(self):
+        """关闭片段包"""
+        if self._pack is not None:
+            self._pack.close()
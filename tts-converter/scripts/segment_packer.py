@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相邻片段合并请求
+把相邻的、声音和语速相同的短片段合并为一个合成请求（每段以句末标点结束，另起一行），
+合成时让后端返回词边界事件，按事件在片段之间的停顿处把音频切回各片段；
+请求数减少后，建立连接等每个请求的固定开销被分摊，短台词多时合成明显加快
+"""
+
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from audio_assembler import iter_frames, read_side_info
+from text_chunker import SENTENCE_END_RE
+
+
+# 默认每个合并请求的最大字符数（远小于Edge TTS单次请求的4096字节上限，保留并发度）
+DEFAULT_PACK_CHARS = 500
+
+# 以句末标点结束
+_SENTENCE_END_AT_END_RE = re.compile(SENTENCE_END_RE.pattern + r'$')
+
+# 切分点附近寻找不依赖比特池的帧的范围（帧数）
+_CUT_SEARCH_FRAMES = 3
+
+
+def pack_runs(keys: Sequence, lengths: Sequence[int], max_chars: int = DEFAULT_PACK_CHARS,
+              packable: Optional[Sequence[bool]] = None) -> List[Tuple[int, int]]:
+    """
+    把相邻的、键相同的项分组，每组的总长度不超过 max_chars
+
+    Args:
+        keys: 每项的分组键（如 (声音, 语速)）
+        lengths: 每项的文本长度
+        max_chars: 每组最大字符数（0或负数表示不分组）
+        packable: 每项是否允许与其他项合并（默认都允许）
+
+    Returns:
+        [(起始序号, 结束序号)]，按顺序覆盖全部项；不能合并的项单独成组
+    """
+    groups = []
+    start = 0
+    total = 0
+    group_packable = False
+    for index in range(len(keys)):
+        can_pack = max_chars > 0 and (packable is None or packable[index]) and lengths[index] < max_chars
+        if (index > start and can_pack and group_packable and keys[index] == keys[start]
+                and total + lengths[index] + 1 <= max_chars):
+            total += lengths[index] + 1
+            continue
+        if index > start:
+            groups.append((start, index))
+        start = index
+        total = lengths[index]
+        group_packable = can_pack
+    if start < len(keys):
+        groups.append((start, len(keys)))
+    return groups
+
+
+def join_texts(texts: Sequence[str]) -> Tuple[str, List[int]]:
+    """
+    把多段文本合并为一个请求的文本
+
+    每段去掉首尾空白，没有以句末标点结束的补一个"。"（保证段间有停顿），段之间换行
+
+    Returns:
+        (合并后的文本, 每段在合并文本中的起始位置)
+    """
+    pieces = []
+    starts = []
+    position = 0
+    for text in texts:
+        piece = text.strip()
+        if not _SENTENCE_END_AT_END_RE.search(piece):
+            piece += '。'
+        starts.append(position)
+        pieces.append(piece)
+        position += len(piece) + 1
+    return '\n'.join(pieces), starts
+
+
+def find_cuts(text: str, starts: Sequence[int], boundaries: Sequence[Tuple[float, float, str]]
+              ) -> Optional[List[float]]:
+    """
+    按边界事件确定各段之间的切分时间
+
+    在合并文本中依次查找每个事件的文本（找不到的事件忽略，如数字被读作汉字），
+    两段之间的切分时间取前一段最后一个词的结束和后一段第一个词的开始的中点
+
+    Args:
+        text: 合并后的文本
+        starts: 每段的起始位置
+        boundaries: [(开始时间秒, 时长秒, 文本)]，按时间顺序
+
+    Returns:
+        len(starts) - 1 个切分时间；有段落找不到任何事件或时间不单调时返回None
+    """
+    located = []  # [(字符起始, 字符结束, 开始时间, 结束时间)]
+    cursor = 0
+    for offset, duration, word in boundaries:
+        word = word.strip()
+        if not word:
+            continue
+        position = text.find(word, cursor)
+        if position == -1:
+            continue
+        located.append((position, position + len(word), offset, offset + duration))
+        cursor = position + len(word)
+
+    ends = list(starts[1:]) + [len(text) + 1]
+    cuts = []
+    index = 0
+    previous_end = None
+    for start, end in zip(starts, ends):
+        words = []
+        while index < len(located) and located[index][0] < end:
+            if located[index][0] >= start:
+                words.append(located[index])
+            index += 1
+        if not words:
+            return None
+        if previous_end is not None:
+            first_start = words[0][2]
+            if first_start < previous_end:
+                return None
+            cuts.append((previous_end + first_start) / 2)
+        previous_end = words[-1][3]
+    return cuts
+
+
+def split_audio(audio: bytes, cut_times: Sequence[float]) -> Optional[List[bytes]]:
+    """
+    在指定时间附近的帧边界切分 Layer III MP3
+
+    优先在不引用比特池（main_data_begin为0）的帧处切分，后一段开头不会缺数据
+
+    Returns:
+        len(cut_times) + 1 段音频；不是 Layer III MP3 或切分点重合时返回None
+    """
+    frames = list(iter_frames(audio))
+    if not frames or frames[0][1]['layer'] != 3:
+        return None
+
+    frame_seconds = frames[0][1]['samples'] / frames[0][1]['sample_rate']
+    cut_frames = []
+    for cut_time in cut_times:
+        target = min(len(frames) - 1, max(1, round(cut_time / frame_seconds)))
+        candidates = sorted(range(max(1, target - _CUT_SEARCH_FRAMES),
+                                  min(len(frames), target + _CUT_SEARCH_FRAMES + 1)),
+                            key=lambda i: abs(i - target))
+        best = next((i for i in candidates if read_side_info(audio, *frames[i])[0] == 0), target)
+        if cut_frames and best <= cut_frames[-1]:
+            return None
+        cut_frames.append(best)
+
+    offsets = [0] + [frames[i][0] for i in cut_frames] + [len(audio)]
+    return [audio[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+def split_packed(audio: bytes, text: str, starts: Sequence[int],
+                 boundaries: Sequence[Tuple[float, float, str]]) -> Optional[List[bytes]]:
+    """
+    把合并请求的音频切回各段
+
+    Args:
+        audio: 合并请求的音频
+        text: 合并后的文本
+        starts: 每段的起始位置
+        boundaries: 后端返回的边界事件
+
+    Returns:
+        每段的音频；无法恢复边界时返回None（调用方应逐段重新合成）
+    """
+    if not audio:
+        return None
+    cuts = find_cuts(text, starts, boundaries)
+    if cuts is None:
+        return None
+    return split_audio(audio, cuts)
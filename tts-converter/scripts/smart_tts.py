@@ -7,12 +7,23 @@
 
 import re
 import json
-import edge_tts
 import asyncio
 import argparse
 import sys
+import time
+import contextlib
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, deque
+from tts_factory import TTSFactory, CachedTTSBackend, RateLimitedTTSBackend
+from tts_metrics import SynthesisMetrics
+from audio_assembler import MP3Assembler
+from clip_pack import scratch_pack
+from synthesis_scheduler import synthesize_chunked
+from text_chunker import DEFAULT_CHUNK_CHARS
+from segment_packer import DEFAULT_PACK_CHARS, pack_runs
+from keyword_automaton import KeywordAutomaton
+from chapter_renderer import ChapterRenderer, file_digest, split_chapters
+from gender_index import GenderIndex
 
 
 # 性别对应的声音
@@ -32,6 +43,30 @@ VOICE_MAP = {
 }
 
 
+# 对话（「」或『』）
+DIALOGUE_RE = re.compile(r'[「『]([^「」『』]+)[」』]')
+
+# 对话行中的说话人（如："艾米说"）
+ANALYZE_SPEAKER_RE = re.compile(r'(\w{2,4})(说|道|问|喊|笑道|摊摊手|平静地|回答|解释|补充|嘟囔)')
+SPLIT_SPEAKER_RE = re.compile(r'(\w+)(说|道|问|喊|笑道|摊摊手|平静地|回答)')
+
+# 会被说话人模式误识别的非角色词汇
+NON_CHARACTER_WORDS = frozenset(['这个', '那个', '什么', '怎么', '因为', '所以', '但是', '不过', '而且', '然后', '接着', '最后'])
+
+
+def _find_dialogues(line):
+    """提取一行中的所有对话内容（不含引号的行直接跳过）"""
+    if '「' not in line and '『' not in line:
+        return []
+    return DIALOGUE_RE.findall(line)
+
+
+def _match_speaker(pattern, line):
+    """返回一行中第一个说话人，没有时返回None"""
+    match = pattern.search(line)
+    return match.group(1) if match else None
+
+
 class Character:
     """角色信息"""
 
@@ -66,61 +101,42 @@ def analyze_characters(text):
     """
     分析文本中的角色
 
+    单遍扫描: 每行只匹配一次说话人，对话没有明确说话人时从最近3行的匹配结果中查找
+
     返回: (角色字典, 对话片段列表)
     """
     characters = {}
     dialogue_segments = []
 
-    # 提取对话（「」或『』）
-    dialogue_pattern = r'[「『]([^「」『』]+)[」』]'
+    # 最近3行匹配到的说话人（未匹配的行为None，可能是非角色词，使用时再过滤）
+    recent_speakers = deque(maxlen=3)
 
-    # 统计对话前的说话人
-    context_lines = text.split('\n')
-    for i, line in enumerate(context_lines):
-        # 查找对话
-        dialogues = re.findall(dialogue_pattern, line)
-        if not dialogues:
-            continue
-
-        # 查找对话前的说话人（如："艾米说"）
-        speaker_pattern = r'(\w{2,4})(说|道|问|喊|笑道|摊摊手|平静地|回答|解释|补充|嘟囔)'
-        speaker_match = re.search(speaker_pattern, line)
+    for i, line in enumerate(text.split('\n')):
+        speaker = _match_speaker(ANALYZE_SPEAKER_RE, line)
+        dialogues = _find_dialogues(line)
 
-        if speaker_match:
-            speaker = speaker_match.group(1)
-            # 过滤掉非角色词汇
-            if speaker not in ['这个', '那个', '什么', '怎么', '因为', '所以', '但是', '不过', '而且', '然后', '接着', '最后']:
-                for dialogue in dialogues:
-                    dialogue_segments.append({
-                        'speaker': speaker,
-                        'text': dialogue,
-                        'line_number': i + 1
-                    })
-        else:
-            # 没有明确的说话人，尝试从上下文推断
-            # 查看前几行
-            prev_lines = context_lines[max(0, i-3):i]
-            for prev_line in reversed(prev_lines):
-                speaker_match = re.search(speaker_pattern, prev_line)
-                if speaker_match:
-                    speaker = speaker_match.group(1)
-                    if speaker not in ['这个', '那个', '什么', '怎么', '因为', '所以', '但是', '不过', '而且', '然后', '接着', '最后']:
-                        for dialogue in dialogues:
-                            dialogue_segments.append({
-                                'speaker': speaker,
-                                'text': dialogue,
-                                'line_number': i + 1
-                            })
-                        break
+        if dialogues:
+            if speaker is not None:
+                # 对话前的说话人（如："艾米说"），过滤掉非角色词汇
+                attributed = speaker if speaker not in NON_CHARACTER_WORDS else None
             else:
-                # 无法判断说话人，标记为"未知"
+                # 没有明确的说话人，从前几行中最近的有效说话人推断，无法判断时标记为"未知"
+                attributed = '未知'
+                for prev_speaker in reversed(recent_speakers):
+                    if prev_speaker is not None and prev_speaker not in NON_CHARACTER_WORDS:
+                        attributed = prev_speaker
+                        break
+
+            if attributed is not None:
                 for dialogue in dialogues:
                     dialogue_segments.append({
-                        'speaker': '未知',
+                        'speaker': attributed,
                         'text': dialogue,
                         'line_number': i + 1
                     })
 
+        recent_speakers.append(speaker)
+
     # 统计每个角色的对话次数
     character_counts = defaultdict(int)
     for seg in dialogue_segments:
@@ -135,36 +151,6 @@ def analyze_characters(text):
     return characters, dialogue_segments
 
 
-def guess_gender_from_text(text, character_name):
-    """
-    从文本中推断角色性别
-
-    返回: (性别, 年龄)
-    """
-    # 常见的女性特征词
-    female_keywords = ['她', '姐姐', '妹妹', '少女', '女', '小姐', '妈', '娘', '女孩', '女王']
-    # 常见的男性特征词
-    male_keywords = ['他', '哥哥', '弟弟', '少年', '男', '先生', '爸', '爹', '男孩', '国王', '学长']
-
-    # 统计特征词出现次数
-    female_count = 0
-    male_count = 0
-
-    for keyword in female_keywords:
-        female_count += text.count(keyword)
-
-    for keyword in male_keywords:
-        male_count += text.count(keyword)
-
-    # 判断性别
-    if female_count > male_count:
-        return '女', '年轻'
-    elif male_count > female_count:
-        return '男', '年轻'
-    else:
-        return '未知', '年轻'
-
-
 def analyze_and_assign_voices(text):
     """
     分析文本并自动分配声音
@@ -196,14 +182,13 @@ def analyze_and_assign_voices(text):
     protagonist.voice = VOICE_MAP['主角'] if protagonist_gender == '男' else VOICE_MAP['女']['温柔']
     characters['我（旁白）'] = protagonist
 
-    # 为每个角色推断性别
-    for name, char in characters.items():
-        if name == '我（旁白）':
-            continue
-
-        gender, age = guess_gender_from_text(text, name)
-        char.gender = gender
-        char.age = age
+    # 为每个角色推断性别（扫描一遍全文，同时得到所有角色附近的他/她和性别名词）
+    names = [name for name in characters if name != '我（旁白）']
+    gender_index = GenderIndex(text, names)
+    for name in names:
+        gender, _ = gender_index.gender(name)
+        characters[name].gender = gender
+        characters[name].age = '年轻'
 
     return characters, dialogue_segments
 
@@ -248,6 +233,48 @@ def load_character_config(config_file):
     return characters
 
 
+class CharacterNameIndex:
+    """
+    角色名索引
+
+    把对话中识别出的说话人映射到已知角色: 说话人包含某个角色名，或是某个角色名的一部分时，
+    取角色字典中最靠前的那个。角色名的出现用关键词自动机一次扫描找出，结果按说话人缓存
+    """
+
+    def __init__(self, names):
+        self._order = {name: i for i, name in enumerate(names)}
+        self._automaton = KeywordAutomaton(self._order)
+
+        # 角色名的所有子串 -> 包含它的角色名中最靠前的一个
+        self._substrings = {}
+        for name, order in self._order.items():
+            for start in range(len(name)):
+                for end in range(start + 1, len(name) + 1):
+                    sub = name[start:end]
+                    if sub not in self._substrings or order < self._order[self._substrings[sub]]:
+                        self._substrings[sub] = name
+
+        self._cache = {}
+
+    def resolve(self, speaker):
+        """
+        查找说话人对应的角色名
+
+        Returns:
+            角色名，没有对应角色时返回None
+        """
+        if speaker in self._cache:
+            return self._cache[speaker]
+
+        candidates = [name for _, _, name, _ in self._automaton.iter_matches(speaker)]
+        if speaker in self._substrings:
+            candidates.append(self._substrings[speaker])
+
+        found = min(candidates, key=self._order.__getitem__) if candidates else None
+        self._cache[speaker] = found
+        return found
+
+
 def split_text_by_speaker(text, characters):
     """
     根据说话人分割文本
@@ -256,54 +283,38 @@ def split_text_by_speaker(text, characters):
     """
     segments = []
 
-    lines = text.split('\n')
+    name_index = CharacterNameIndex(characters.keys())
     current_speaker = '我（旁白）'
     current_text = []
 
-    for line in lines:
+    for line in text.split('\n'):
         # 检查是否是对话
-        dialogue_pattern = r'[「『]([^「」『』]+)[」』]'
-        dialogues = re.findall(dialogue_pattern, line)
+        dialogues = _find_dialogues(line)
 
         if dialogues:
             # 保存之前的旁白
             if current_text:
-                text = '\n'.join(current_text).strip()
-                if text:
-                    segments.append((current_speaker, text))
+                narration = '\n'.join(current_text).strip()
+                if narration:
+                    segments.append((current_speaker, narration))
                 current_text = []
 
-            # 查找说话人
-            speaker_pattern = r'(\w+)(说|道|问|喊|笑道|摊摊手|平静地|回答)'
-            speaker_match = re.search(speaker_pattern, line)
-
-            if speaker_match:
-                speaker = speaker_match.group(1)
+            # 查找说话人; 没有明确的说话人时保持当前说话人
+            speaker = _match_speaker(SPLIT_SPEAKER_RE, line)
+            if speaker is not None:
                 # 如果是"我"，使用旁白
                 if speaker == '我':
                     current_speaker = '我（旁白）'
                 else:
-                    # 查找对应的角色
-                    found = False
-                    for char_name in characters.keys():
-                        if char_name in speaker or speaker in char_name:
-                            current_speaker = char_name
-                            found = True
-                            break
-
-                    if not found:
-                        # 使用原说话人
-                        current_speaker = speaker
-            else:
-                # 没有明确的说话人，保持当前说话人
-                pass
+                    # 查找对应的角色，找不到时使用原说话人
+                    current_speaker = name_index.resolve(speaker) or speaker
 
             # 添加对话
             for dialogue in dialogues:
                 segments.append((current_speaker, dialogue))
 
             # 添加对话后的描述
-            remaining = re.sub(dialogue_pattern, '', line).strip()
+            remaining = DIALOGUE_RE.sub('', line).strip()
             if remaining:
                 current_text.append(remaining)
                 current_speaker = '我（旁白）'
@@ -314,78 +325,67 @@ def split_text_by_speaker(text, characters):
 
     # 保存剩余文本
     if current_text:
-        text = '\n'.join(current_text).strip()
-        if text:
-            segments.append(('我（旁白）', text))
+        narration = '\n'.join(current_text).strip()
+        if narration:
+            segments.append(('我（旁白）', narration))
 
     return segments
 
 
-async def text_to_speech(text, output_file, voice):
-    """将文字转换为语音"""
+async def text_to_speech(text, output_file, voice, backend=None, chunk_chars=0):
+    """将文字转换为语音（超过chunk_chars的长文本按句切分并发合成后拼接）"""
+    if backend is None:
+        backend = TTSFactory.create_backend('edge')
+
     try:
-        communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(output_file)
+        audio = await synthesize_chunked(backend, text, voice, chunk_chars=chunk_chars)
+        if not audio:
+            print(f"[ERROR] 转换失败: 未返回音频数据", file=sys.stderr)
+            return False
+        Path(output_file).write_bytes(audio)
         return True
     except Exception as e:
         print(f"[ERROR] 转换失败: {e}", file=sys.stderr)
         return False
 
 
-async def merge_audio_files(audio_files, output_file):
+async def merge_audio_files(pack, output_file):
     """
-    合并多个音频文件
+    合并片段包中的音频片段
 
-    注意：这里使用简单的方式，实际应该用 pydub 或其他库
+    按写入顺序顺序读取片段包，按MP3帧依次写入输出文件，耗时与总长度成线性关系
     """
     try:
-        from pydub import AudioSegment
-
-        combined = AudioSegment.empty()
-
-        for audio_file in audio_files:
-            audio = AudioSegment.from_mp3(audio_file)
-            combined += audio
-
-        combined.export(output_file, format='mp3')
+        with MP3Assembler(output_file) as assembler:
+            for _, clip in pack.items():
+                assembler.add(clip)
         return True
 
-    except ImportError:
-        print("[WARN] 未安装 pydub，无法自动合并音频文件")
-        print("[INFO] 请手动合并以下文件：")
-        for i, f in enumerate(audio_files, 1):
-            print(f"  {i}. {f}")
-
-        # 创建一个合并列表文件
-        list_file = output_file.replace('.mp3', '_file_list.txt')
-        with open(list_file, 'w', encoding='utf-8') as f:
-            for audio_file in audio_files:
-                f.write(f"file '{Path(audio_file).absolute()}'\n")
-
-        print(f"\n[INFO] 可以使用 ffmpeg 合并：")
-        print(f"ffmpeg -f concat -safe 0 -i {list_file} -c copy {output_file}")
-        return False
-
     except Exception as e:
         print(f"[ERROR] 合并失败: {e}", file=sys.stderr)
         return False
 
 
-async def generate_multi_voice_audio(text, output_file, characters):
-    """生成多角色音频"""
+async def generate_multi_voice_audio(text, output_file, characters, backend=None, chunk_chars=0):
+    """
+    生成多角色音频
+
+    超过chunk_chars的长片段（通常是大段旁白）按句切分为多块并发合成，再无缝拼接
+    """
     print(f"\n[INFO] 开始生成多角色音频...")
 
+    if backend is None:
+        backend = TTSFactory.create_backend('edge')
+
     # 分割文本
     segments = split_text_by_speaker(text, characters)
 
     print(f"[INFO] 共分割成 {len(segments)} 个片段")
 
-    # 创建临时目录
-    import tempfile
-    temp_dir = tempfile.mkdtemp()
+    # 片段依次追加到输出旁的临时片段包
+    pack = scratch_pack(output_file)
 
     # 生成每个片段的音频
-    audio_files = []
     for i, (speaker, text) in enumerate(segments):
         if not text.strip():
             continue
@@ -395,27 +395,162 @@ async def generate_multi_voice_audio(text, output_file, characters):
         if not voice:
             voice = characters['我（旁白）']
 
-        # 生成临时文件
-        temp_file = Path(temp_dir) / f"segment_{i:04d}.mp3"
-
         print(f"[{i+1}/{len(segments)}] {speaker}: {text[:30]}...")
 
-        success = await text_to_speech(text, str(temp_file), voice.get_voice())
-
-        if success:
-            audio_files.append(str(temp_file))
+        try:
+            audio = await synthesize_chunked(backend, text, voice.get_voice(), chunk_chars=chunk_chars)
+            if not audio:
+                raise RuntimeError('未返回音频数据')
+            pack.put(f"segment_{i:04d}", audio)
+        except Exception as e:
+            print(f"[ERROR] 转换失败: {e}", file=sys.stderr)
 
-    print(f"\n[INFO] 成功生成 {len(audio_files)} 个音频片段")
+    print(f"\n[INFO] 成功生成 {len(pack)} 个音频片段")
+    print_backend_stats(backend)
 
     # 合并音频
     print(f"[INFO] 正在合并音频...")
-    success = await merge_audio_files(audio_files, output_file)
+    success = await merge_audio_files(pack, output_file)
 
     if success:
+        pack.remove()
         print(f"[SUCCESS] 已生成: {output_file}")
     else:
-        print(f"[INFO] 音频片段保存在: {temp_dir}")
+        pack.close()
+        print(f"[INFO] 音频片段保存在: {pack.path}")
+
+    return success
+
+
+async def stream_multi_voice_audio(text, output, characters, backend=None, concurrency=4, chunk_chars=0,
+                                   pack_chars=0):
+    """
+    流式生成多角色音频
+
+    按顺序合成片段，最早的片段一完成就写入输出，无需等待全书合成完毕；
+    同时在途的片段不超过concurrency个，内存占用与全书长度无关；
+    超过chunk_chars的长片段按句切分为多块并发合成，单个片段的耗时受块长度限制；
+    相邻的同声音短片段合并为一个请求（后端支持边界事件时），减少请求数
+
+    Args:
+        text: 文本
+        output: 输出文件路径，或已打开的二进制流（如 sys.stdout.buffer）
+        characters: 角色字典
+        backend: TTS后端（默认Edge TTS）
+        concurrency: 同时合成的片段数（即预读窗口大小）
+        chunk_chars: 长片段的分块长度（0表示不切分）
+        pack_chars: 合并请求的最大字符数（0表示不合并）
+
+    Returns:
+        是否全部片段都已写出
+    """
+    print(f"\n[INFO] 开始流式生成多角色音频...")
+
+    if backend is None:
+        backend = TTSFactory.create_backend('edge')
+
+    segments = [(speaker, seg_text) for speaker, seg_text in split_text_by_speaker(text, characters)
+                if seg_text.strip()]
+    total = len(segments)
+    print(f"[INFO] 共分割成 {total} 个片段, 并发数 {concurrency}")
+
+    def voice_of(speaker):
+        return (characters.get(speaker) or characters['我（旁白）']).get_voice()
+
+    # 相邻的同声音短片段分为一组，一组一个请求（超过分块长度的长片段单独合成）
+    if pack_chars > 0 and getattr(backend, 'supports_boundaries', False):
+        groups = pack_runs([voice_of(speaker) for speaker, _ in segments],
+                           [len(seg_text) for _, seg_text in segments], pack_chars,
+                           [chunk_chars <= 0 or len(seg_text) <= chunk_chars for _, seg_text in segments])
+    else:
+        groups = [(i, i + 1) for i in range(total)]
+
+    async def synthesize(group):
+        voice = voice_of(group[0][0])
+        try:
+            if len(group) > 1:
+                return await backend.synthesize_packed([seg_text for _, seg_text in group], voice)
+            return [await synthesize_chunked(backend, group[0][1], voice, chunk_chars=chunk_chars)]
+        except Exception as e:
+            print(f"[ERROR] 转换失败: {e}", file=sys.stderr)
+            return [b''] * len(group)
+
+    start = time.perf_counter()
+    first_audio = None
+    written = 0
+    pending = deque()
+    queue = (segments[group_start:group_end] for group_start, group_end in groups)
+
+    with MP3Assembler(output) as assembler:
+        try:
+            while True:
+                # 保持预读窗口填满
+                while len(pending) < max(1, concurrency):
+                    group = next(queue, None)
+                    if group is None:
+                        break
+                    pending.append((group, asyncio.ensure_future(synthesize(group))))
+
+                if not pending:
+                    break
+
+                group, task = pending.popleft()
+                for (speaker, seg_text), audio in zip(group, await task):
+                    if not audio:
+                        continue
+
+                    assembler.add(audio)
+                    written += 1
+                    if first_audio is None:
+                        first_audio = time.perf_counter() - start
+                        print(f"[INFO] 首段音频已写出 ({first_audio:.2f}s)")
+                    print(f"[{written}/{total}] {speaker}: {seg_text[:30]}...")
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n[INFO] 成功写出 {written} 个音频片段, 时长 {assembler.duration / 60:.1f} 分钟, 总耗时 {elapsed:.1f}s")
+    print_backend_stats(backend)
+
+    return written > 0 and written == total
+
+
+def print_backend_stats(backend):
+    """打印合成缓存和限流统计"""
+    if isinstance(backend, CachedTTSBackend):
+        backend.cache.print_stats()
+        backend = backend.backend
+    if isinstance(backend, RateLimitedTTSBackend):
+        backend.print_stats()
+
+
+def export_metrics(metrics, output, prometheus_file=None):
+    """打印合成指标并保存为输出文件旁的 <输出>.metrics.json（输出到标准输出时不保存JSON）"""
+    metrics.print_summary()
+    json_file = Path(output).with_suffix('.metrics.json') if isinstance(output, (str, Path)) else None
+    metrics.save(json_file, prometheus_file)
 
+
+def render_chapter(input_file, output_file, options):
+    """渲染单个章节（在子进程中执行）"""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    characters = load_character_config(options['config'])
+    metrics = SynthesisMetrics()
+    backend = TTSFactory.create_backend(
+        'edge',
+        cache_dir=options['cache_dir'],
+        cache_max_bytes=options['cache_max_bytes'],
+        adaptive=options.get('adaptive', False),
+        metrics=metrics
+    )
+    success = asyncio.run(stream_multi_voice_audio(text, output_file, characters, backend, options['concurrency'],
+                                                   options.get('chunk_chars', 0), options.get('pack_chars', 0)))
+    # 各章导出到自己的 .prom 文件，由父进程合并
+    prometheus_file = Path(output_file).with_suffix('.prom') if options.get('metrics_prom') else None
+    export_metrics(metrics, output_file, prometheus_file)
     return success
 
 
@@ -426,13 +561,47 @@ async def main():
     )
 
     parser.add_argument('input', help='输入文件路径')
-    parser.add_argument('output', help='输出音频文件路径')
+    parser.add_argument('output', help='输出音频文件路径（流式模式下用 - 表示标准输出）')
     parser.add_argument('--config', help='角色配置文件（JSON）')
     parser.add_argument('--auto-merge', action='store_true',
-                        help='自动合并音频片段（需要安装 pydub）')
+                        help='自动合并音频片段（兼容旧参数，现已总是合并）')
+    parser.add_argument('--stream', action='store_true',
+                        help='流式模式: 片段按顺序合成完即写入输出，内存占用与全书长度无关')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='流式模式和按章节渲染时同时合成的片段数（默认: 4）')
+    parser.add_argument('--chapters', action='store_true',
+                        help='按章节标题切分，各章在独立进程中并行渲染（中断后重新运行只渲染未完成的章节）')
+    parser.add_argument('--jobs', type=int, default=2,
+                        help='按章节渲染时同时渲染的章节数（默认: 2）')
+    parser.add_argument('--no-join', action='store_true',
+                        help='按章节渲染时只输出各章音频，不合并')
+    parser.add_argument('--chunk-chars', type=int, default=DEFAULT_CHUNK_CHARS,
+                        help=f'长片段按句切分并发合成的分块长度，0表示不切分（默认: {DEFAULT_CHUNK_CHARS}）')
+    parser.add_argument('--pack-chars', type=int, default=DEFAULT_PACK_CHARS,
+                        help=f'流式模式和按章节渲染时，相邻的同声音短片段合并为一个请求的最大字符数，'
+                             f'0表示不合并（默认: {DEFAULT_PACK_CHARS}）')
+    parser.add_argument('--cache-dir', default=None,
+                        help='合成缓存目录（相同声音、语速、文本只合成一次）')
+    parser.add_argument('--cache-max-mb', type=int, default=2048,
+                        help='合成缓存容量上限，单位MB（默认: 2048）')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='自适应限流: 按服务端的限流响应（429/503、超时）自动调整请求速率和并发')
+    parser.add_argument('--metrics-prom', default=None,
+                        help='同时导出Prometheus文本格式的合成指标（JSON摘要总是保存为 <输出>.metrics.json）')
 
     args = parser.parse_args()
 
+    if args.stream and args.output == '-':
+        # 音频写入标准输出，日志改写到标准错误
+        audio_out = sys.stdout.buffer
+        with contextlib.redirect_stdout(sys.stderr):
+            return await run(args, audio_out)
+
+    return await run(args, args.output)
+
+
+async def run(args, output):
+    """执行转换"""
     # 读取文本
     print(f"[INFO] 读取文件: {args.input}")
     with open(args.input, 'r', encoding='utf-8') as f:
@@ -444,6 +613,7 @@ async def main():
     if args.config and Path(args.config).exists():
         print(f"[INFO] 加载角色配置: {args.config}")
         characters = load_character_config(args.config)
+        config_file = args.config
     else:
         # 自动分析
         characters, _ = analyze_and_assign_voices(text)
@@ -465,18 +635,47 @@ async def main():
             # 第一次运行，只生成配置
             return 0
 
+    if args.chapters:
+        # 按章节并行渲染，每章在子进程中流式写出
+        # （--config 指定的文件不存在时，子进程读取刚才自动分析保存的配置）
+        options = {
+            'config': str(Path(config_file).resolve()),
+            'concurrency': args.concurrency,
+            'chunk_chars': args.chunk_chars,
+            'pack_chars': args.pack_chars,
+            'cache_dir': args.cache_dir,
+            'cache_max_bytes': args.cache_max_mb * 1024 * 1024,
+            'adaptive': args.adaptive,
+            'metrics_prom': str(Path(args.metrics_prom).resolve()) if args.metrics_prom else None,
+        }
+        # 章节哈希只覆盖影响音频的参数（角色配置按内容），调整并发、缓存、限流后重新运行不会重新渲染已完成的章节
+        audio_options = {
+            'config': file_digest(options['config']),
+            'chunk_chars': args.chunk_chars,
+            'pack_chars': args.pack_chars,
+        }
+        renderer = ChapterRenderer(output, render_chapter, options, jobs=args.jobs,
+                                   prometheus_file=options['metrics_prom'], audio_options=audio_options)
+        success = renderer.render(split_chapters(text), join=not args.no_join)
+        return 0 if success else 1
+
+    metrics = SynthesisMetrics()
+    backend = TTSFactory.create_backend(
+        'edge',
+        cache_dir=args.cache_dir,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+        adaptive=args.adaptive,
+        metrics=metrics
+    )
+
     # 生成音频
-    if args.auto_merge:
-        try:
-            import pydub
-            success = await generate_multi_voice_audio(text, args.output, characters)
-        except ImportError:
-            print("[ERROR] 需要安装 pydub: pip install pydub")
-            return 1
+    if args.stream:
+        success = await stream_multi_voice_audio(text, output, characters, backend, args.concurrency,
+                                                 args.chunk_chars, args.pack_chars)
     else:
-        # 不自动合并，只生成片段
-        success = await generate_multi_voice_audio(text, args.output, characters)
+        success = await generate_multi_voice_audio(text, output, characters, backend, args.chunk_chars)
 
+    export_metrics(metrics, output, args.metrics_prom)
     return 0 if success else 1
 
 
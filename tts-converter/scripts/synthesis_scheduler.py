@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发合成调度器
+以有限并发同时执行多个TTS合成任务，输出顺序与输入一致，失败自动退避重试；
+声音、语速、文本完全相同的任务只合成一次，结果共享；
+超长文本按句切分为多块并发合成，再无缝拼接为一个片段；
+相邻的、声音和语速相同的短任务合并为一个请求，再按边界事件切回各任务；
+后端有原生批量接口（batch_size > 1，如GPT-SoVITS的 /tts/batch）时，声音和语速相同的任务按批调用 synthesize_many
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from audio_assembler import CHUNK_GAP, join_chunks
+from text_chunker import chunk_text
+from segment_packer import pack_runs
+
+
+class SynthesisScheduler:
+    """并发合成调度器"""
+
+    def __init__(self, backend, concurrency: int = 4, max_retries: int = 3,
+                 backoff: float = 1.0, verbose: bool = True, dedup: bool = True,
+                 chunk_chars: int = 0, chunk_gap: float = CHUNK_GAP, pack_chars: int = 0):
+        """
+        初始化调度器
+
+        Args:
+            backend: TTS后端（TTSBackend实例）
+            concurrency: 同时进行的合成任务数
+            max_retries: 单个任务失败后的最大重试次数
+            backoff: 首次重试前的等待秒数（之后每次翻倍）
+            verbose: 是否打印每个片段的进度
+            dedup: 是否合并 (声音, 语速, 文本) 相同的任务
+            chunk_chars: 文本超过此长度的任务按句切分为多块分别合成（0表示不切分）
+            chunk_gap: 分块拼接时块之间的停顿（秒）
+            pack_chars: 相邻的同声音、同语速任务合并为一个请求时每个请求的最大字符数
+                        （0表示不合并；后端不支持边界事件时也不合并）
+        """
+        self.backend = backend
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        self.verbose = verbose
+        self.dedup = dedup
+        self.chunk_chars = chunk_chars
+        self.chunk_gap = chunk_gap
+        self.pack_chars = pack_chars
+
+        self.requested = 0  # 提交的任务数（分块后）
+        self.chunked = 0  # 被切分的任务数
+        self.chunks = 0  # 切分后的总块数
+        self.unique = 0  # 去重后实际合成的任务数
+        self.packs = 0  # 合并后的请求数（只计包含多个任务的请求）
+        self.packed = 0  # 被合并的任务数
+        self.pack_fallbacks = 0  # 合并请求失败后改为逐个合成的次数
+        self.batches = 0  # 原生批量请求数
+        self.batched = 0  # 通过批量请求成功合成的任务数
+        self.latencies = []  # 成功请求的合成耗时（秒）
+        self.succeeded = 0  # 成功合成的任务数
+        self.retries = 0
+        self.failures = 0
+        self.elapsed = 0.0
+        self._done = 0
+
+    async def run(self, jobs: List[Dict]) -> List[Optional[bytes]]:
+        """
+        执行所有合成任务
+
+        Args:
+            jobs: 任务列表，每项包含 text, voice, rate，可选 label（日志显示用）
+
+        Returns:
+            与jobs顺序一致的音频数据列表，失败的任务对应None
+        """
+        # 分块: 超长文本切分为多个子任务，合成后按顺序拼接
+        chunk_jobs = []
+        job_chunks = []  # 每个任务对应的子任务范围 (起始, 结束)
+        for job in jobs:
+            chunks = chunk_text(job['text'], self.chunk_chars) if self.chunk_chars > 0 else [job['text']]
+            start = len(chunk_jobs)
+            if len(chunks) == 1:
+                chunk_jobs.append(job)
+            else:
+                self.chunked += 1
+                self.chunks += len(chunks)
+                label = job.get('label') or job['text'][:30]
+                for k, chunk in enumerate(chunks, 1):
+                    chunk_jobs.append(dict(job, text=chunk, label=f"{label} [{k}/{len(chunks)}]"))
+            job_chunks.append((start, len(chunk_jobs)))
+
+        # 去重: 相同 (声音, 语速, 文本) 的任务映射到同一个合成任务
+        unique_jobs = []
+        job_slots = []  # 每个子任务对应的去重后任务序号
+        seen = {}
+        for job in chunk_jobs:
+            key = (job['voice'], job.get('rate', '+0%'), job['text'])
+            if not self.dedup or key not in seen:
+                seen[key] = len(unique_jobs)
+                unique_jobs.append(job)
+            job_slots.append(seen[key])
+
+        self.requested += len(chunk_jobs)
+        self.unique += len(unique_jobs)
+
+        # 合并请求: 相邻的同声音、同语速短任务合并为一个请求（长文本的分块不再合并）
+        if self.pack_chars > 0 and getattr(self.backend, 'supports_boundaries', False):
+            chunk_job_ids = {id(job) for start, end in job_chunks if end - start > 1 for job in chunk_jobs[start:end]}
+            groups = pack_runs([(job['voice'], job.get('rate', '+0%')) for job in unique_jobs],
+                               [len(job['text']) for job in unique_jobs], self.pack_chars,
+                               [id(job) not in chunk_job_ids for job in unique_jobs])
+        else:
+            groups = [(i, i + 1) for i in range(len(unique_jobs))]
+
+        # 原生批量接口: 未合并的任务按 (声音, 语速) 分组，每 batch_size 个作为一次批量请求
+        batches = []
+        batch_size = getattr(self.backend, 'batch_size', 0)
+        if batch_size > 1:
+            by_key = {}
+            for start, end in groups:
+                if end - start == 1:
+                    job = unique_jobs[start]
+                    by_key.setdefault((job['voice'], job.get('rate', '+0%')), []).append(start)
+            for indices in by_key.values():
+                batches += [indices[i:i + batch_size] for i in range(0, len(indices), batch_size)]
+            batched = {i for indices in batches if len(indices) > 1 for i in indices}
+            batches = [indices for indices in batches if len(indices) > 1]
+            groups = [(start, end) for start, end in groups if start not in batched]
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        unique_results = [None] * len(unique_jobs)
+        self._done = 0
+
+        async def worker(start: int, end: int):
+            async with semaphore:
+                if end - start == 1:
+                    unique_results[start] = await self._synthesize_with_retry(unique_jobs[start], len(unique_jobs))
+                else:
+                    unique_results[start:end] = await self._synthesize_pack(unique_jobs[start:end], len(unique_jobs))
+
+        async def batch_worker(indices: List[int]):
+            async with semaphore:
+                results = await self._synthesize_batch([unique_jobs[i] for i in indices], len(unique_jobs))
+            for i, audio in zip(indices, results):
+                unique_results[i] = audio
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(start, end) for start, end in groups),
+                             *(batch_worker(indices) for indices in batches))
+        self.elapsed += time.perf_counter() - start
+
+        chunk_results = [unique_results[slot] for slot in job_slots]
+
+        results = []
+        for start, end in job_chunks:
+            parts = chunk_results[start:end]
+            if end - start == 1 or any(part is None for part in parts):
+                # 任何一块失败时整个任务失败
+                results.append(parts[0] if end - start == 1 else None)
+            else:
+                results.append(join_chunks(parts, self.chunk_gap))
+        return results
+
+    async def _synthesize_pack(self, jobs: List[Dict], total: int) -> List[Optional[bytes]]:
+        """合成一组相邻的同声音、同语速任务（一个请求），失败时逐个合成并重试"""
+        label = jobs[0].get('label') or jobs[0]['text'][:30]
+
+        start = time.perf_counter()
+        try:
+            parts = await self.backend.synthesize_packed([job['text'] for job in jobs], jobs[0]['voice'],
+                                                         jobs[0].get('rate', '+0%'))
+        except Exception as e:
+            parts = None
+            print(f"  [WARN] 合并请求失败，改为逐个合成: {label}: {e}")
+
+        if parts and all(parts):
+            latency = time.perf_counter() - start
+            self.latencies.append(latency)
+            self.packs += 1
+            self.packed += len(jobs)
+            self.succeeded += len(jobs)
+            self._done += len(jobs)
+            if self.verbose:
+                print(f"[{self._done}/{total}] {label} 等{len(jobs)}个片段 ({latency:.2f}s)")
+            return parts
+
+        self.pack_fallbacks += 1
+        return [await self._synthesize_with_retry(job, total) for job in jobs]
+
+    async def _synthesize_batch(self, jobs: List[Dict], total: int) -> List[Optional[bytes]]:
+        """通过后端的原生批量接口合成一批同声音、同语速任务，失败的任务逐个合成并重试"""
+        label = jobs[0].get('label') or jobs[0]['text'][:30]
+        requests = [{'text': job['text'], 'voice': job['voice'], 'rate': job.get('rate', '+0%')} for job in jobs]
+        results = [None] * len(jobs)
+
+        start = time.perf_counter()
+        try:
+            async for index, audio in self.backend.synthesize_many(requests, len(requests)):
+                results[index] = audio or None
+        except Exception as e:
+            print(f"  [WARN] 批量请求失败，改为逐个合成: {label}: {e}")
+
+        succeeded = sum(1 for audio in results if audio)
+        if succeeded:
+            latency = time.perf_counter() - start
+            self.latencies.append(latency)
+            self.batches += 1
+            self.batched += succeeded
+            self.succeeded += succeeded
+            self._done += succeeded
+            if self.verbose:
+                print(f"[{self._done}/{total}] {label} 等{succeeded}个片段（批量） ({latency:.2f}s)")
+
+        for i, audio in enumerate(results):
+            if audio is None:
+                results[i] = await self._synthesize_with_retry(jobs[i], total)
+        return results
+
+    async def _synthesize_with_retry(self, job: Dict, total: int) -> Optional[bytes]:
+        """合成单个任务，失败时按指数退避重试"""
+        label = job.get('label') or job['text'][:30]
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                self.retries += 1
+                await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+
+            start = time.perf_counter()
+            try:
+                audio = await self.backend.synthesize(job['text'], job['voice'], job.get('rate', '+0%'))
+            except Exception as e:
+                last_error = e
+                continue
+
+            if not audio:
+                # 部分后端失败时返回空数据
+                last_error = '返回空音频'
+                continue
+
+            latency = time.perf_counter() - start
+            self.latencies.append(latency)
+            self.succeeded += 1
+            self._done += 1
+            if self.verbose:
+                print(f"[{self._done}/{total}] {label} ({latency:.2f}s)")
+            return audio
+
+        self.failures += 1
+        self._done += 1
+        print(f"  [ERROR] 合成失败（已重试{self.max_retries}次）: {label}: {last_error}")
+        return None
+
+    def summary(self) -> Dict:
+        """
+        获取调度统计
+
+        Returns:
+            {requested, unique, dedup_ratio, chunked, chunks, packs, packed, pack_fallbacks,
+             batches, batched, segments, failures, retries, elapsed,
+             segments_per_sec, latency_avg, latency_p50, latency_p95, latency_max}
+        """
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(count - 1, int(p * count))]
+
+        return {
+            'requested': self.requested,
+            'unique': self.unique,
+            'dedup_ratio': 1 - self.unique / self.requested if self.requested else 0.0,
+            'chunked': self.chunked,
+            'chunks': self.chunks,
+            'packs': self.packs,
+            'packed': self.packed,
+            'pack_fallbacks': self.pack_fallbacks,
+            'batches': self.batches,
+            'batched': self.batched,
+            'segments': self.succeeded,
+            'failures': self.failures,
+            'retries': self.retries,
+            'elapsed': self.elapsed,
+            'segments_per_sec': self.succeeded / self.elapsed if self.elapsed > 0 else 0.0,
+            'latency_avg': sum(ordered) / count if count else 0.0,
+            'latency_p50': percentile(0.5),
+            'latency_p95': percentile(0.95),
+            'latency_max': ordered[-1] if ordered else 0.0,
+        }
+
+    def print_summary(self):
+        """打印调度统计"""
+        stats = self.summary()
+        print(f"\n[INFO] 合成完成: 成功 {stats['segments']} 个, 失败 {stats['failures']} 个, "
+              f"重试 {stats['retries']} 次")
+        if stats['requested'] > stats['unique']:
+            print(f"[INFO] 去重: 请求 {stats['requested']} 个, 实际合成 {stats['unique']} 个, "
+                  f"去重率 {stats['dedup_ratio']:.0%}")
+        if stats['chunked']:
+            print(f"[INFO] 分块: {stats['chunked']} 个长片段切分为 {stats['chunks']} 块并发合成")
+        if stats['packs']:
+            print(f"[INFO] 合并请求: {stats['packed']} 个短片段合并为 {stats['packs']} 个请求"
+                  + (f", {stats['pack_fallbacks']} 组改为逐个合成" if stats['pack_fallbacks'] else ""))
+        if stats['batches']:
+            print(f"[INFO] 批量请求: {stats['batched']} 个片段通过 {stats['batches']} 次批量调用合成")
+        print(f"[INFO] 总耗时 {stats['elapsed']:.1f}s, 吞吐 {stats['segments_per_sec']:.2f} 片段/秒 "
+              f"(并发 {self.concurrency})")
+        print(f"[INFO] 单次请求耗时: 平均 {stats['latency_avg']:.2f}s, P50 {stats['latency_p50']:.2f}s, "
+              f"P95 {stats['latency_p95']:.2f}s, 最大 {stats['latency_max']:.2f}s")
+
+
+async def synthesize_chunked(backend, text: str, voice: str, rate: str = '+0%',
+                             chunk_chars: int = 0, chunk_gap: float = CHUNK_GAP) -> bytes:
+    """
+    合成一段文本，超长时按句切分为多块并发合成后无缝拼接
+
+    Args:
+        backend: TTS后端
+        text: 文本
+        voice: 声音
+        rate: 语速
+        chunk_chars: 每块最大字符数（0表示不切分）
+        chunk_gap: 块之间的停顿（秒）
+
+    Returns:
+        音频数据，任何一块失败时返回空数据
+    """
+    chunks = chunk_text(text, chunk_chars)
+    if len(chunks) == 1:
+        return await backend.synthesize(text, voice, rate)
+
+    parts = await asyncio.gather(*(backend.synthesize(chunk, voice, rate) for chunk in chunks))
+    if not all(parts):
+        return b''
+    return join_chunks(parts, chunk_gap)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+长文本分块工具
+把超长的旁白等片段在句末标点（。！？…）处切分为长度接近的若干块，
+各块可以并发合成后再无缝拼接，单次合成的耗时受块长度限制，而不是受最长段落限制
+"""
+
+import math
+import re
+from bisect import bisect_left
+from typing import List
+
+
+# 默认每块最大字符数
+DEFAULT_CHUNK_CHARS = 300
+
+# 句末标点（连续的标点和紧随其后的右引号、右括号归入同一句）
+SENTENCE_END_RE = re.compile(r'[。！？…!?]+[」』”’）)》]*')
+
+# 句内停顿标点（单句超长时的次选切分点）
+CLAUSE_END_RE = re.compile(r'[，；、：,;:]+[」』”’）)》]*')
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    按句末标点切分句子
+
+    Args:
+        text: 文本
+
+    Returns:
+        句子列表，拼接后与原文完全相同（标点、空白和换行都保留在句子中）
+    """
+    return _split_after(SENTENCE_END_RE, text)
+
+
+def _split_after(pattern: re.Pattern, text: str) -> List[str]:
+    """在每个匹配之后切分，保留全部字符"""
+    parts = []
+    start = 0
+    for match in pattern.finditer(text):
+        end = match.end()
+        # 标点后的空白归入前一句
+        while end < len(text) and text[end].isspace():
+            end += 1
+        if end > start:
+            parts.append(text[start:end])
+            start = end
+    if start < len(text):
+        parts.append(text[start:])
+    return parts
+
+
+def _split_oversized(sentence: str, max_chars: int) -> List[str]:
+    """把超过块长度的单句先按逗号等停顿切分，仍然超长的部分按长度均分"""
+    pieces = []
+    for clause in _split_after(CLAUSE_END_RE, sentence):
+        if len(clause) <= max_chars:
+            pieces.append(clause)
+        else:
+            count = math.ceil(len(clause) / max_chars)
+            size = math.ceil(len(clause) / count)
+            pieces.extend(clause[i:i + size] for i in range(0, len(clause), size))
+    return pieces
+
+
+def chunk_text(text: str, max_chars: int = DEFAULT_CHUNK_CHARS) -> List[str]:
+    """
+    把长文本切分为不超过 max_chars 的块，各块长度尽量接近
+
+    先按句末标点切分句子，再用最少的块数把句子分组：每个切分点取最接近均分位置的句子边界，
+    有块超长时增加一块重试；单句超过 max_chars 时在句内停顿处切分
+
+    Args:
+        text: 文本
+        max_chars: 每块最大字符数（0或负数表示不切分）
+
+    Returns:
+        块列表，拼接后与原文完全相同；文本不超过 max_chars 时返回 [text]
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text]
+
+    units = []
+    for sentence in split_sentences(text):
+        if len(sentence) <= max_chars:
+            units.append(sentence)
+        else:
+            units.extend(_split_oversized(sentence, max_chars))
+
+    # 每个句子结束位置（相对全文的字符偏移）
+    ends = []
+    position = 0
+    for unit in units:
+        position += len(unit)
+        ends.append(position)
+    total = position
+
+    for count in range(math.ceil(total / max_chars), len(units) + 1):
+        cuts = _balanced_cuts(ends, total, count)
+        if cuts is None:
+            continue
+
+        chunks = []
+        start = 0
+        for cut in cuts + [len(units)]:
+            chunks.append(''.join(units[start:cut]))
+            start = cut
+        if all(len(chunk) <= max_chars for chunk in chunks):
+            return chunks
+
+    # 每句一块（各句都不超过 max_chars）
+    return units
+
+
+def _balanced_cuts(ends: List[int], total: int, count: int):
+    """
+    选出把句子分为 count 块的切分点
+
+    第k个切分点取结束位置最接近 k * total / count 的句子边界（且在前一个切分点之后）
+
+    Returns:
+        切分点列表（切分点i表示第i个句子开始新的一块），句子不够分时返回None
+    """
+    cuts = []
+    previous = 0
+    for k in range(1, count):
+        target = k * total / count
+        # 可选范围: 前一个切分点之后，并为后面的块各留至少一个句子
+        low, high = previous + 1, len(ends) - (count - k)
+        if low > high:
+            return None
+        # 结束位置最接近目标的句子（切分点为其后一句）
+        index = bisect_left(ends, target)
+        candidates = [cut for cut in (index, index + 1) if low <= cut <= high] or [low if index < low else high]
+        best = min(candidates, key=lambda cut: abs(ends[cut - 1] - target))
+        cuts.append(best)
+        previous = best
+    return cuts
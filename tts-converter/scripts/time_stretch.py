@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地变速（不变调）
+合成时统一使用原速，再用 WSOLA（波形相似重叠相加）在本地把音频调整到角色的语速；
+同一句话不同语速只需合成一次、缓存一份，调整角色语速后也不用重新合成
+
+MP3 通过 ffmpeg 解码和重新编码（参数与原音频相同，可继续帧级拼接），16位PCM WAV 直接处理；
+需要 NumPy
+"""
+
+import io
+import subprocess
+import wave
+from typing import Tuple
+
+from audio_assembler import iter_frames
+
+
+# 语速差异小于此值时不处理（避免无意义的解码和重新编码）
+MIN_SPEED_CHANGE = 0.01
+
+# 允许的倍速范围
+MIN_SPEED = 0.5
+MAX_SPEED = 2.0
+
+# WSOLA 参数：窗长、搜索范围（毫秒）
+FRAME_MS = 30
+TOLERANCE_MS = 10
+
+
+class TimeStretchError(Exception):
+    """无法在本地变速（缺少 NumPy/ffmpeg、音频格式不支持、倍速超出范围等）"""
+
+
+class TimeStretchUnavailable(TimeStretchError):
+    """缺少 NumPy 或 ffmpeg，本地变速在本机上不可用（不只是某个片段无法处理）"""
+
+
+def _numpy():
+    """按需导入 NumPy（未安装时只影响本地变速）"""
+    try:
+        import numpy
+    except ImportError as e:
+        raise TimeStretchUnavailable("本地变速需要 NumPy: pip install numpy") from e
+    return numpy
+
+
+def rate_to_speed(rate: str) -> float:
+    """
+    将Edge TTS语速格式转换为倍速
+
+    Args:
+        rate: 语速，如 '+20%'、'-15%'
+
+    Returns:
+        倍速，如 1.2、0.85（无法解析时为 1.0）
+    """
+    try:
+        return 1 + int(rate.rstrip('%')) / 100 if rate.endswith('%') else 1.0
+    except ValueError:
+        return 1.0
+
+
+def wsola(samples, speed: float, sample_rate: int, frame_ms: float = FRAME_MS,
+          tolerance_ms: float = TOLERANCE_MS):
+    """
+    WSOLA 变速不变调
+
+    每个输出帧（汉宁窗，半帧重叠）从输入中名义位置附近 ±tolerance_ms 的范围内选取
+    与上一帧自然延续波形最相似（互相关最大）的一段，叠加后音高不变、衔接处不产生相位跳变
+
+    Args:
+        samples: 单声道PCM（一维数组，浮点）
+        speed: 倍速（>1 变快、<1 变慢）
+        sample_rate: 采样率
+        frame_ms: 窗长（毫秒）
+        tolerance_ms: 搜索范围（毫秒）
+
+    Returns:
+        变速后的PCM（float32），长度为 round(len(samples) / speed)
+    """
+    np = _numpy()
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    x = np.asarray(samples, dtype=np.float32)
+    output_length = int(round(len(x) / speed))
+    frame = max(16, int(sample_rate * frame_ms / 1000) // 2 * 2)
+    hop = frame // 2
+    tolerance = int(sample_rate * tolerance_ms / 1000)
+    if speed == 1.0 or len(x) < frame:
+        return x.copy() if speed == 1.0 else _resample_length(x, output_length)
+
+    # 周期汉宁窗，半帧重叠时叠加为常数1
+    window = np.hanning(frame + 1)[:frame].astype(np.float32)
+    frames = output_length // hop + 2
+
+    # 前面补半帧（第一帧也是完整的重叠相加），两侧再补搜索范围
+    lead = hop + tolerance
+    tail = int(frames * hop * speed) + frame + 2 * tolerance - len(x)
+    padded = np.concatenate([np.zeros(lead, np.float32), x, np.zeros(max(0, tail), np.float32)])
+
+    output = np.zeros(frames * hop + frame, np.float32)
+    previous = None
+    for k in range(frames):
+        # 输入中的名义位置（已补零坐标，未计搜索范围）
+        nominal = int(round(k * hop * speed))
+        if previous is None:
+            position = nominal
+        else:
+            # 上一帧在输入中的自然延续
+            target = padded[previous + tolerance + hop:previous + tolerance + hop + frame]
+            region = padded[nominal:nominal + 2 * tolerance + frame]
+            scores = sliding_window_view(region, frame) @ target
+            position = nominal - tolerance + int(np.argmax(scores))
+        output[k * hop:k * hop + frame] += padded[position + tolerance:position + tolerance + frame] * window
+        previous = position
+
+    return output[hop:hop + output_length]
+
+
+def _resample_length(x, length: int):
+    """过短的音频直接线性插值到目标长度"""
+    np = _numpy()
+    if length <= 0 or not len(x):
+        return np.zeros(max(0, length), np.float32)
+    return np.interp(np.linspace(0, len(x) - 1, length), np.arange(len(x)), x).astype(np.float32)
+
+
+def decode_pcm(audio: bytes) -> Tuple[object, int, str]:
+    """
+    把音频解码为单声道PCM
+
+    Returns:
+        (float32 PCM（-1~1）, 采样率, 原始格式 'wav' 或 'mp3')
+    """
+    np = _numpy()
+    if audio[:4] == b'RIFF':
+        try:
+            with wave.open(io.BytesIO(audio), 'rb') as wav:
+                if wav.getsampwidth() != 2:
+                    raise TimeStretchError(f"不支持 {wav.getsampwidth() * 8} 位WAV")
+                channels = wav.getnchannels()
+                sample_rate = wav.getframerate()
+                pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2')
+        except wave.Error as e:
+            raise TimeStretchError(f"无法读取WAV: {e}") from e
+        pcm = pcm.reshape(-1, channels).mean(axis=1) if channels > 1 else pcm
+        return pcm.astype(np.float32) / 32768, sample_rate, 'wav'
+
+    frames = list(iter_frames(audio))
+    if not frames:
+        raise TimeStretchError("不是MP3或WAV音频")
+    sample_rate = frames[0][1]['sample_rate']
+    pcm = _ffmpeg(['-i', 'pipe:0', '-f', 's16le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1'], audio)
+    return np.frombuffer(pcm, dtype='<i2').astype(np.float32) / 32768, sample_rate, 'mp3'
+
+
+def encode_like(samples, sample_rate: int, audio_format: str, reference: bytes = b'') -> bytes:
+    """
+    把PCM编码为与原音频相同的格式
+
+    MP3 使用与原音频相同的采样率和平均码率（单声道），输出可与其他片段帧级拼接
+
+    Args:
+        samples: float32 PCM
+        sample_rate: 采样率
+        audio_format: 'wav' 或 'mp3'
+        reference: 原音频（用于确定MP3码率）
+    """
+    np = _numpy()
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+    if audio_format == 'wav':
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm)
+        return buffer.getvalue()
+
+    frames = list(iter_frames(reference))
+    seconds = sum(header['samples'] for _, header in frames) / sample_rate
+    size = sum(header['frame_length'] for _, header in frames)
+    bitrate = max(8, round(size * 8 / seconds / 1000)) if seconds else 48
+    return _ffmpeg(['-f', 's16le', '-ar', str(sample_rate), '-ac', '1', '-i', 'pipe:0',
+                    '-b:a', f'{bitrate}k', '-f', 'mp3', 'pipe:1'], pcm)
+
+
+def _ffmpeg(arguments, data: bytes) -> bytes:
+    """通过管道调用ffmpeg"""
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', *arguments],
+                                input=data, capture_output=True, check=True)
+    except FileNotFoundError as e:
+        raise TimeStretchUnavailable("本地变速处理MP3需要ffmpeg") from e
+    except subprocess.CalledProcessError as e:
+        raise TimeStretchError(f"ffmpeg失败: {e.stderr.decode('utf-8', 'replace').strip()}") from e
+    return result.stdout
+
+
+def stretch_audio(audio: bytes, rate: str) -> bytes:
+    """
+    把原速合成的音频变速到指定语速（音高不变）
+
+    Args:
+        audio: 原速音频（MP3或16位WAV）
+        rate: 目标语速 (Edge TTS格式: '+20%', '-15%')
+
+    Returns:
+        变速后的音频，格式与输入相同；语速为原速时原样返回
+
+    Raises:
+        TimeStretchUnavailable: 缺少 NumPy/ffmpeg
+        TimeStretchError: 格式不支持、解码失败或倍速超出范围
+    """
+    speed = rate_to_speed(rate)
+    if not audio or abs(speed - 1.0) < MIN_SPEED_CHANGE:
+        return audio
+    if not MIN_SPEED <= speed <= MAX_SPEED:
+        raise TimeStretchError(f"语速 {rate} 超出本地变速范围")
+
+    samples, sample_rate, audio_format = decode_pcm(audio)
+    return encode_like(wsola(samples, speed, sample_rate), sample_rate, audio_format, audio)
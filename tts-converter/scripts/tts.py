@@ -11,6 +11,8 @@ import argparse
 import sys
 from pathlib import Path
 
+from voice_catalog import get_catalog
+
 
 # 默认中文女声
 DEFAULT_VOICE = "zh-CN-XiaoxiaoNeural"
@@ -75,44 +77,44 @@ def read_text_file(file_path):
         return None
 
 
-async def list_volumes(language_filter=None):
-    """列出所有可用的语音"""
-    try:
-        voices = await edge_tts.list_voices()
-
-        if language_filter:
-            voices = [v for v in voices if v['Locale'].startswith(language_filter)]
+async def list_volumes(language_filter=None, refresh=False):
+    """
+    列出所有可用的语音
 
-        print(f"\n可用语音列表 (共 {len(voices)} 个):\n")
+    从本地声音目录读取，目录超过有效期（或指定refresh）时才在线刷新
+    """
+    catalog = get_catalog()
+    if refresh:
+        await catalog.refresh()
+    else:
+        await catalog.refresh_if_stale()
 
-        # 按语言分组
-        by_locale = {}
-        for voice in voices:
-            locale = voice['Locale']
-            if locale not in by_locale:
-                by_locale[locale] = []
-            by_locale[locale].append(voice)
+    locales = [locale for locale in catalog.locales()
+               if not language_filter or locale.startswith(language_filter)]
+    by_locale = {locale: catalog.find(locale=locale, backend='edge') for locale in locales}
+    total = sum(len(voices) for voices in by_locale.values())
 
-        # 显示语音
-        for locale, locale_voices in sorted(by_locale.items()):
-            print(f"\n{locale}:")
+    print(f"\n可用语音列表 (共 {total} 个):\n")
 
-            for voice in locale_voices:
-                name = voice['Name']
-                gender = voice['Gender']
-                description = voice.get('Description', '')
+    # 按语言分组显示语音
+    for locale, locale_voices in by_locale.items():
+        if not locale_voices:
+            continue
+        print(f"\n{locale}:")
 
-                # 标记推荐语音
-                flag = " [推荐]" if "Neural" in name and locale.startswith("zh") else ""
+        for voice in sorted(locale_voices, key=lambda v: v['name']):
+            name = voice['name']
+            gender = voice.get('gender', '')
+            description = voice.get('description', '')
 
-                print(f"  - {name} ({gender}){flag}")
-                if description:
-                    print(f"    {description}")
+            # 标记推荐语音
+            flag = " [推荐]" if "Neural" in name and locale.startswith("zh") else ""
 
-        print("\n")
+            print(f"  - {name} ({gender}){flag}")
+            if description:
+                print(f"    {description}")
 
-    except Exception as e:
-        print(f"[ERROR] 获取语音列表失败: {e}", file=sys.stderr)
+    print("\n")
 
 
 def main():
@@ -141,13 +143,15 @@ def main():
                         help='音量调整（例如: +10%%, -50%%）')
     parser.add_argument('--list-voices', metavar='LANG',
                         help='列出可用语音（可选语言过滤器，如: zh, en, all）')
+    parser.add_argument('--refresh-voices', action='store_true',
+                        help='列出语音前在线刷新本地声音目录')
 
     args = parser.parse_args()
 
     # 列出语音
     if args.list_voices is not None:
         language_filter = None if args.list_voices == 'all' else args.list_voices
-        asyncio.run(list_volumes(language_filter))
+        asyncio.run(list_volumes(language_filter, args.refresh_voices))
         return 0
 
     # 检查必需参数
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTS合成结果缓存
+按 (后端, 声音, 语速, 规范化文本) 内容寻址，保存在缓存目录下的一个片段包中，超出容量按LRU淘汰
+"""
+
+import os
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+
+from clip_pack import ClipPack
+
+
+# 默认缓存容量: 2GB
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# 淘汰留下的无效数据超过容量的这一比例时整理片段包
+COMPACT_RATIO = 0.25
+
+# 命中时追加的访问记录使索引中的无效记录超过 max(条目数 × 此倍数, INDEX_COMPACT_MIN) 时重写索引
+INDEX_COMPACT_RATIO = 4
+INDEX_COMPACT_MIN = 10000
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本（合并空白），保证仅空白不同的文本命中同一缓存"""
+    return ' '.join(text.split())
+
+
+class SynthesisCache:
+    """磁盘LRU缓存"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        初始化缓存
+
+        所有条目追加写入 <缓存目录>/synthesis.pack；旧版本每个条目一个文件的缓存在首次打开时导入
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存容量上限（字节）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # 索引按最近使用时间从旧到新排列（命中时追加访问记录，重新打开后顺序不变）
+        self.pack = ClipPack(self.cache_dir / 'synthesis.pack')
+        self._import_legacy_files()
+        self._evict()
+
+    @staticmethod
+    def make_key(backend: str, voice: str, rate: str, text: str) -> str:
+        """生成缓存键"""
+        raw = '\x00'.join([backend, voice, rate, normalize_text(text)])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _import_legacy_files(self):
+        """把旧版本的缓存文件（<键前两位>/<键>.mp3）按修改时间导入片段包并删除"""
+        found = []
+        for sub in self.cache_dir.iterdir():
+            if not sub.is_dir() or len(sub.name) != 2:
+                continue
+            for entry in os.scandir(sub):
+                if entry.name.endswith('.mp3'):
+                    found.append((entry.stat().st_mtime, entry.name[:-4], entry.path))
+
+        for _, key, path in sorted(found):
+            try:
+                self.pack.put(key, Path(path).read_bytes())
+                os.unlink(path)
+            except OSError:
+                pass
+
+        if found:
+            for sub in self.cache_dir.iterdir():
+                if sub.is_dir() and len(sub.name) == 2:
+                    try:
+                        sub.rmdir()
+                    except OSError:
+                        pass
+            print(f"[INFO] 已将 {len(found)} 个旧缓存文件导入 {self.pack.path}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        读取缓存，未命中返回None
+
+        返回复制出的 bytes 而不是片段包映射上的 memoryview：合成结果会被调用方长期持有，
+        持有映射会使片段包无法整理（Windows下也无法替换文件）
+        """
+        data = self.pack.get(key, touch=True)
+        if data is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        data = bytes(data)
+        if self.pack.stale_records > max(len(self.pack) * INDEX_COMPACT_RATIO, INDEX_COMPACT_MIN):
+            # 读多写少时索引只因访问记录增长，只重写索引（数据不变）
+            self.pack.compact_index()
+        return data
+
+    def put(self, key: str, data: bytes):
+        """写入缓存"""
+        if not data or len(data) > self.max_bytes:
+            return
+
+        self.pack.put(key, data)
+        self._evict()
+
+    def _evict(self):
+        """淘汰最久未使用的条目直到低于容量上限，无效数据过多时整理片段包"""
+        if self.pack.live_bytes <= self.max_bytes:
+            return
+
+        for key in self.pack.keys():
+            if self.pack.live_bytes <= self.max_bytes:
+                break
+            self.pack.delete(key)
+            self.evictions += 1
+
+        if self.pack.dead_bytes > self.max_bytes * COMPACT_RATIO:
+            self.pack.compact()
+
+    def stats(self) -> Dict:
+        """缓存统计"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self.pack),
+            'size_bytes': self.pack.live_bytes,
+        }
+
+    def print_stats(self):
+        """打印缓存统计"""
+        stats = self.stats()
+        size_mb = stats['size_bytes'] / (1024 * 1024)
+        print(f"[INFO] 缓存: 命中 {stats['hits']}, 未命中 {stats['misses']}, "
+              f"命中率 {stats['hit_rate']:.0%}, 共 {stats['entries']} 条 ({size_mb:.1f} MB)")
@@ -6,13 +6,71 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional, Dict
+from pathlib import Path
+from typing import AsyncIterator, Optional, Dict, List, Tuple
 import asyncio
+import base64
+import array
+import hashlib
+import io
+import math
+import random
+import time
+import wave
+
+from tts_cache import SynthesisCache, DEFAULT_MAX_BYTES
+from tts_metrics import LatencyTracker, SynthesisMetrics
+from voice_catalog import get_catalog
+from audio_assembler import make_silence, make_voiced
+from text_chunker import split_sentences
+from segment_packer import join_texts, split_packed
+from time_stretch import (TimeStretchError, TimeStretchUnavailable, rate_to_speed, stretch_audio,
+                          MIN_SPEED, MAX_SPEED, MIN_SPEED_CHANGE)
+
+
+# 默认的TTS配置文件
+DEFAULT_CONFIG_FILE = Path(__file__).with_name('tts_config.yaml')
+
+
+class TTSThrottledError(Exception):
+    """服务端限流或过载（HTTP 429/503、超时），稍后重试可能成功"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# 视为限流的HTTP状态码
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数），无法解析时返回None"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """是否为限流或过载错误（包括aiohttp等库带status属性的HTTP错误和超时）"""
+    if isinstance(error, (TTSThrottledError, asyncio.TimeoutError)):
+        return True
+    return getattr(error, 'status', None) in THROTTLE_STATUSES
 
 
 class TTSBackend(ABC):
     """TTS后端抽象基类"""
 
+    # 后端名称（用于缓存键等）
+    name = 'base'
+
+    # 是否支持 synthesize_with_boundaries（可以把相邻片段合并为一个请求，见 synthesize_packed）
+    supports_boundaries = False
+
+    # 原生批量接口每批的条数（0表示 synthesize_many 逐条调用 synthesize）
+    batch_size = 0
+
     @abstractmethod
     async def synthesize(self, text: str, voice: str, rate: str = '+0%', **kwargs) -> bytes:
         """
@@ -29,15 +87,128 @@ class TTSBackend(ABC):
         """
         pass
 
-    @abstractmethod
+    async def synthesize_with_boundaries(self, text: str, voice: str, rate: str = '+0%',
+                                         **kwargs) -> Tuple[bytes, List[Tuple[float, float, str]]]:
+        """
+        合成语音并返回词边界事件
+
+        Returns:
+            (音频数据, [(开始时间秒, 时长秒, 文本)])
+        """
+        raise NotImplementedError(f"{self.name} 后端不支持边界事件")
+
+    async def synthesize_packed(self, texts: List[str], voice: str, rate: str = '+0%', **kwargs) -> List[bytes]:
+        """
+        合成同一声音、语速的多段相邻文本，返回每段的音频
+
+        后端支持边界事件时合并为一个请求，再按事件在段间停顿处切分；
+        不支持或无法恢复边界时逐段合成
+
+        Args:
+            texts: 文本列表（按播放顺序）
+            voice: 声音ID
+            rate: 语速
+
+        Returns:
+            与texts顺序一致的音频数据列表
+        """
+        if len(texts) > 1 and self.supports_boundaries:
+            text, starts = join_texts(texts)
+            audio, boundaries = await self.synthesize_with_boundaries(text, voice, rate, **kwargs)
+            parts = split_packed(audio, text, starts, boundaries)
+            if parts is not None:
+                return parts
+            print(f"[WARN] 无法从边界事件恢复片段边界，改为逐段合成（{len(texts)} 段）")
+
+        return [await self.synthesize(text, voice, rate, **kwargs) for text in texts]
+
     def get_voice_description(self, voice: str) -> str:
-        """获取声音描述"""
+        """获取声音描述（默认查询本地声音目录）"""
+        return get_catalog().describe(voice, self.name)
+
+    async def synthesize_many(self, requests: List[Dict], concurrency: int = 4) -> AsyncIterator[Tuple[int, bytes]]:
+        """
+        批量合成语音，按完成先后产出结果
+
+        默认实现并发调用synthesize；支持批量接口的后端可以重写为原生批量调用
+
+        Args:
+            requests: 请求列表，每项包含 text, voice，可选 rate 及其他合成参数
+            concurrency: 最大并发数
+
+        Yields:
+            (请求序号, 音频数据)，失败的请求产出空数据
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_one(index: int, request: Dict) -> Tuple[int, bytes]:
+            params = dict(request)
+            text = params.pop('text')
+            voice = params.pop('voice')
+            rate = params.pop('rate', '+0%')
+            async with semaphore:
+                try:
+                    return index, await self.synthesize(text, voice, rate, **params)
+                except Exception as e:
+                    print(f"[ERROR] 第{index + 1}个请求合成失败: {e!r}")
+                    return index, b''
+
+        tasks = [asyncio.ensure_future(run_one(i, req)) for i, req in enumerate(requests)]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            # 调用方提前停止迭代时取消剩余任务
+            for task in tasks:
+                task.cancel()
+
+    async def close(self):
+        """释放后端持有的连接等资源"""
         pass
 
 
+async def merge_result_streams(streams: List[Tuple[AsyncIterator[Tuple[int, bytes]], List[int]]]
+                               ) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    合并多个批量合成结果流
+
+    Args:
+        streams: [(结果流, 子批次序号到原始序号的映射)]
+
+    Yields:
+        (原始请求序号, 音频数据)，按完成先后
+    """
+    queue = asyncio.Queue()
+    finished = object()
+
+    async def pump(stream, index_map):
+        try:
+            async for index, audio in stream:
+                await queue.put((index_map[index], audio))
+        finally:
+            await queue.put(finished)
+
+    tasks = [asyncio.ensure_future(pump(stream, index_map)) for stream, index_map in streams]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is finished:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 class EdgeTTSBackend(TTSBackend):
     """Edge TTS后端"""
 
+    name = 'edge'
+
+    supports_boundaries = True
+
     def __init__(self):
         import edge_tts
         self.edge_tts = edge_tts
@@ -50,35 +221,67 @@ class EdgeTTSBackend(TTSBackend):
         if rate != '+0%':
             communicate = self.edge_tts.Communicate(text, voice, rate=rate)
 
-        # 返回音频数据
-        return await communicate.to_mp3()
+        # 收集音频数据
+        chunks = []
+        async for chunk in communicate.stream():
+            if chunk['type'] == 'audio':
+                chunks.append(chunk['data'])
 
-    def get_voice_description(self, voice: str) -> str:
-        """获取声音描述"""
-        voice_map = {
-            'zh-CN-YunxiNeural': '年轻男声',
-            'zh-CN-YunjianNeural': '成熟男声',
-            'zh-CN-XiaoxiaoNeural': '温柔女声',
-            'zh-CN-XiaoyiNeural': '成熟女声',
-        }
-        return voice_map.get(voice, '未知声音')
+        return b''.join(chunks)
+
+    async def synthesize_with_boundaries(self, text: str, voice: str, rate: str = '+0%',
+                                         **kwargs) -> Tuple[bytes, List[Tuple[float, float, str]]]:
+        """使用Edge TTS合成语音，同时收集词边界事件（时间单位为100纳秒）"""
+        communicate = self.edge_tts.Communicate(text, voice, rate=rate, boundary='WordBoundary')
+
+        chunks = []
+        boundaries = []
+        async for chunk in communicate.stream():
+            if chunk['type'] == 'audio':
+                chunks.append(chunk['data'])
+            elif chunk['type'] == 'WordBoundary':
+                boundaries.append((chunk['offset'] / 1e7, chunk['duration'] / 1e7, chunk['text']))
+
+        return b''.join(chunks), boundaries
 
 
 class GPTSoVITSBackend(TTSBackend):
     """GPT-SoVITS后端"""
 
-    def __init__(self, api_url: str = "http://localhost:9882"):
+    name = 'gptsovits'
+
+    def __init__(self, api_url: str = "http://localhost:9882", max_concurrency: int = 2,
+                 timeout: float = 60.0, connect_timeout: float = 5.0, pool_size: int = 8,
+                 batch_size: int = 0, models: Optional[Dict[str, str]] = None):
         """
         初始化GPT-SoVITS后端
 
         Args:
             api_url: GPT-SoVITS API地址
+            max_concurrency: 同时发往该服务的最大请求数
+            timeout: 单次请求总超时（秒）
+            connect_timeout: 建立连接超时（秒）
+            pool_size: 连接池大小（保持长连接复用）
+            batch_size: 服务端支持 /tts/batch 接口时每批的条数（0表示不使用批量接口）
+            models: 声音使用的模型文件 {声音ID: 模型}，覆盖默认映射（tts_config.yaml 的 models）
         """
-        self.api_url = api_url
+        self.api_url = api_url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.pool_size = pool_size
         self.voice_models = {}  # 声音模型映射
 
+        # HTTP会话在首次请求时于当前事件循环中创建
+        self._session = None
+        self._session_loop = None
+        self._semaphore = None
+
         # 加载声音模型配置
         self._load_voice_models()
+        for voice, model in (models or {}).items():
+            self.voice_models.setdefault(voice, {'description': voice, 'speed': 1.0})['model'] = model
 
     def _load_voice_models(self):
         """加载声音模型配置"""
@@ -106,38 +309,132 @@ class GPTSoVITSBackend(TTSBackend):
             },
         }
 
+    async def _get_session(self):
+        """获取当前事件循环中的HTTP会话（连接池）"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError("GPT-SoVITS后端需要安装 aiohttp: pip install aiohttp")
+
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._session_loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        return self._session
+
     async def synthesize(self, text: str, voice: str, rate: str = '+0%', **kwargs) -> bytes:
         """使用GPT-SoVITS合成语音"""
-        import requests
+        session = await self._get_session()
 
-        # 获取声音配置
+        # 调用GPT-SoVITS API
+        try:
+            async with self._semaphore:
+                async with session.post(
+                    f"{self.api_url}/tts",
+                    json=self._build_payload(text, voice, rate, **kwargs)
+                ) as response:
+                    if response.status in THROTTLE_STATUSES:
+                        raise TTSThrottledError(f"GPT-SoVITS服务繁忙 (HTTP {response.status})",
+                                                parse_retry_after(response.headers.get('Retry-After')))
+                    response.raise_for_status()
+                    return await response.read()
+        except TTSThrottledError:
+            # 限流交给调用方（自适应限流器）降速重试
+            raise
+        except asyncio.TimeoutError:
+            raise TTSThrottledError("GPT-SoVITS请求超时")
+        except Exception as e:
+            print(f"[ERROR] GPT-SoVITS调用失败: {e!r}")
+            # 返回空音频
+            return b''
+
+    def _build_payload(self, text: str, voice: str, rate: str, **kwargs) -> Dict:
+        """构造合成请求参数"""
         voice_config = self.voice_models.get(voice, {
             'model': voice,
             'description': '未知',
             'speed': 1.0
         })
 
-        # 解析语速 (从Edge TTS格式转换为倍速)
-        speed = self._parse_rate_to_speed(rate, voice_config['speed'])
+        return {
+            "text": text,
+            "model": voice_config['model'],
+            "speed": self._parse_rate_to_speed(rate, voice_config['speed']),
+            **kwargs
+        }
 
-        # 调用GPT-SoVITS API
+    async def synthesize_many(self, requests: List[Dict], concurrency: int = 4) -> AsyncIterator[Tuple[int, bytes]]:
+        """
+        批量合成语音
+
+        配置了batch_size时，每batch_size条请求合并为一次 /tts/batch 调用，
+        服务端返回 {"audios": [base64, ...]}；否则逐条并发调用
+
+        Yields:
+            (请求序号, 音频数据)，失败的请求产出空数据
+        """
+        if self.batch_size <= 1:
+            async for result in super().synthesize_many(requests, concurrency):
+                yield result
+            return
+
+        session = await self._get_session()
+
+        async def run_batch(start: int) -> List[Tuple[int, bytes]]:
+            batch = requests[start:start + self.batch_size]
+            items = []
+            for request in batch:
+                params = dict(request)
+                items.append(self._build_payload(
+                    params.pop('text'), params.pop('voice'), params.pop('rate', '+0%'), **params
+                ))
+
+            try:
+                async with self._semaphore:
+                    async with session.post(f"{self.api_url}/tts/batch", json={"items": items}) as response:
+                        response.raise_for_status()
+                        data = await response.json()
+                audios = [base64.b64decode(audio) for audio in data['audios']]
+            except Exception as e:
+                print(f"[ERROR] GPT-SoVITS批量调用失败: {e!r}")
+                audios = []
+
+            return [(start + i, audios[i] if i < len(audios) else b'') for i in range(len(batch))]
+
+        tasks = [asyncio.ensure_future(run_batch(start)) for start in range(0, len(requests), self.batch_size)]
         try:
-            response = requests.post(
-                f"{self.api_url}/tts",
-                json={
-                    "text": text,
-                    "model": voice_config['model'],
-                    "speed": speed,
-                    **kwargs
-                },
-                timeout=60
-            )
-            response.raise_for_status()
-            return response.content
-        except Exception as e:
-            print(f"[ERROR] GPT-SoVITS调用失败: {e}")
-            # 返回空音频
-            return b''
+            for future in asyncio.as_completed(tasks):
+                for result in await future:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def check_health(self, timeout: float = 2.0) -> bool:
+        """
+        探测服务的 /health 接口（不占用并发额度）
+
+        Returns:
+            服务是否返回200
+        """
+        session = await self._get_session()
+        import aiohttp
+        try:
+            async with session.get(f"{self.api_url}/health",
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                return response.status == 200
+        except Exception:
+            return False
+
+    async def close(self):
+        """关闭连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     def _parse_rate_to_speed(self, rate: str, default_speed: float = 1.0) -> float:
         """将Edge TTS语速格式转换为倍速"""
@@ -153,12 +450,234 @@ class GPTSoVITSBackend(TTSBackend):
 
     def get_voice_description(self, voice: str) -> str:
         """获取声音描述"""
-        return self.voice_models.get(voice, {}).get('description', '未知声音')
+        description = self.voice_models.get(voice, {}).get('description')
+        return description or get_catalog().describe(voice, self.name)
+
+
+class _PoolNode:
+    """服务池中的一个节点及其状态"""
+
+    def __init__(self, backend: GPTSoVITSBackend):
+        self.backend = backend
+        self.outstanding = 0  # 正在处理的请求数
+        self.healthy = True
+        self.failures = 0  # 连续失败次数
+        self.ejections = 0  # 连续被剔除的次数（决定下次重新接纳前的等待时间）
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.total_ejections = 0
+
+
+class GPTSoVITSPool(TTSBackend):
+    """
+    GPT-SoVITS服务池
+    多个GPT-SoVITS服务地址组成一个后端，每个请求发往正在处理请求最少的健康节点；
+    节点连续失败或 /health 探测失败时被剔除，之后探测恢复且等待期（按剔除次数指数增长）已过时重新接纳。
+    单个节点失败的请求改发其他节点，每个节点的并发仍受 max_concurrency 限制，
+    吞吐随节点数线性增长。可作为 HybridTTSBackend 的 'gptsovits' 后端
+    """
+
+    name = 'gptsovits'
+
+    def __init__(self, api_urls: List[str], health_interval: float = 5.0, health_timeout: float = 2.0,
+                 max_failures: int = 3, eject_seconds: float = 10.0, max_eject_seconds: float = 120.0,
+                 **node_config):
+        """
+        初始化服务池
+
+        Args:
+            api_urls: GPT-SoVITS API地址列表
+            health_interval: /health 探测间隔（秒）
+            health_timeout: /health 探测超时（秒）
+            max_failures: 连续失败多少次后剔除节点
+            eject_seconds: 剔除后至少等待多久才重新接纳（秒），每次连续剔除翻倍
+            max_eject_seconds: 等待时间上限（秒）
+            **node_config: 每个节点的配置（见 GPTSoVITSBackend: max_concurrency, timeout, batch_size 等）
+        """
+        if not api_urls:
+            raise ValueError("GPT-SoVITS服务池至少需要一个地址")
+
+        self.nodes = [_PoolNode(GPTSoVITSBackend(api_url, **node_config)) for api_url in api_urls]
+        self.api_url = ','.join(node.backend.api_url for node in self.nodes)
+        self.batch_size = node_config.get('batch_size', 0)
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+
+        self._turn = 0  # 并列时轮流选择
+        self._health_task = None
+        self._health_loop = None
+
+    def _pick(self, exclude) -> Optional[_PoolNode]:
+        """选择正在处理请求最少的健康节点；全部被剔除时选择最早可以重新接纳的节点"""
+        candidates = [node for node in self.nodes if node not in exclude]
+        if not candidates:
+            return None
+
+        healthy = [node for node in candidates if node.healthy]
+        if not healthy:
+            return min(candidates, key=lambda node: node.ejected_until)
+
+        count = len(self.nodes)
+        self._turn += 1
+        return min(healthy, key=lambda node: (node.outstanding,
+                                              (self.nodes.index(node) - self._turn) % count))
+
+    def _ensure_health_checks(self):
+        """在当前事件循环中启动后台健康探测"""
+        loop = asyncio.get_running_loop()
+        if self._health_task is None or self._health_task.done() or self._health_loop is not loop:
+            self._health_task = loop.create_task(self._health_checks())
+            self._health_loop = loop
+
+    async def _health_checks(self):
+        """定期探测所有节点的 /health，剔除失败的节点、重新接纳恢复的节点"""
+        while True:
+            results = await asyncio.gather(*(node.backend.check_health(self.health_timeout)
+                                             for node in self.nodes))
+            now = time.monotonic()
+            for node, ok in zip(self.nodes, results):
+                if not ok and node.healthy:
+                    self._eject(node, "健康检查失败")
+                elif ok and not node.healthy and now >= node.ejected_until:
+                    node.healthy = True
+                    node.failures = 0
+                    print(f"[INFO] GPT-SoVITS节点已恢复: {node.backend.api_url}")
+            await asyncio.sleep(self.health_interval)
+
+    def _eject(self, node: _PoolNode, reason: str):
+        """剔除节点"""
+        node.healthy = False
+        node.ejections += 1
+        node.total_ejections += 1
+        wait = min(self.max_eject_seconds, self.eject_seconds * 2 ** (node.ejections - 1))
+        node.ejected_until = time.monotonic() + wait
+        print(f"[WARN] GPT-SoVITS节点已剔除（{reason}）: {node.backend.api_url}，至少 {wait:.0f}s 后重新探测接纳")
+
+    def _record(self, node: _PoolNode, ok: bool):
+        """记录请求结果，连续失败达到上限时剔除节点"""
+        node.requests += 1
+        if ok:
+            node.failures = 0
+            node.ejections = 0
+            return
+        node.errors += 1
+        node.failures += 1
+        if node.healthy and node.failures >= self.max_failures:
+            self._eject(node, f"连续失败 {node.failures} 次")
+
+    async def synthesize(self, text: str, voice: str, rate: str = '+0%', **kwargs) -> bytes:
+        """发往正在处理请求最少的健康节点，失败时依次改发其他节点"""
+        self._ensure_health_checks()
+
+        tried = set()
+        throttled = None
+        while True:
+            node = self._pick(tried)
+            if node is None:
+                break
+            tried.add(node)
+
+            node.outstanding += 1
+            try:
+                audio = await node.backend.synthesize(text, voice, rate, **kwargs)
+            except TTSThrottledError as e:
+                # 节点繁忙或超时：节点本身正常，改发其他节点
+                throttled = e
+                continue
+            finally:
+                node.outstanding -= 1
+
+            self._record(node, bool(audio))
+            if audio:
+                return audio
+
+        # 所有节点都繁忙时交给调用方（自适应限流器）降速重试
+        if throttled is not None:
+            raise throttled
+        return b''
+
+    async def synthesize_many(self, requests: List[Dict], concurrency: int = 4) -> AsyncIterator[Tuple[int, bytes]]:
+        """
+        批量合成语音
+
+        配置了batch_size时每批发往一个节点（正在处理请求最少的），批量调用失败的请求逐条改发其他节点；
+        否则逐条并发调用 synthesize
+
+        Yields:
+            (请求序号, 音频数据)，失败的请求产出空数据
+        """
+        if self.batch_size <= 1:
+            async for result in super().synthesize_many(requests, concurrency):
+                yield result
+            return
+
+        self._ensure_health_checks()
+
+        async def run_batch(start: int) -> List[Tuple[int, bytes]]:
+            batch = requests[start:start + self.batch_size]
+            node = self._pick(set())
+            node.outstanding += len(batch)
+            try:
+                results = dict([result async for result in node.backend.synthesize_many(batch, concurrency)])
+            finally:
+                node.outstanding -= len(batch)
+            self._record(node, all(results.get(i) for i in range(len(batch))))
+
+            output = []
+            for i, request in enumerate(batch):
+                audio = results.get(i)
+                if not audio:
+                    params = dict(request)
+                    try:
+                        audio = await self.synthesize(params.pop('text'), params.pop('voice'),
+                                                      params.pop('rate', '+0%'), **params)
+                    except TTSThrottledError:
+                        audio = b''
+                output.append((start + i, audio))
+            return output
+
+        tasks = [asyncio.ensure_future(run_batch(start)) for start in range(0, len(requests), self.batch_size)]
+        try:
+            for future in asyncio.as_completed(tasks):
+                for result in await future:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def get_voice_description(self, voice: str) -> str:
+        """获取声音描述"""
+        return self.nodes[0].backend.get_voice_description(voice)
+
+    def print_stats(self):
+        """打印各节点的请求、失败和剔除次数"""
+        for node in self.nodes:
+            status = '正常' if node.healthy else '已剔除'
+            print(f"[INFO] GPT-SoVITS节点 {node.backend.api_url}: {status}, 请求 {node.requests}, "
+                  f"失败 {node.errors}, 剔除 {node.total_ejections} 次")
+
+    async def close(self):
+        """停止健康探测，关闭所有节点的连接池"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except (asyncio.CancelledError, RuntimeError):
+                pass
+            self._health_task = None
+        for node in self.nodes:
+            await node.backend.close()
 
 
 class XunfeiTTSBackend(TTSBackend):
     """科大讯飞TTS后端"""
 
+    name = 'xunfei'
+
     def __init__(self, app_id: str, api_key: str, api_secret: str):
         """
         初始化讯飞TTS后端
@@ -189,30 +708,920 @@ class XunfeiTTSBackend(TTSBackend):
 
     def get_voice_description(self, voice: str) -> str:
         """获取声音描述"""
-        return '讯飞声音'
+        return get_catalog().describe(voice, self.name, default='讯飞声音')
+
+
+class SyntheticTTSBackend(TTSBackend):
+    """
+    离线合成测试后端
+    不访问网络，按文本长度和语速生成确定的音频（相同的声音、语速、文本总是得到相同的数据），
+    延迟和失败按配置的分布随机产生，用于在没有Edge TTS和GPT-SoVITS的环境下测试和压测合成流水线
+    """
+
+    name = 'synthetic'
+
+    # 输出参数与Edge TTS相同
+    SAMPLE_RATE = 24000
+
+    def __init__(self, seconds_per_char: float = 0.25, latency: float = 0.0, jitter: float = 0.0,
+                 latency_per_char: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 audio_format: str = 'mp3', seed: int = 0):
+        """
+        初始化合成测试后端
+
+        Args:
+            seconds_per_char: 每个字的朗读时长（秒）
+            latency: 每个请求的延迟中位数（秒）
+            jitter: 延迟的对数正态分布参数sigma（0表示固定延迟，1左右接近真实服务的长尾）
+            latency_per_char: 每个字增加的延迟（秒），模拟长文本合成更慢
+            error_rate: 请求失败（抛出异常）的概率
+            throttle_rate: 请求被限流（抛出 TTSThrottledError）的概率
+            audio_format: 'mp3'（可与Edge TTS的输出帧级拼接）或 'wav'（16位单声道PCM，每个声音一个音高）
+            seed: 延迟和失败的随机种子
+        """
+        if audio_format not in ('mp3', 'wav'):
+            raise ValueError(f"不支持的音频格式: {audio_format}")
+
+        self.seconds_per_char = seconds_per_char
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_per_char = latency_per_char
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.audio_format = audio_format
+        self._random = random.Random(seed)
+
+        # WAV无法按帧切分，不合并请求
+        self.supports_boundaries = audio_format == 'mp3'
+
+        self.requests = 0
+        self.failures = 0
+        self.throttled = 0
+        self.chars = 0
+        self.bytes = 0
+
+    async def _simulate(self, text: str):
+        """按配置的分布等待延迟，随机抛出失败或限流"""
+        self.requests += 1
+
+        delay = self.latency * (self._random.lognormvariate(0.0, self.jitter) if self.jitter > 0 else 1.0)
+        delay += self.latency_per_char * len(text)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        draw = self._random.random()
+        if draw < self.throttle_rate:
+            self.throttled += 1
+            raise TTSThrottledError("模拟限流")
+        if draw < self.throttle_rate + self.error_rate:
+            self.failures += 1
+            raise RuntimeError("模拟合成失败")
+
+    async def synthesize(self, text: str, voice: str, rate: str = '+0%', **kwargs) -> bytes:
+        """按配置的延迟和失败分布"合成"语音"""
+        audio, _ = await self.synthesize_with_boundaries(text, voice, rate)
+        return audio
+
+    async def synthesize_with_boundaries(self, text: str, voice: str, rate: str = '+0%',
+                                         **kwargs) -> Tuple[bytes, List[Tuple[float, float, str]]]:
+        """合成语音并返回每句一个的边界事件"""
+        await self._simulate(text)
+        audio, boundaries = self.render(text, voice, rate)
+        self.chars += len(text)
+        self.bytes += len(audio)
+        return audio, boundaries
+
+    def render(self, text: str, voice: str, rate: str = '+0%') -> Tuple[bytes, List[Tuple[float, float, str]]]:
+        """
+        生成确定的音频: 开头和结尾各0.1秒静音，句子之间停顿0.25秒，句子时长与字数（不计标点）成正比
+
+        Args:
+            text: 文本
+            voice: 声音ID（决定各帧增益或音高）
+            rate: 语速 (Edge TTS格式: '+20%', '-15%')
+
+        Returns:
+            (音频数据, [(开始时间秒, 时长秒, 句子)])
+        """
+        speed = max(0.1, self._parse_rate_to_speed(rate))
+        seed = hashlib.sha256(f"{voice}\n{rate}\n{text}".encode('utf-8')).digest()
+
+        # [(是否有声, 时长)]
+        spans = [(False, self._quantize(0.1))]
+        boundaries = []
+        position = spans[0][1]
+        for sentence in split_sentences(text):
+            chars = sum(ch.isalnum() for ch in sentence)
+            if chars:
+                if len(spans) > 1:
+                    spans.append((False, self._quantize(0.25)))
+                    position += spans[-1][1]
+                duration = self._quantize(chars * self.seconds_per_char / speed)
+                spans.append((True, duration))
+                boundaries.append((position, duration, sentence.strip()))
+                position += duration
+        spans.append((False, self._quantize(0.1)))
+
+        if self.audio_format == 'wav':
+            return self._render_wav(spans, hashlib.sha256(voice.encode('utf-8')).digest()), boundaries
+
+        audio = b''.join(make_voiced(duration, seed) if voiced else make_silence(duration)
+                         for voiced, duration in spans)
+        return audio, boundaries
+
+    def _quantize(self, duration: float) -> float:
+        """MP3按帧（576个采样）取整后的时长，保证边界事件与音频对齐"""
+        if self.audio_format != 'mp3':
+            return duration
+        return round(duration * self.SAMPLE_RATE / 576) * 576 / self.SAMPLE_RATE
+
+    def _render_wav(self, spans: List[Tuple[bool, float]], voice_seed: bytes) -> bytes:
+        """生成WAV: 有声部分为声音决定音高（约150-300Hz）的正弦波"""
+        period = self.SAMPLE_RATE // (150 + voice_seed[0] * 150 // 256)
+        cycle = array.array('h', (round(8000 * math.sin(2 * math.pi * i / period)) for i in range(period)))
+        cycle_bytes = cycle.tobytes()
+
+        pcm = bytearray()
+        for voiced, duration in spans:
+            samples = round(duration * self.SAMPLE_RATE)
+            if voiced:
+                pcm += (cycle_bytes * (samples // period + 1))[:samples * 2]
+            else:
+                pcm += bytes(samples * 2)
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.SAMPLE_RATE)
+            wav.writeframes(bytes(pcm))
+        return buffer.getvalue()
+
+    @staticmethod
+    def _parse_rate_to_speed(rate: str) -> float:
+        """将Edge TTS语速格式转换为倍速"""
+        try:
+            return 1 + int(rate.rstrip('%')) / 100 if rate.endswith('%') else 1.0
+        except ValueError:
+            return 1.0
+
+    def get_voice_description(self, voice: str) -> str:
+        """获取声音描述"""
+        return f"合成测试声音（{voice}）"
+
+    def print_stats(self):
+        """打印请求统计"""
+        print(f"[INFO] synthetic 后端: 请求 {self.requests} 次, 失败 {self.failures} 次, 限流 {self.throttled} 次, "
+              f"{self.chars} 字, {self.bytes / (1024 * 1024):.1f} MB")
+
+
+class CachedTTSBackend(TTSBackend):
+    """
+    带缓存的TTS后端
+    包装任意后端，相同 (后端, 声音, 语速, 文本) 只合成一次
+    """
+
+    def __init__(self, backend: TTSBackend, cache: SynthesisCache):
+        """
+        初始化缓存后端
+
+        Args:
+            backend: 被包装的TTS后端
+            cache: 合成结果缓存
+        """
+        self.backend = backend
+        self.cache = cache
+        self.name = backend.name
+
+    async def synthesize(self, text: str, voice: str, rate: str = '+0%', **kwargs) -> bytes:
+        """优先从缓存读取，未命中时调用被包装的后端并写入缓存"""
+        # 额外参数会影响合成结果，无法安全缓存
+        if kwargs:
+            return await self.backend.synthesize(text, voice, rate, **kwargs)
+
+        key = SynthesisCache.make_key(self.backend.name, voice, rate, text)
+        audio = self.cache.get(key)
+        if audio is not None:
+            return audio
+
+        audio = await self.backend.synthesize(text, voice, rate)
+        if audio:
+            self.cache.put(key, audio)
+        return audio
+
+    @property
+    def supports_boundaries(self) -> bool:
+        return self.backend.supports_boundaries
+
+    @property
+    def batch_size(self) -> int:
+        return self.backend.batch_size
+
+    async def synthesize_packed(self, texts: List[str], voice: str, rate: str = '+0%', **kwargs) -> List[bytes]:
+        """命中缓存的段直接读取，其余各段合并为一个请求交给被包装的后端，切分后逐段写入缓存"""
+        if kwargs:
+            return await self.backend.synthesize_packed(texts, voice, rate, **kwargs)
+
+        keys = [SynthesisCache.make_key(self.backend.name, voice, rate, text) for text in texts]
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, audio in enumerate(results) if audio is None]
+        if not missing:
+            return results
+
+        parts = await self.backend.synthesize_packed([texts[i] for i in missing], voice, rate)
+        for i, audio in zip(missing, parts):
+            if audio:
+                self.cache.put(keys[i], audio)
+            results[i] = audio
+        return results
+
+    def _request_key(self, request: Dict) -> Optional[str]:
+        """批量请求的缓存键，带额外参数的请求无法安全缓存，返回None"""
+        if set(request) - {'text', 'voice', 'rate'}:
+            return None
+        return SynthesisCache.make_key(self.backend.name, request['voice'], request.get('rate', '+0%'),
+                                       request['text'])
+
+    async def synthesize_many(self, requests: List[Dict], concurrency: int = 4) -> AsyncIterator[Tuple[int, bytes]]:
+        """批量合成：命中缓存的请求立即产出，其余请求交给被包装后端批量合成"""
+        pending = []
+        pending_index = []
+
+        for index, request in enumerate(requests):
+            key = self._request_key(request)
+            audio = self.cache.get(key) if key else None
+            if audio is not None:
+                yield index, audio
+            else:
+                pending.append(request)
+                pending_index.append(index)
+
+        async for sub_index, audio in self.backend.synthesize_many(pending, concurrency):
+            key = self._request_key(pending[sub_index])
+            if audio and key:
+                self.cache.put(key, audio)
+            yield pending_index[sub_index], audio
+
+    def get_voice_description(self, voice: str) -> str:
+        """获取声音描述"""
+        return self.backend.get_voice_description(voice)
+
+    async def close(self):
+        """关闭被包装的后端"""
+        await self.backend.close()
+
+
+class AdaptiveRateLimiter:
+    """
+    自适应限流器
+
+    令牌桶限制请求速率，并发窗口限制在途请求数；两者都按AIMD调整：
+    每次成功加性增大（速率每秒约增加 increase，窗口每轮约增加1），
+    遇到限流乘性减小（乘以 decrease），同一冷却期内的多次限流只减小一次，
+    从而自动收敛到服务能持续承受的最高速率；
+    第一次遇到限流之前处于慢启动阶段，速率和窗口每轮翻倍，尽快找到上限
+    """
+
+    def __init__(self, rate: float = 5.0, concurrency: float = 4.0,
+                 min_rate: float = 0.5, max_rate: float = 50.0, max_concurrency: float = 32.0,
+                 increase: float = 1.0, decrease: float = 0.5, cooldown: float = 1.0):
+        """
+        初始化限流器
+
+        Args:
+            rate: 初始速率（请求/秒）
+            concurrency: 初始并发窗口
+            min_rate: 最低速率
+            max_rate: 最高速率
+            max_concurrency: 最大并发窗口
+            increase: 加性增大的步长（按当前速率持续成功时，速率每秒增加的请求/秒）
+            decrease: 乘性减小的系数
+            cooldown: 两次减小之间的最短间隔（秒），避免同一轮在途请求的限流被重复计算
+        """
+        self.rate = rate
+        self.concurrency = concurrency
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+
+        self.slow_start = True
+        self.in_flight = 0
+        self.successes = 0
+        self.throttled = 0
+        self.decreases = 0
+        self.wait_time = 0.0  # 请求等待令牌和并发窗口的累计时间（秒）
+
+        self._tokens = 1.0
+        self._updated = None
+        self._last_decrease = float('-inf')
+        self._condition = None
+        self._loop = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        """当前事件循环中的条件变量（限流器可能跨多次 asyncio.run 使用）"""
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            self.in_flight = 0
+        return self._condition
+
+    def _refill(self, now: float):
+        """按当前速率补充令牌（桶容量为并发窗口，允许一轮请求同时发出）"""
+        if self._updated is not None:
+            capacity = max(1.0, self.concurrency)
+            self._tokens = min(capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """等待并发窗口和令牌，成功后占用一个在途名额"""
+        condition = self._get_condition()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        async with condition:
+            while True:
+                if self.in_flight < max(1, int(self.concurrency)):
+                    now = loop.time()
+                    self._refill(now)
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        self.in_flight += 1
+                        break
+                    # 等待下一个令牌（期间速率可能变化，醒来后重新检查）
+                    delay = (1.0 - self._tokens) / self.rate
+                else:
+                    delay = None
+                try:
+                    await asyncio.wait_for(condition.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+        self.wait_time += loop.time() - start
+
+    async def release(self, throttled: bool):
+        """
+        释放在途名额并调整速率和并发窗口
+
+        Args:
+            throttled: 本次请求是否遇到限流
+        """
+        condition = self._get_condition()
+        now = asyncio.get_running_loop().time()
+
+        async with condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            if throttled:
+                self.throttled += 1
+                self.slow_start = False
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self.decreases += 1
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self.concurrency = max(1.0, self.concurrency * self.decrease)
+                    self._tokens = min(self._tokens, 0.0)
+            else:
+                self.successes += 1
+                if self.slow_start:
+                    # 每个成功请求加1，一轮（一秒/一个窗口）后翻倍
+                    self.rate = min(self.max_rate, self.rate + 1.0)
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1.0)
+                else:
+                    self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / self.concurrency)
+            condition.notify_all()
+
+    def snapshot(self) -> Dict:
+        """
+        当前状态
+
+        Returns:
+            {rate, concurrency, slow_start, in_flight, successes, throttled, decreases, wait_time}
+        """
+        return {
+            'rate': self.rate,
+            'concurrency': self.concurrency,
+            'slow_start': self.slow_start,
+            'in_flight': self.in_flight,
+            'successes': self.successes,
+            'throttled': self.throttled,
+            'decreases': self.decreases,
+            'wait_time': self.wait_time,
+        }
+
+    def print_stats(self, label: str = ''):
+        """打印限流统计"""
+        stats = self.snapshot()
+        prefix = f"{label} " if label else ''
+        print(f"[INFO] {prefix}自适应限流: 速率 {stats['rate']:.1f} 请求/秒, 并发窗口 {stats['concurrency']:.1f}, "
+              f"成功 {stats['successes']} 次, 限流 {stats['throttled']} 次（降速 {stats['decreases']} 次）, "
+              f"累计等待 {stats['wait_time']:.1f}s")
+
+
+# 各后端的默认限流参数
+DEFAULT_RATE_LIMITS = {
+    'edge': {'rate': 5.0, 'concurrency': 4.0, 'max_rate': 30.0, 'max_concurrency': 16.0},
+    'gptsovits': {'rate': 2.0, 'concurrency': 2.0, 'max_rate': 20.0, 'max_concurrency': 8.0},
+}
+
+# 进程内每个后端共享一个限流器（同一服务的多个后端实例共同受限）
+_rate_limiters = {}
+
+
+def get_rate_limiter(backend_name: str, **config) -> AdaptiveRateLimiter:
+    """
+    获取后端共享的限流器
+
+    Args:
+        backend_name: 后端名称（或服务地址等区分不同服务的键）
+        **config: 首次创建时的参数，覆盖 DEFAULT_RATE_LIMITS 中的默认值
+    """
+    if backend_name not in _rate_limiters:
+        params = dict(DEFAULT_RATE_LIMITS.get(backend_name, {}))
+        params.update(config)
+        _rate_limiters[backend_name] = AdaptiveRateLimiter(**params)
+    return _rate_limiters[backend_name]
+
+
+class RateLimitedTTSBackend(TTSBackend):
+    """
+    自适应限流的TTS后端
+    包装任意后端，每个请求先经过限流器；遇到限流时降速并按 Retry-After 或退避时间重试
+    """
+
+    def __init__(self, backend: TTSBackend, limiter: AdaptiveRateLimiter, max_retries: int = 5,
+                 backoff: float = 0.5):
+        """
+        初始化限流后端
+
+        Args:
+            backend: 被包装的TTS后端
+            limiter: 限流器
+            max_retries: 遇到限流时的最大重试次数（其他错误不重试，直接抛出）
+            backoff: 首次重试前的等待秒数（之后每次翻倍；服务端给出 Retry-After 时以其为准）
+        """
+        self.backend = backend
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.name = backend.name
+        self.retries = 0
+
+    @property
+    def supports_boundaries(self) -> bool:
+        return self.backend.supports_boundaries
+
+    async def synthesize(self, text: str, voice: str, rate: str = '+0%', **kwargs) -> bytes:
+        """经过限流器调用被包装的后端"""
+        return await self._call(self.backend.synthesize, text, voice, rate, **kwargs)
+
+    async def synthesize_with_boundaries(self, text: str, voice: str, rate: str = '+0%',
+                                         **kwargs) -> Tuple[bytes, List[Tuple[float, float, str]]]:
+        """经过限流器调用被包装的后端（返回边界事件）"""
+        return await self._call(self.backend.synthesize_with_boundaries, text, voice, rate, **kwargs)
+
+    @property
+    def batch_size(self) -> int:
+        return self.backend.batch_size
+
+    async def synthesize_many(self, requests: List[Dict], concurrency: int = 4) -> AsyncIterator[Tuple[int, bytes]]:
+        """
+        批量合成语音
+
+        被包装的后端有原生批量接口时，每批请求获取一次限流额度后整批转发（失败的请求产出空数据，不重试）；
+        否则逐条经过限流器调用 synthesize
+        """
+        batch_size = self.batch_size
+        if batch_size <= 1:
+            async for result in super().synthesize_many(requests, concurrency):
+                yield result
+            return
+
+        async def run_batch(start: int) -> List[Tuple[int, bytes]]:
+            batch = requests[start:start + batch_size]
+            await self.limiter.acquire()
+            try:
+                results = [(start + i, audio) async for i, audio in self.backend.synthesize_many(batch, concurrency)]
+            except Exception as e:
+                await self.limiter.release(is_throttle_error(e))
+                raise
+            await self.limiter.release(False)
+            return results
+
+        tasks = [asyncio.ensure_future(run_batch(start)) for start in range(0, len(requests), batch_size)]
+        try:
+            for future in asyncio.as_completed(tasks):
+                for result in await future:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _call(self, method, *args, **kwargs):
+        """获取限流额度后调用，遇到限流时降速并重试"""
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            try:
+                result = await method(*args, **kwargs)
+            except Exception as e:
+                throttled = is_throttle_error(e)
+                await self.limiter.release(throttled)
+                if not throttled or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = getattr(e, 'retry_after', None) or self.backoff * (2 ** attempt)
+                await asyncio.sleep(delay)
+                continue
+
+            await self.limiter.release(False)
+            return result
+
+    def get_voice_description(self, voice: str) -> str:
+        """获取声音描述"""
+        return self.backend.get_voice_description(voice)
+
+    def print_stats(self):
+        """打印限流统计"""
+        self.limiter.print_stats(self.name)
+        if self.retries:
+            print(f"[INFO] {self.name} 限流重试 {self.retries} 次")
+
+    async def close(self):
+        """关闭被包装的后端"""
+        await self.backend.close()
+
+
+class InstrumentedTTSBackend(TTSBackend):
+    """
+    记录合成指标的TTS后端
+    包装任意后端，把每个请求的耗时、结果、音频大小记入 SynthesisMetrics（按后端和声音分别统计）
+    """
+
+    def __init__(self, backend: TTSBackend, metrics: SynthesisMetrics):
+        """
+        初始化
+
+        Args:
+            backend: 被包装的TTS后端
+            metrics: 指标收集器
+        """
+        self.backend = backend
+        self.metrics = metrics
+        self.name = backend.name
+
+    @property
+    def supports_boundaries(self) -> bool:
+        return self.backend.supports_boundaries
+
+    async def synthesize(self, text: str, voice: str, rate: str = '+0%', **kwargs) -> bytes:
+        """调用被包装的后端并记录指标"""
+        return await self._record(self.backend.synthesize(text, voice, rate, **kwargs), text, voice, rate)
+
+    async def synthesize_with_boundaries(self, text: str, voice: str, rate: str = '+0%',
+                                         **kwargs) -> Tuple[bytes, List[Tuple[float, float, str]]]:
+        """调用被包装的后端并记录指标（返回边界事件）"""
+        call = self.backend.synthesize_with_boundaries(text, voice, rate, **kwargs)
+        return await self._record(call, text, voice, rate, with_boundaries=True)
+
+    @property
+    def batch_size(self) -> int:
+        return self.backend.batch_size
+
+    async def synthesize_many(self, requests: List[Dict], concurrency: int = 4) -> AsyncIterator[Tuple[int, bytes]]:
+        """
+        批量合成语音
+
+        被包装的后端有原生批量接口时整批转发，逐个记录产出的结果（耗时为从开始批量调用到结果产出）；
+        否则逐条调用 synthesize 并记录
+        """
+        if self.batch_size <= 1:
+            async for result in super().synthesize_many(requests, concurrency):
+                yield result
+            return
+
+        start = time.perf_counter()
+        async for index, audio in self.backend.synthesize_many(requests, concurrency):
+            request = requests[index]
+            rate = request.get('rate', '+0%')
+            self.metrics.record(self.name, request['voice'], rate, request['text'], time.perf_counter() - start,
+                                'ok' if audio else 'empty', len(audio or b''))
+            yield index, audio
+
+    async def _record(self, call, text: str, voice: str, rate: str, with_boundaries: bool = False):
+        """等待调用完成，记录耗时、结果和音频大小"""
+        start = time.perf_counter()
+        try:
+            result = await call
+        except Exception as e:
+            status = 'throttled' if is_throttle_error(e) else 'error'
+            self.metrics.record(self.name, voice, rate, text, time.perf_counter() - start, status,
+                                error=type(e).__name__)
+            raise
+
+        # 部分后端失败时返回空数据
+        audio = result[0] if with_boundaries else result
+        status = 'ok' if audio else 'empty'
+        self.metrics.record(self.name, voice, rate, text, time.perf_counter() - start, status, len(audio or b''))
+        return result
+
+    def get_voice_description(self, voice: str) -> str:
+        """获取声音描述"""
+        return self.backend.get_voice_description(voice)
+
+    async def close(self):
+        """关闭被包装的后端"""
+        await self.backend.close()
+
+
+class TimeStretchTTSBackend(TTSBackend):
+    """
+    本地变速的TTS后端
+    包装任意后端，总是以原速合成（缓存、合并请求都按原速），再在本地变速到请求的语速（音高不变）；
+    同一句话不同语速只需合成一次，调整角色语速也不用重新合成。
+    本地变速不可用时（缺少 NumPy/ffmpeg）改为让后端直接按语速合成；
+    个别片段无法变速时（解码失败、倍速超出范围等）只有该片段由后端按语速合成
+    """
+
+    NEUTRAL_RATE = '+0%'
+
+    def __init__(self, backend: TTSBackend):
+        """
+        初始化
+
+        Args:
+            backend: 被包装的TTS后端
+        """
+        self.backend = backend
+        self.name = backend.name
+        self.available = True
+        self.stretched = 0
+        self.stretch_time = 0.0
+
+    @property
+    def supports_boundaries(self) -> bool:
+        return self.backend.supports_boundaries
+
+    @property
+    def batch_size(self) -> int:
+        return self.backend.batch_size
+
+    def _use_backend_rate(self, rate: str) -> bool:
+        """是否直接让后端按语速合成（原速、本地变速不可用或倍速超出本地变速范围）"""
+        speed = rate_to_speed(rate)
+        return (not self.available or abs(speed - 1.0) < MIN_SPEED_CHANGE
+                or not MIN_SPEED <= speed <= MAX_SPEED)
+
+    async def _stretch(self, audio: bytes, rate: str) -> Optional[bytes]:
+        """在线程池中变速（不阻塞事件循环），失败时返回None"""
+        if not audio:
+            return audio
+        start = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(None, stretch_audio, audio, rate)
+        except TimeStretchUnavailable as e:
+            if self.available:
+                print(f"[WARN] 本地变速不可用，改为由后端按语速合成: {e}")
+            self.available = False
+            return None
+        except TimeStretchError as e:
+            print(f"[WARN] 片段无法在本地变速，改为由后端按语速合成: {e}")
+            return None
+        self.stretched += 1
+        self.stretch_time += time.perf_counter() - start
+        return result
+
+    async def synthesize(self, text: str, voice: str, rate: str = '+0%', **kwargs) -> bytes:
+        """以原速合成后在本地变速"""
+        if self._use_backend_rate(rate):
+            return await self.backend.synthesize(text, voice, rate, **kwargs)
+
+        audio = await self._stretch(await self.backend.synthesize(text, voice, self.NEUTRAL_RATE, **kwargs), rate)
+        if audio is None:
+            return await self.backend.synthesize(text, voice, rate, **kwargs)
+        return audio
+
+    async def synthesize_packed(self, texts: List[str], voice: str, rate: str = '+0%', **kwargs) -> List[bytes]:
+        """以原速合并合成，切分后逐段变速"""
+        if self._use_backend_rate(rate):
+            return await self.backend.synthesize_packed(texts, voice, rate, **kwargs)
+
+        parts = await self.backend.synthesize_packed(texts, voice, self.NEUTRAL_RATE, **kwargs)
+        results = []
+        for text, audio in zip(texts, parts):
+            stretched = await self._stretch(audio, rate)
+            if stretched is None:
+                stretched = await self.backend.synthesize(text, voice, rate, **kwargs)
+            results.append(stretched)
+        return results
+
+    async def synthesize_many(self, requests: List[Dict], concurrency: int = 4) -> AsyncIterator[Tuple[int, bytes]]:
+        """
+        批量合成：需要本地变速的请求按原速交给被包装的后端，结果逐个变速；
+        其余请求（原速、倍速超出范围、本地变速不可用）直接按语速合成。
+        变速失败的请求按语速重新合成，失败时产出空数据
+        """
+        local = [not self._use_backend_rate(request.get('rate', '+0%')) for request in requests]
+        forwarded = [dict(request, rate=self.NEUTRAL_RATE) if stretch else request
+                     for request, stretch in zip(requests, local)]
+
+        async for index, audio in self.backend.synthesize_many(forwarded, concurrency):
+            if audio and local[index]:
+                rate = requests[index].get('rate', '+0%')
+                # 批量进行中本地变速可能已被判定为不可用，此时直接按语速重新合成
+                stretched = await self._stretch(audio, rate) if self.available else None
+                if stretched is None:
+                    request = dict(requests[index])
+                    try:
+                        stretched = await self.backend.synthesize(request.pop('text'), request.pop('voice'),
+                                                                  request.pop('rate', '+0%'), **request)
+                    except Exception as e:
+                        print(f"[ERROR] 第{index + 1}个请求合成失败: {e!r}")
+                        stretched = b''
+                audio = stretched
+            yield index, audio
+
+    def get_voice_description(self, voice: str) -> str:
+        """获取声音描述"""
+        return self.backend.get_voice_description(voice)
+
+    def print_stats(self):
+        """打印本地变速统计"""
+        if self.stretched:
+            print(f"[INFO] 本地变速: {self.stretched} 个片段, 耗时 {self.stretch_time:.1f}s")
+
+    async def close(self):
+        """关闭被包装的后端"""
+        await self.backend.close()
+
+
+def load_tts_config(config_file: Optional[str] = None) -> Dict:
+    """
+    读取TTS配置文件
+
+    Args:
+        config_file: 配置文件路径（默认为脚本目录下的 tts_config.yaml）
+
+    Returns:
+        配置字典 {default_backend, backends: {后端: 设置}, voice_routing, ...}
+    """
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError("读取TTS配置需要安装 PyYAML: pip install pyyaml")
+
+    path = Path(config_file) if config_file else DEFAULT_CONFIG_FILE
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def backend_settings(settings: Dict, backend_type: str) -> Dict:
+    """配置文件中某个后端的设置（去掉 enabled 等不属于后端参数的项）"""
+    config = dict((settings.get('backends') or {}).get(backend_type) or {})
+    config.pop('enabled', None)
+    return config
+
+
+def backend_enabled(settings: Dict, backend_type: str) -> bool:
+    """配置文件中某个后端是否启用（未配置的后端视为启用）"""
+    return bool(((settings.get('backends') or {}).get(backend_type) or {}).get('enabled', True))
 
 
 class TTSFactory:
     """TTS工厂类"""
 
     @staticmethod
-    def create_backend(backend_type: str, **config) -> TTSBackend:
+    def create_from_config(config_file: Optional[str] = None, **options) -> TTSBackend:
+        """
+        按配置文件的 default_backend 创建后端
+
+        Args:
+            config_file: 配置文件路径（默认为脚本目录下的 tts_config.yaml）
+            **options: 缓存、限流、指标等参数（见 create_backend）
+
+        default_backend 为 hybrid 时创建混合后端: hybrid.default_backend（默认Edge TTS）为默认后端，voice_routing 中启用的后端
+        为特殊后端（各自带缓存、限流、指标），对冲和备用声音按 hybrid 部分的设置
+
+        Raises:
+            ValueError: default_backend 在配置中未启用（enabled: false）
+        """
+        settings = load_tts_config(config_file)
+        backend_type = settings.get('default_backend', 'edge')
+        if backend_type == 'hybrid':
+            return TTSFactory._create_hybrid_backend(settings, config_file, **options)
+        if not backend_enabled(settings, backend_type):
+            raise ValueError(f"TTS配置中默认后端 {backend_type} 未启用（enabled: false）")
+        return TTSFactory.create_backend(backend_type, config_file=config_file, **options)
+
+    @staticmethod
+    def _create_hybrid_backend(settings: Dict, config_file: Optional[str] = None, **options) -> TTSBackend:
+        """按配置文件的 voice_routing 和 hybrid 部分创建混合后端（没有启用的特殊后端时返回默认后端）"""
+        hybrid = settings.get('hybrid') or {}
+        voice_routing = settings.get('voice_routing') or VOICE_ROUTING
+        default_type = hybrid.get('default_backend', 'edge')
+        default_backend = TTSFactory.create_backend(default_type, config_file=config_file, **options)
+
+        special_backends = {}
+        for backend_type in sorted(set(voice_routing.values()) - {'default', default_type}):
+            if not backend_enabled(settings, backend_type):
+                print(f"[WARN] 后端 {backend_type} 未启用，路由到它的声音改用默认后端")
+                continue
+            special_backends[backend_type] = TTSFactory.create_backend(
+                backend_type, config_file=config_file, **options)
+
+        if not special_backends:
+            print("[WARN] 没有启用的特殊后端，全部声音使用默认后端")
+            return default_backend
+
+        return HybridTTSBackend(
+            default_backend,
+            special_backends,
+            fallback_voices=hybrid.get('fallback_voices'),
+            hedge=hybrid.get('hedge', True),
+            hedge_quantile=hybrid.get('hedge_quantile', 0.95),
+            hedge_delay=hybrid.get('hedge_delay', 5.0),
+            min_hedge_delay=hybrid.get('min_hedge_delay', 0.2),
+            voice_routing=voice_routing
+        )
+
+    @staticmethod
+    def create_backend(backend_type: str, cache_dir: Optional[str] = None,
+                       cache_max_bytes: int = DEFAULT_MAX_BYTES, adaptive: bool = False,
+                       rate_limit: Optional[Dict] = None, metrics: Optional[SynthesisMetrics] = None,
+                       local_rate: bool = False, config_file: Optional[str] = None, **config) -> TTSBackend:
         """
         创建TTS后端
 
         Args:
-            backend_type: 后端类型 ('edge', 'gptsovits', 'xunfei')
-            **config: 后端配置
+            backend_type: 后端类型 ('edge', 'gptsovits', 'xunfei', 'synthetic')
+            cache_dir: 合成缓存目录（为空则不使用缓存）
+            cache_max_bytes: 缓存容量上限（字节）
+            adaptive: 是否启用自适应限流（令牌桶 + AIMD并发控制，同一后端在进程内共享限流器）
+            rate_limit: 限流器参数（见 AdaptiveRateLimiter），给出时同时启用自适应限流
+            metrics: 合成指标收集器（给出时记录每个实际发往后端的请求，包括限流重试，不包括缓存命中）
+            local_rate: 是否以原速合成后在本地变速（缓存按原速保存，各语速共用）
+            config_file: TTS配置文件（给出时以其中 backends.<后端类型> 的设置为默认值）
+            **config: 后端配置（优先于配置文件）
 
         Returns:
-            TTS后端实例
+            TTS后端实例（缓存在限流之外，命中缓存的请求不占用限流额度；本地变速在缓存之外）
         """
+        if config_file is not None:
+            config = {**backend_settings(load_tts_config(config_file), backend_type), **config}
+
+        backend = TTSFactory._create_raw_backend(backend_type, **config)
+        # GPT-SoVITS按服务地址区分限流器
+        limiter_key = backend.name if backend.name != 'gptsovits' else f"gptsovits:{backend.api_url}"
+        nodes = len(backend.nodes) if isinstance(backend, GPTSoVITSPool) else 1
+
+        if metrics is not None:
+            backend = InstrumentedTTSBackend(backend, metrics)
+
+        if adaptive or rate_limit:
+            # 服务池的默认速率和并发按节点数放大
+            limits = {key: value * nodes for key, value in DEFAULT_RATE_LIMITS.get(backend.name, {}).items()}
+            limits.update(rate_limit or {})
+            backend = RateLimitedTTSBackend(backend, get_rate_limiter(limiter_key, **limits))
+
+        if cache_dir:
+            backend = CachedTTSBackend(backend, SynthesisCache(cache_dir, cache_max_bytes))
+
+        if local_rate:
+            backend = TimeStretchTTSBackend(backend)
+
+        return backend
+
+    @staticmethod
+    def _create_raw_backend(backend_type: str, **config) -> TTSBackend:
+        """创建不带缓存的TTS后端"""
         if backend_type == 'edge':
             return EdgeTTSBackend()
 
         elif backend_type == 'gptsovits':
-            api_url = config.get('api_url', 'http://localhost:9882')
-            return GPTSoVITSBackend(api_url=api_url)
+            node_config = dict(
+                max_concurrency=config.get('max_concurrency', 2),
+                timeout=config.get('timeout', 60.0),
+                connect_timeout=config.get('connect_timeout', 5.0),
+                pool_size=config.get('pool_size', 8),
+                batch_size=config.get('batch_size', 0),
+                models=config.get('models')
+            )
+
+            # 配置了多个地址时组成服务池
+            api_urls = config.get('api_urls') or [config.get('api_url', 'http://localhost:9882')]
+            if len(api_urls) > 1:
+                return GPTSoVITSPool(
+                    api_urls,
+                    health_interval=config.get('health_interval', 5.0),
+                    health_timeout=config.get('health_timeout', 2.0),
+                    max_failures=config.get('max_failures', 3),
+                    eject_seconds=config.get('eject_seconds', 10.0),
+                    max_eject_seconds=config.get('max_eject_seconds', 120.0),
+                    **node_config
+                )
+            return GPTSoVITSBackend(api_url=api_urls[0], **node_config)
 
         elif backend_type == 'xunfei':
             app_id = config.get('app_id')
@@ -224,57 +1633,272 @@ class TTSFactory:
 
             return XunfeiTTSBackend(app_id, api_key, api_secret)
 
+        elif backend_type == 'synthetic':
+            return SyntheticTTSBackend(
+                seconds_per_char=config.get('seconds_per_char', 0.25),
+                latency=config.get('latency', 0.0),
+                jitter=config.get('jitter', 0.0),
+                latency_per_char=config.get('latency_per_char', 0.0),
+                error_rate=config.get('error_rate', 0.0),
+                throttle_rate=config.get('throttle_rate', 0.0),
+                audio_format=config.get('audio_format', 'mp3'),
+                seed=config.get('seed', 0)
+            )
+
         else:
             raise ValueError(f"不支持的TTS后端: {backend_type}")
 
 
+# 特殊声音改由默认后端（Edge TTS）合成时使用的最接近的声音（对冲请求和切换时使用）
+FALLBACK_VOICES = {
+    'child_male': 'zh-CN-YunxiaNeural',
+    'child_female': 'zh-CN-XiaomengNeural',
+    'elderly_male': 'zh-CN-YunzeNeural',
+    'elderly_female': 'zh-CN-XiaoyiNeural',
+}
+
+
+# 混合后端默认的声音路由 {voice_id: 后端类型}，其他声音使用默认后端
+VOICE_ROUTING = {
+    # GPT-SoVITS处理的声音
+    'child_male': 'gptsovits',
+    'child_female': 'gptsovits',
+    'elderly_male': 'gptsovits',
+    'elderly_female': 'gptsovits',
+}
+
+# 角色年龄、性别对应的特殊声音ID前缀和后缀（见 HybridTTSBackend.special_voice）
+SPECIAL_VOICE_AGES = {'小孩': 'child', '老人': 'elderly'}
+SPECIAL_VOICE_GENDERS = {'男': 'male', '女': 'female'}
+
+
 class HybridTTSBackend(TTSBackend):
     """
     混合TTS后端
     根据声音类型自动选择合适的TTS服务
+
+    特殊声音的请求超过该后端最近的p95延迟仍未返回时，向备用后端（默认后端，使用最接近的声音）
+    发出一个对冲请求，采用先返回的结果、取消另一个；特殊后端失败或返回空音频时直接改由备用后端合成，
+    GPT-SoVITS节点卡住时不必等满超时，片段也不会丢失
     """
 
-    def __init__(self, default_backend: TTSBackend, special_backends: Dict[str, TTSBackend] = None):
+    name = 'hybrid'
+
+    def __init__(self, default_backend: TTSBackend, special_backends: Dict[str, TTSBackend] = None,
+                 fallback_backend: Optional[TTSBackend] = None, fallback_voices: Optional[Dict[str, str]] = None,
+                 hedge: bool = True, hedge_quantile: float = 0.95, hedge_delay: float = 5.0,
+                 min_hedge_delay: float = 0.2, voice_routing: Optional[Dict[str, str]] = None):
         """
         初始化混合TTS后端
 
         Args:
             default_backend: 默认TTS后端
             special_backends: 特殊声音的后端映射 {voice_id: backend}
+            fallback_backend: 特殊后端慢或失败时使用的备用后端（默认为 default_backend）
+            fallback_voices: 特殊声音在备用后端上使用的声音（默认为 FALLBACK_VOICES，不在其中的声音不切换）
+            hedge: 是否发出对冲请求（False时只在特殊后端失败后切换）
+            hedge_quantile: 按该后端最近延迟的哪个分位数决定对冲时机
+            hedge_delay: 延迟样本不足时的对冲等待时间（秒）
+            min_hedge_delay: 对冲等待时间下限（秒），避免缓存命中等极快的请求把阈值拉得过低
+            voice_routing: 声音到后端类型的路由 {voice_id: backend_type}（默认为 VOICE_ROUTING，其他声音使用默认后端）
         """
         self.default_backend = default_backend
         self.special_backends = special_backends or {}
+        self.fallback_backend = fallback_backend or default_backend
+        self.fallback_voices = FALLBACK_VOICES if fallback_voices is None else fallback_voices
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
 
         # 定义哪些声音使用特殊后端
-        self.voice_routing = {
-            # GPT-SoVITS处理的声音
-            'child_male': 'gptsovits',
-            'child_female': 'gptsovits',
-            'elderly_male': 'gptsovits',
-            'elderly_female': 'gptsovits',
-        }
+        self.voice_routing = VOICE_ROUTING if voice_routing is None else voice_routing
 
-    async def synthesize(self, text: str, voice: str, rate: str = '+0%', **kwargs) -> bytes:
-        """根据声音类型路由到合适的后端"""
-        # 确定使用哪个后端
+        # 各后端最近的延迟 {id(后端): (名称, LatencyTracker)}
+        self._latency = {id(default_backend): ('default', LatencyTracker())}
+        for backend_type, backend in self.special_backends.items():
+            self._latency.setdefault(id(backend), (backend_type, LatencyTracker()))
+
+        self.hedges = 0  # 发出的对冲请求数
+        self.hedge_wins = 0  # 对冲请求先返回的次数
+        self.failovers = 0  # 特殊后端失败后改由备用后端合成的次数
+
+    def _route(self, voice: str) -> TTSBackend:
+        """确定声音使用哪个后端"""
         backend_type = self.voice_routing.get(voice, 'default')
 
         if backend_type == 'default' or backend_type not in self.special_backends:
             # 使用默认后端
-            return await self.default_backend.synthesize(text, voice, rate, **kwargs)
+            return self.default_backend
         else:
             # 使用特殊后端
-            backend = self.special_backends[backend_type]
-            return await backend.synthesize(text, voice, rate, **kwargs)
+            return self.special_backends[backend_type]
+
+    @property
+    def special_voices(self) -> List[str]:
+        """实际由特殊后端合成的声音（路由到未配置的后端的声音不计入）"""
+        return sorted(voice for voice in self.voice_routing if self._route(voice) is not self.default_backend)
+
+    def special_voice(self, gender: str, age: str) -> Optional[str]:
+        """
+        角色对应的特殊声音（如小孩男声为 child_male）
+
+        Args:
+            gender: 角色性别（'男'/'女'）
+            age: 角色年龄（'小孩'/'老人'等）
+
+        Returns:
+            由特殊后端合成的声音ID，没有对应的特殊声音时为None
+        """
+        prefix = SPECIAL_VOICE_AGES.get(age)
+        suffix = SPECIAL_VOICE_GENDERS.get(gender)
+        if prefix is None or suffix is None:
+            return None
+        voice = f"{prefix}_{suffix}"
+        return voice if voice in self.special_voices else None
+
+    def _fallback_voice(self, voice: str, backend: TTSBackend) -> Optional[str]:
+        """声音在备用后端上对应的声音（已经由备用后端合成或没有对应声音时为None）"""
+        if backend is self.fallback_backend:
+            return None
+        return self.fallback_voices.get(voice)
+
+    def _tracker(self, backend: TTSBackend) -> LatencyTracker:
+        """后端的延迟记录"""
+        if id(backend) not in self._latency:
+            self._latency[id(backend)] = (backend.name, LatencyTracker())
+        return self._latency[id(backend)][1]
+
+    def _hedge_after(self, backend: TTSBackend) -> float:
+        """等待多久后发出对冲请求（秒）"""
+        threshold = self._tracker(backend).quantile(self.hedge_quantile)
+        return self.hedge_delay if threshold is None else max(self.min_hedge_delay, threshold)
+
+    @staticmethod
+    def _outcome(task: asyncio.Future) -> Tuple[bytes, Optional[BaseException]]:
+        """已完成的请求的 (音频, 异常)"""
+        if task.cancelled():
+            return b'', None
+        error = task.exception()
+        return (b'', error) if error is not None else (task.result(), None)
+
+    async def synthesize(self, text: str, voice: str, rate: str = '+0%', **kwargs) -> bytes:
+        """根据声音类型路由到合适的后端，特殊后端慢或失败时由备用后端合成"""
+        backend = self._route(voice)
+        fallback_voice = self._fallback_voice(voice, backend)
+        started = time.perf_counter()
+
+        if fallback_voice is None:
+            audio = await backend.synthesize(text, voice, rate, **kwargs)
+            if audio:
+                self._tracker(backend).observe(time.perf_counter() - started)
+            return audio
+
+        primary = asyncio.ensure_future(backend.synthesize(text, voice, rate, **kwargs))
+        hedge = None
+        try:
+            await asyncio.wait({primary}, timeout=self._hedge_after(backend) if self.hedge else None)
+            pending = {primary}
+            if not primary.done():
+                # 超过p95仍未返回：向备用后端发出对冲请求，采用先返回的结果
+                self.hedges += 1
+                hedge = asyncio.ensure_future(self.fallback_backend.synthesize(text, fallback_voice, rate, **kwargs))
+                pending.add(hedge)
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    audio, task_error = self._outcome(task)
+                    if audio:
+                        if task is primary:
+                            self._tracker(backend).observe(time.perf_counter() - started)
+                        elif primary.done():
+                            self.failovers += 1
+                        else:
+                            self.hedge_wins += 1
+                        return audio
+                    error = error or task_error
+                    if task is primary and hedge is None:
+                        # 特殊后端失败或返回空音频：直接改由备用后端合成
+                        hedge = asyncio.ensure_future(
+                            self.fallback_backend.synthesize(text, fallback_voice, rate, **kwargs))
+                        pending.add(hedge)
+
+            if error is not None:
+                raise error
+            return b''
+        finally:
+            if not primary.done():
+                # 被取消的请求至少耗时这么久，计入延迟（后端持续变慢时阈值随之上升，不会每个请求都对冲）
+                primary.cancel()
+                self._tracker(backend).observe(time.perf_counter() - started)
+            if hedge is not None and not hedge.done():
+                hedge.cancel()
+
+    @property
+    def supports_boundaries(self) -> bool:
+        return all(backend.supports_boundaries
+                   for backend in [self.default_backend, *self.special_backends.values()])
+
+    async def synthesize_packed(self, texts: List[str], voice: str, rate: str = '+0%', **kwargs) -> List[bytes]:
+        """根据声音类型路由到合适的后端（同一组文本声音相同），可以对冲的声音逐段合成"""
+        backend = self._route(voice)
+        if self._fallback_voice(voice, backend) is not None:
+            return [await self.synthesize(text, voice, rate, **kwargs) for text in texts]
+        return await backend.synthesize_packed(texts, voice, rate, **kwargs)
+
+    async def synthesize_many(self, requests: List[Dict], concurrency: int = 4) -> AsyncIterator[Tuple[int, bytes]]:
+        """
+        按声音路由拆分为子批次，各后端并行处理，结果按完成先后合并产出
+
+        可以对冲的声音（特殊后端且有备用声音）逐条调用 synthesize，每条单独对冲和切换
+        """
+        sub_batches = {}  # {id(backend): (backend, 子批次请求, 原始序号)}
+        hedged_batch, hedged_index_map = [], []
+
+        for index, request in enumerate(requests):
+            backend = self._route(request['voice'])
+            if self._fallback_voice(request['voice'], backend) is not None:
+                batch, index_map = hedged_batch, hedged_index_map
+            else:
+                _, batch, index_map = sub_batches.setdefault(id(backend), (backend, [], []))
+            batch.append(request)
+            index_map.append(index)
+
+        streams = [
+            (backend.synthesize_many(batch, concurrency), index_map)
+            for backend, batch, index_map in sub_batches.values()
+        ]
+        if hedged_batch:
+            streams.append((super().synthesize_many(hedged_batch, concurrency), hedged_index_map))
+
+        async for result in merge_result_streams(streams):
+            yield result
 
     def get_voice_description(self, voice: str) -> str:
         """获取声音描述"""
-        backend_type = self.voice_routing.get(voice, 'default')
+        return self._route(voice).get_voice_description(voice)
 
-        if backend_type == 'default' or backend_type not in self.special_backends:
-            return self.default_backend.get_voice_description(voice)
-        else:
-            return self.special_backends[backend_type].get_voice_description(voice)
+    def print_stats(self):
+        """打印各后端最近的延迟和对冲、切换次数"""
+        for name, tracker in self._latency.values():
+            threshold = tracker.quantile(self.hedge_quantile)
+            if threshold is not None:
+                print(f"[INFO] 后端 {name}: 最近 {len(tracker)} 个请求, "
+                      f"p{self.hedge_quantile * 100:g} 延迟 {threshold:.2f}s")
+        if self.hedges or self.failovers:
+            print(f"[INFO] 对冲请求 {self.hedges} 次（备用后端先返回 {self.hedge_wins} 次）, "
+                  f"失败切换 {self.failovers} 次")
+
+    async def close(self):
+        """关闭所有后端"""
+        await self.default_backend.close()
+        for backend in self.special_backends.values():
+            await backend.close()
+        if all(self.fallback_backend is not backend
+               for backend in [self.default_backend, *self.special_backends.values()]):
+            await self.fallback_backend.close()
 
 
 # 测试代码
@@ -310,4 +1934,6 @@ if __name__ == '__main__':
         )
         print("✓ 混合后端创建成功")
 
+        await hybrid_backend.close()
+
     asyncio.run(test_tts())
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTS合成指标
+按 (后端, 声音) 统计请求数、延迟直方图、字节/秒、字符/秒、重试和错误次数，
+运行结束时导出JSON摘要，也可以导出Prometheus文本格式（node_exporter textfile collector）；
+LatencyTracker 按最近的请求估计各后端的延迟分位数，供混合后端决定何时发出对冲请求
+"""
+
+import json
+import math
+import time
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+
+# 延迟直方图的桶上界（秒），最后一个桶为 +Inf
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 请求结果
+STATUSES = ('ok', 'empty', 'throttled', 'error')
+
+# 记住失败请求的上限（用于识别重试），超过后清空
+_MAX_FAILED_KEYS = 10000
+
+
+class VoiceStats:
+    """单个 (后端, 声音) 的统计数据"""
+
+    def __init__(self):
+        self.requests = {status: 0 for status in STATUSES}
+        self.errors = {}  # {异常类型: 次数}
+        self.retries = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.bytes = 0
+        self.chars = 0
+        self.ok_latency = 0.0  # 成功请求的耗时总和（计算字节/秒、字符/秒）
+
+    @property
+    def count(self) -> int:
+        return sum(self.requests.values())
+
+    def observe(self, latency: float, status: str, chars: int, size: int, error: Optional[str] = None):
+        """记录一次请求"""
+        self.requests[status] += 1
+        self.buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        if status == 'ok':
+            self.bytes += size
+            self.chars += chars
+            self.ok_latency += latency
+        if error:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def merge(self, other: 'VoiceStats'):
+        """累加另一个统计（用于按后端汇总）"""
+        for status in STATUSES:
+            self.requests[status] += other.requests[status]
+        for error, count in other.errors.items():
+            self.errors[error] = self.errors.get(error, 0) + count
+        self.retries += other.retries
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.latency_sum += other.latency_sum
+        self.latency_max = max(self.latency_max, other.latency_max)
+        self.bytes += other.bytes
+        self.chars += other.chars
+        self.ok_latency += other.ok_latency
+
+    def quantile(self, q: float) -> float:
+        """按直方图估计延迟分位数（桶内线性插值，落在 +Inf 桶时返回最大延迟）"""
+        count = self.count
+        if not count:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        for index, bucket in enumerate(self.buckets):
+            if bucket and cumulative + bucket >= rank:
+                if index == len(LATENCY_BUCKETS):
+                    return self.latency_max
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                upper = min(LATENCY_BUCKETS[index], self.latency_max)
+                return lower + (max(upper, lower) - lower) * (rank - cumulative) / bucket
+            cumulative += bucket
+        return self.latency_max
+
+    def to_dict(self) -> Dict:
+        """导出为字典"""
+        count = self.count
+        return {
+            'requests': count,
+            'status': dict(self.requests),
+            'errors': dict(self.errors),
+            'retries': self.retries,
+            'latency': {
+                'avg': self.latency_sum / count if count else 0.0,
+                'p50': self.quantile(0.5),
+                'p95': self.quantile(0.95),
+                'p99': self.quantile(0.99),
+                'max': self.latency_max,
+                'buckets': {('+Inf' if i == len(LATENCY_BUCKETS) else f"{LATENCY_BUCKETS[i]:g}"): n
+                            for i, n in enumerate(self.buckets)},
+            },
+            'bytes': self.bytes,
+            'chars': self.chars,
+            'bytes_per_second': self.bytes / self.ok_latency if self.ok_latency else 0.0,
+            'chars_per_second': self.chars / self.ok_latency if self.ok_latency else 0.0,
+        }
+
+
+class SynthesisMetrics:
+    """合成指标收集器（同一次运行的所有后端共用一个）"""
+
+    def __init__(self):
+        self.stats = {}  # {(后端, 声音): VoiceStats}
+        self.started = time.time()
+        self._failed_keys = set()
+
+    def _stats_for(self, backend: str, voice: str) -> VoiceStats:
+        key = (backend, voice)
+        if key not in self.stats:
+            self.stats[key] = VoiceStats()
+        return self.stats[key]
+
+    def record(self, backend: str, voice: str, rate: str, text: str, latency: float,
+               status: str, size: int = 0, error: Optional[str] = None):
+        """
+        记录一次合成请求
+
+        同一 (后端, 声音, 语速, 文本) 在失败之后再次请求时记为一次重试
+        （调度器、限流器等任何一层的重试都能识别）
+
+        Args:
+            backend: 后端名称
+            voice: 声音ID
+            rate: 语速
+            text: 文本
+            latency: 耗时（秒）
+            status: 'ok', 'empty'（返回空数据）, 'throttled'（限流）, 'error'
+            size: 音频字节数
+            error: 失败时的异常类型名
+        """
+        stats = self._stats_for(backend, voice)
+        request_key = (backend, voice, rate, text)
+        if request_key in self._failed_keys:
+            stats.retries += 1
+            self._failed_keys.discard(request_key)
+
+        stats.observe(latency, status, len(text), size, error)
+
+        if status != 'ok':
+            if len(self._failed_keys) >= _MAX_FAILED_KEYS:
+                self._failed_keys.clear()
+            self._failed_keys.add(request_key)
+
+    def by_backend(self) -> Dict[str, VoiceStats]:
+        """按后端汇总"""
+        totals = {}
+        for (backend, _), stats in self.stats.items():
+            totals.setdefault(backend, VoiceStats()).merge(stats)
+        return totals
+
+    def to_dict(self) -> Dict:
+        """
+        导出JSON摘要
+
+        Returns:
+            {started, elapsed, backends: {后端: 汇总}, voices: [{backend, voice, ...}]}
+        """
+        return {
+            'started': self.started,
+            'elapsed': time.time() - self.started,
+            'backends': {backend: stats.to_dict() for backend, stats in sorted(self.by_backend().items())},
+            'voices': [dict(backend=backend, voice=voice, **stats.to_dict())
+                       for (backend, voice), stats in sorted(self.stats.items())],
+        }
+
+    def to_prometheus(self) -> str:
+        """导出Prometheus文本格式"""
+        lines = [
+            '# HELP tts_synthesis_requests_total TTS synthesis requests by result.',
+            '# TYPE tts_synthesis_requests_total counter',
+        ]
+        items = sorted(self.stats.items())
+
+        def labels(backend: str, voice: str, **extra) -> str:
+            pairs = [('backend', backend), ('voice', voice)] + list(extra.items())
+            return ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+        for (backend, voice), stats in items:
+            for status, count in stats.requests.items():
+                lines.append(f"tts_synthesis_requests_total{{{labels(backend, voice, status=status)}}} {count}")
+
+        lines += ['# HELP tts_synthesis_retries_total Requests repeated after a failure.',
+                  '# TYPE tts_synthesis_retries_total counter']
+        lines += [f"tts_synthesis_retries_total{{{labels(b, v)}}} {s.retries}" for (b, v), s in items]
+
+        lines += ['# HELP tts_synthesis_errors_total Failed requests by exception type.',
+                  '# TYPE tts_synthesis_errors_total counter']
+        for (backend, voice), stats in items:
+            for error, count in sorted(stats.errors.items()):
+                lines.append(f"tts_synthesis_errors_total{{{labels(backend, voice, error=error)}}} {count}")
+
+        lines += ['# HELP tts_synthesis_latency_seconds TTS synthesis request latency.',
+                  '# TYPE tts_synthesis_latency_seconds histogram']
+        for (backend, voice), stats in items:
+            cumulative = 0
+            for index, count in enumerate(stats.buckets):
+                cumulative += count
+                bound = '+Inf' if index == len(LATENCY_BUCKETS) else f"{LATENCY_BUCKETS[index]:g}"
+                lines.append(f"tts_synthesis_latency_seconds_bucket{{{labels(backend, voice, le=bound)}}} {cumulative}")
+            lines.append(f"tts_synthesis_latency_seconds_sum{{{labels(backend, voice)}}} {stats.latency_sum:.6f}")
+            lines.append(f"tts_synthesis_latency_seconds_count{{{labels(backend, voice)}}} {stats.count}")
+
+        lines += ['# HELP tts_synthesis_bytes_total Audio bytes returned by successful requests.',
+                  '# TYPE tts_synthesis_bytes_total counter']
+        lines += [f"tts_synthesis_bytes_total{{{labels(b, v)}}} {s.bytes}" for (b, v), s in items]
+
+        lines += ['# HELP tts_synthesis_chars_total Characters synthesized by successful requests.',
+                  '# TYPE tts_synthesis_chars_total counter']
+        lines += [f"tts_synthesis_chars_total{{{labels(b, v)}}} {s.chars}" for (b, v), s in items]
+
+        return '\n'.join(lines) + '\n'
+
+    def save(self, json_file: Optional[str] = None, prometheus_file: Optional[str] = None):
+        """
+        写出指标文件（先写临时文件再替换，textfile collector 不会读到半个文件）
+
+        Args:
+            json_file: JSON摘要路径
+            prometheus_file: Prometheus文本格式路径
+        """
+        outputs = []
+        if json_file:
+            outputs.append((json_file, json.dumps(self.to_dict(), ensure_ascii=False, indent=2)))
+        if prometheus_file:
+            outputs.append((prometheus_file, self.to_prometheus()))
+
+        for path, content in outputs:
+            _write_metrics_file(path, content)
+
+    def print_summary(self):
+        """打印各后端、各声音的统计"""
+        if not self.stats:
+            return
+
+        print(f"\n[INFO] 合成指标:")
+        for backend, total in sorted(self.by_backend().items()):
+            rows = [(backend, total)]
+            rows += [(f"  {voice}", stats) for (name, voice), stats in sorted(self.stats.items()) if name == backend]
+            for label, stats in rows:
+                summary = stats.to_dict()
+                failed = stats.count - stats.requests['ok']
+                print(f"  {label}: 请求 {stats.count}, 失败 {failed}, 重试 {stats.retries}, "
+                      f"延迟 p50 {summary['latency']['p50']:.2f}s / p95 {summary['latency']['p95']:.2f}s, "
+                      f"{summary['chars_per_second']:.0f} 字/秒, {summary['bytes_per_second'] / 1024:.0f} KB/秒")
+
+
+class LatencyTracker:
+    """
+    最近若干次请求的延迟（滑动窗口），估计当前的延迟分位数
+
+    与 VoiceStats 的直方图不同，只反映最近的情况：服务变慢或恢复后，分位数随窗口很快跟上
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """
+        Args:
+            window: 保留最近多少次请求的延迟
+            min_samples: 样本少于此数时不估计分位数
+        """
+        self.min_samples = min_samples
+        self.samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def observe(self, latency: float):
+        """记录一次请求的延迟（秒）"""
+        self.samples.append(latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        窗口内延迟的分位数（最近秩）
+
+        Returns:
+            延迟（秒），样本不足时返回None
+        """
+        if len(self.samples) < max(1, self.min_samples):
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def merge_prometheus_files(files: Iterable[Union[str, Path]], output_file: Union[str, Path]) -> bool:
+    """
+    合并多个 to_prometheus() 导出的文件，相同指标、相同标签的样本相加后写出一个文件
+
+    按章节并行渲染时每个子进程导出自己的文件，由父进程合并为一个
+    （导出的都是计数器和直方图，可以直接相加）
+
+    Args:
+        files: 各子进程导出的文件（不存在的跳过）
+        output_file: 合并后的文件
+
+    Returns:
+        是否写出了合并文件
+    """
+    families = {}  # {指标名: (注释行, {样本: 数值})}，按首次出现的顺序
+    floats = set()  # 以小数形式输出的样本
+    current = None
+    found = False
+    for path in files:
+        try:
+            text = Path(path).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            print(f"[WARN] 合成指标读取失败: {e}")
+            continue
+        found = True
+
+        for line in text.splitlines():
+            if line.startswith('# '):
+                # "# HELP 指标名 ..." / "# TYPE 指标名 类型"
+                current = line.split()[2]
+                comments, _ = families.setdefault(current, ([], {}))
+                if line not in comments:
+                    comments.append(line)
+            elif line.strip() and current is not None:
+                series, value = line.rsplit(' ', 1)
+                samples = families[current][1]
+                samples[series] = samples.get(series, 0) + float(value)
+                if '.' in value:
+                    floats.add(series)
+
+    if not found:
+        return False
+
+    lines = []
+    for comments, samples in families.values():
+        lines += comments
+        lines += [f"{series} {value:.6f}" if series in floats else f"{series} {int(value)}"
+                  for series, value in samples.items()]
+    return _write_metrics_file(output_file, '\n'.join(lines) + '\n')
+
+
+def _write_metrics_file(path: Union[str, Path], content: str) -> bool:
+    """写出指标文件（先写临时文件再替换，textfile collector 不会读到半个文件）"""
+    path = Path(path)
+    temp_path = path.with_name(path.name + '.tmp')
+    try:
+        temp_path.write_text(content, encoding='utf-8')
+        temp_path.replace(path)
+    except OSError as e:
+        print(f"[WARN] 合成指标写入失败: {e}")
+        return False
+    print(f"[INFO] 合成指标已保存: {path}")
+    return True
+
+
+def _escape(value: str) -> str:
+    """转义Prometheus标签值"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全局最优声音分配
+把"角色 × (声音, 语速)组合"的分配看作带权二部匹配，用最小费用流一次求出全局最优解：
+尽量使用规则推荐的声音和语速，尽量不让两个角色听起来相同，组合用完时按代价最小的方式共用
+"""
+
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+from voice_catalog import VoiceCatalog, get_catalog
+
+
+# 可选的语速档位
+RATE_STEPS = ['-20%', '-15%', '-10%', '+0%', '+10%', '+20%', '+30%']
+
+# 代价参数
+VOICE_COST_SAME_CATEGORY = 2.0   # 换用同类别的其他声音
+VOICE_COST_SAME_GENDER = 5.0     # 换用同性别、不同类别的声音
+VOICE_COST_OTHER_GENDER = 1000.0  # 换用异性声音（实际上禁止）
+RATE_COST_PER_5_PERCENT = 0.5    # 语速每偏离5%
+DUPLICATE_VARIANT_COST = 10.0    # 同一(声音, 语速)组合每多一个角色共用
+SHARED_VOICE_COST = 6.0          # 同一声音每多一个角色使用（即使语速不同，也不如换一个同性别声音好区分）
+
+GENDER_MAP = {'男': 'Male', '女': 'Female'}
+
+# 判断约化费用为0时的浮点误差
+EPSILON = 1e-9
+
+
+def rate_to_percent(rate: str) -> int:
+    """把 '+20%' 格式的语速转换为整数百分比"""
+    return int(rate.rstrip('%'))
+
+
+class VoiceAssignmentSolver:
+    """
+    声音分配求解器
+
+    角色按 (推荐声音, 推荐语速, 性别) 合并为若干类，费用流网络为:
+    源点 -> 角色类(容量为角色数) -> (声音, 语速)组合 -> 声音 -> 汇点，
+    后两段的费用随使用次数线性增长（凸费用），用逐次最短路（Dijkstra + 势函数）求最小费用流
+    """
+
+    def __init__(self, catalog: Optional[VoiceCatalog] = None, rates: Optional[List[str]] = None,
+                 voices: Optional[List[str]] = None):
+        """
+        初始化求解器，建立声音反向索引
+
+        Args:
+            catalog: 声音目录（默认使用本地声音目录）
+            rates: 可选语速档位（默认 RATE_STEPS）
+            voices: 可选声音列表（默认目录中全部中文Edge声音）
+        """
+        self.catalog = catalog if catalog is not None else get_catalog()
+        self.rates = list(rates or RATE_STEPS)
+
+        if voices is None:
+            voices = [entry['name'] for entry in self.catalog.find(backend='edge')
+                      if entry.get('locale', '').startswith('zh-CN')]
+        self.voices = list(dict.fromkeys(voices))
+
+        # 反向索引: 声音 -> 类别/性别
+        self.voice_category = {}
+        self.voice_gender = {}
+        for voice in self.voices:
+            entry = self.catalog.get(voice) or {}
+            self.voice_category[voice] = entry.get('category')
+            self.voice_gender[voice] = entry.get('gender')
+
+        # 所有(声音, 语速)组合
+        self.variants = [(voice, rate) for voice in self.voices for rate in self.rates]
+        self._rate_percent = {rate: rate_to_percent(rate) for rate in self.rates}
+
+    def _variant_cost(self, voice: str, target_rate: str, gender: str,
+                      variant: Tuple[str, str]) -> float:
+        """某类角色使用某个组合的代价"""
+        variant_voice, variant_rate = variant
+
+        if variant_voice == voice:
+            cost = 0.0
+        elif self.voice_category.get(variant_voice) and \
+                self.voice_category.get(variant_voice) == self.voice_category.get(voice):
+            cost = VOICE_COST_SAME_CATEGORY
+        elif gender and self.voice_gender.get(variant_voice) == gender:
+            cost = VOICE_COST_SAME_GENDER
+        else:
+            cost = VOICE_COST_OTHER_GENDER
+
+        deviation = abs(self._rate_percent[variant_rate] - rate_to_percent(target_rate))
+        return cost + RATE_COST_PER_5_PERCENT * deviation / 5
+
+    def solve(self, requests: List[Dict]) -> List[Tuple[str, str]]:
+        """
+        求解全局最优分配
+
+        Args:
+            requests: 每个角色的推荐 [{voice, rate, gender}]，gender为'男'/'女'/其他
+
+        Returns:
+            与requests顺序一致的 [(声音, 语速), ...]
+        """
+        if not requests:
+            return []
+
+        # 相同推荐的角色合并为一类
+        groups = {}
+        request_group = []
+        for request in requests:
+            gender = GENDER_MAP.get(request.get('gender')) or self.voice_gender.get(request['voice'])
+            key = (request['voice'], request['rate'], gender)
+            request_group.append(groups.setdefault(key, len(groups)))
+        group_keys = list(groups)
+
+        # 推荐的声音或语速不在候选中时加入候选
+        extra_voices = [voice for voice, _, _ in group_keys if voice not in self.voice_category]
+        extra_rates = [rate for _, rate, _ in group_keys if rate not in self._rate_percent]
+        if extra_voices or extra_rates:
+            solver = VoiceAssignmentSolver(
+                self.catalog,
+                rates=self.rates + list(dict.fromkeys(extra_rates)),
+                voices=self.voices + list(dict.fromkeys(extra_voices))
+            )
+            return solver.solve(requests)
+
+        supply = [0] * len(group_keys)
+        for group in request_group:
+            supply[group] += 1
+
+        costs = [[self._variant_cost(voice, rate, gender, variant) for variant in self.variants]
+                 for voice, rate, gender in group_keys]
+
+        flow = self._min_cost_flow(supply, costs)
+
+        # 把每类分到的组合按顺序分给该类的角色
+        group_variants = [[] for _ in group_keys]
+        for group, variant_flows in enumerate(flow):
+            for variant, count in variant_flows.items():
+                group_variants[group].extend([self.variants[variant]] * count)
+
+        result = []
+        cursors = [0] * len(group_keys)
+        for group in request_group:
+            result.append(group_variants[group][cursors[group]])
+            cursors[group] += 1
+        return result
+
+    def _min_cost_flow(self, supply: List[int], costs: List[List[float]]) -> List[Dict[int, int]]:
+        """
+        逐次最短路求最小费用流
+
+        每次用Dijkstra（约化费用 + 势函数）求一条最短增广路并增广一个单位；
+        节点编号: 角色类 [0, G)，组合 [G, G+M)，声音 [G+M, G+M+V)，汇点 G+M+V，源点 G+M+V+1
+
+        Returns:
+            每个角色类分到各组合的数量 [{组合序号: 数量}]
+        """
+        group_count = len(supply)
+        variant_count = len(self.variants)
+        voice_index = {voice: i for i, voice in enumerate(self.voices)}
+        variant_voice = [voice_index[voice] for voice, _ in self.variants]
+        voice_variants = [[] for _ in self.voices]  # 反向索引: 声音 -> 组合
+        for variant, voice in enumerate(variant_voice):
+            voice_variants[voice].append(variant)
+
+        variant_base = group_count
+        voice_base = group_count + variant_count
+        sink = voice_base + len(self.voices)
+        source = sink + 1
+        node_count = source + 1
+
+        # 角色类 -> 组合的边；有同性别声音可选时去掉异性声音的边
+        group_edges = []
+        for row in costs:
+            edges = [(variant_base + variant, cost) for variant, cost in enumerate(row)
+                     if cost < VOICE_COST_OTHER_GENDER]
+            group_edges.append(edges or [(variant_base + variant, cost) for variant, cost in enumerate(row)])
+
+        flow = [dict() for _ in range(group_count)]  # 角色类 -> {组合: 数量}
+        variant_users = [dict() for _ in range(variant_count)]  # 组合 -> {角色类: 数量}
+        variant_load = [0] * variant_count
+        voice_load = [0] * len(self.voices)
+        remaining = list(supply)
+
+        potential = [0.0] * node_count
+        infinity = float('inf')
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        while any(remaining):
+            dist = [infinity] * node_count
+            parent = [-1] * node_count
+            dist[source] = 0.0
+            heap = []
+            for group in range(group_count):
+                if remaining[group]:
+                    # 源点 -> 角色类（还有未分配的角色）
+                    dist[group] = potential[source] - potential[group]
+                    parent[group] = source
+                    heap.append((dist[group], group))
+            heapq.heapify(heap)
+
+            while heap:
+                d, node = heappop(heap)
+                if d > dist[node]:
+                    continue
+                if node == sink:
+                    break
+
+                base = d + potential[node]
+                if node < variant_base:
+                    # 角色类 -> 组合
+                    for target, cost in group_edges[node]:
+                        nd = base + cost - potential[target]
+                        if nd < dist[target]:
+                            dist[target] = nd
+                            parent[target] = node
+                            heappush(heap, (nd, target))
+                elif node < voice_base:
+                    variant = node - variant_base
+                    # 组合 -> 声音（下一个使用者的边际代价）
+                    target = voice_base + variant_voice[variant]
+                    nd = base + DUPLICATE_VARIANT_COST * variant_load[variant] - potential[target]
+                    if nd < dist[target]:
+                        dist[target] = nd
+                        parent[target] = node
+                        heappush(heap, (nd, target))
+                    # 组合 -> 角色类（退回已有流量）
+                    for group in variant_users[variant]:
+                        nd = base - costs[group][variant] - potential[group]
+                        if nd < dist[group]:
+                            dist[group] = nd
+                            parent[group] = node
+                            heappush(heap, (nd, group))
+                else:
+                    voice = node - voice_base
+                    # 声音 -> 汇点
+                    nd = base + SHARED_VOICE_COST * voice_load[voice] - potential[sink]
+                    if nd < dist[sink]:
+                        dist[sink] = nd
+                        parent[sink] = node
+                        heappush(heap, (nd, sink))
+                    # 声音 -> 组合（退回已有流量）
+                    for variant in voice_variants[voice]:
+                        load = variant_load[variant]
+                        if load:
+                            target = variant_base + variant
+                            nd = base - DUPLICATE_VARIANT_COST * (load - 1) - potential[target]
+                            if nd < dist[target]:
+                                dist[target] = nd
+                                parent[target] = node
+                                heappush(heap, (nd, target))
+
+            # 更新势函数（距离超过汇点的节点按汇点距离处理，保证约化费用非负）
+            limit = dist[sink]
+            for node in range(node_count):
+                potential[node] += min(dist[node], limit)
+
+            # 沿最短路增广一个单位（路径可能经过退回边，需逐边处理）
+            node = sink
+            while node != source:
+                prev = parent[node]
+                if prev == source:
+                    remaining[node] -= 1
+                elif prev < variant_base:
+                    variant = node - variant_base
+                    flow[prev][variant] = flow[prev].get(variant, 0) + 1
+                    variant_users[variant][prev] = variant_users[variant].get(prev, 0) + 1
+                elif prev < voice_base:
+                    variant = prev - variant_base
+                    if node < variant_base:
+                        flow[node][variant] -= 1
+                        variant_users[variant][node] -= 1
+                        if not flow[node][variant]:
+                            del flow[node][variant]
+                            del variant_users[variant][node]
+                    else:
+                        variant_load[variant] += 1
+                elif node == sink:
+                    voice_load[prev - voice_base] += 1
+                else:
+                    variant_load[node - variant_base] -= 1
+                node = prev
+
+            # 势函数更新后约化费用为0的路径都是最短路: 直接增广其中不经过退回边的路径，省去多次Dijkstra
+            for group in range(group_count):
+                if not remaining[group]:
+                    continue
+                reduced_source = potential[source] - potential[group]
+                if reduced_source > EPSILON:
+                    continue
+                group_potential = potential[group]
+                for target, cost in group_edges[group]:
+                    while remaining[group]:
+                        variant = target - variant_base
+                        voice = variant_voice[variant]
+                        voice_node = voice_base + voice
+                        if (abs(group_potential + cost - potential[target]) > EPSILON
+                                or abs(potential[target] + DUPLICATE_VARIANT_COST * variant_load[variant]
+                                       - potential[voice_node]) > EPSILON
+                                or abs(potential[voice_node] + SHARED_VOICE_COST * voice_load[voice]
+                                       - potential[sink]) > EPSILON):
+                            break
+                        remaining[group] -= 1
+                        flow[group][variant] = flow[group].get(variant, 0) + 1
+                        variant_users[variant][group] = variant_users[variant].get(group, 0) + 1
+                        variant_load[variant] += 1
+                        voice_load[voice] += 1
+                    if not remaining[group]:
+                        break
+
+        return flow
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地声音目录
+把各后端可用的声音保存在磁盘上，按名称、语言、性别、类别、后端建立索引；
+查询不访问网络，目录超过有效期后由列表命令在线刷新，刷新失败时继续使用本地数据
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# 默认目录文件位置（可用环境变量 TTS_VOICE_CATALOG 覆盖）
+DEFAULT_CATALOG_PATH = Path.home() / '.cache' / 'tts-converter' / 'voice_catalog.json'
+
+# 默认有效期: 7天
+DEFAULT_TTL = 7 * 24 * 3600
+
+# 内置声音（离线可用，也为在线刷新得到的声音补充中文描述和类别）
+BUILTIN_VOICES = [
+    {'name': 'zh-CN-XiaoxiaoNeural', 'backend': 'edge', 'locale': 'zh-CN', 'gender': 'Female',
+     'description': '温柔女声', 'category': 'female-young'},
+    {'name': 'zh-CN-XiaomengNeural', 'backend': 'edge', 'locale': 'zh-CN', 'gender': 'Female',
+     'description': '活泼女声', 'category': 'female-young'},
+    {'name': 'zh-CN-XiaoyiNeural', 'backend': 'edge', 'locale': 'zh-CN', 'gender': 'Female',
+     'description': '成熟女声', 'category': 'female-mature'},
+    {'name': 'zh-CN-liaoning-XiaobeiNeural', 'backend': 'edge', 'locale': 'zh-CN-liaoning', 'gender': 'Female',
+     'description': '东北口音女声', 'category': 'female-accent'},
+    {'name': 'zh-CN-shaanxi-XiaoniNeural', 'backend': 'edge', 'locale': 'zh-CN-shaanxi', 'gender': 'Female',
+     'description': '陕西口音女声', 'category': 'female-accent'},
+    {'name': 'zh-CN-YunxiNeural', 'backend': 'edge', 'locale': 'zh-CN', 'gender': 'Male',
+     'description': '年轻男声', 'category': 'male-young'},
+    {'name': 'zh-CN-YunxiaNeural', 'backend': 'edge', 'locale': 'zh-CN', 'gender': 'Male',
+     'description': '温和男声', 'category': 'male-young'},
+    {'name': 'zh-CN-YunjianNeural', 'backend': 'edge', 'locale': 'zh-CN', 'gender': 'Male',
+     'description': '成熟男声', 'category': 'male-mature'},
+    {'name': 'zh-CN-YunyangNeural', 'backend': 'edge', 'locale': 'zh-CN', 'gender': 'Male',
+     'description': '中年男声', 'category': 'male-middle'},
+    {'name': 'zh-CN-YunzeNeural', 'backend': 'edge', 'locale': 'zh-CN', 'gender': 'Male',
+     'description': '老年男声', 'category': 'elderly'},
+]
+
+
+class VoiceCatalog:
+    """声音目录"""
+
+    VERSION = 1
+
+    def __init__(self, path: Optional[str] = None, ttl: float = DEFAULT_TTL):
+        """
+        初始化目录并读取本地数据
+
+        Args:
+            path: 目录文件路径（默认 ~/.cache/tts-converter/voice_catalog.json）
+            ttl: 有效期（秒），超过后列表命令会尝试在线刷新
+        """
+        self.path = Path(path or os.environ.get('TTS_VOICE_CATALOG') or DEFAULT_CATALOG_PATH)
+        self.ttl = ttl
+        self.updated_at = 0.0
+
+        self._by_key = {}  # {(后端, 名称): 条目}
+        self._indexes = {'locale': {}, 'gender': {}, 'category': {}, 'backend': {}}
+
+        self.load()
+
+    def load(self):
+        """读取目录文件；文件不存在或损坏时只使用内置声音"""
+        voices = []
+        self.updated_at = 0.0
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == self.VERSION:
+                    voices = data.get('voices', [])
+                    self.updated_at = data.get('updated_at', 0.0)
+            except (OSError, ValueError) as e:
+                print(f"[WARN] 声音目录读取失败，使用内置声音: {e}")
+
+        self._build(voices)
+
+    def _build(self, voices: List[Dict]):
+        """建立索引（内置声音的描述和类别补充到同名条目上）"""
+        self._by_key = {}
+        for index in self._indexes.values():
+            index.clear()
+
+        builtin = {(v['backend'], v['name']): v for v in BUILTIN_VOICES}
+        for voice in list(BUILTIN_VOICES) + list(voices):
+            key = (voice['backend'], voice['name'])
+            entry = dict(builtin.get(key, {}))
+            entry.update({k: v for k, v in voice.items() if v})
+            self._by_key[key] = entry
+
+        for entry in self._by_key.values():
+            for field, index in self._indexes.items():
+                value = entry.get(field)
+                if value:
+                    index.setdefault(value, []).append(entry)
+
+    def save(self, voices: List[Dict]):
+        """写入目录文件并重建索引"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.updated_at = time.time()
+
+        data = {'version': self.VERSION, 'updated_at': self.updated_at, 'voices': voices}
+        temp_path = self.path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        temp_path.replace(self.path)
+
+        self._build(voices)
+
+    def is_stale(self) -> bool:
+        """目录是否已超过有效期（从未刷新过也算）"""
+        return time.time() - self.updated_at > self.ttl
+
+    async def refresh(self) -> bool:
+        """
+        从Edge TTS在线获取声音列表并写入目录
+
+        Returns:
+            是否刷新成功（失败时保留原有数据）
+        """
+        try:
+            import edge_tts
+            raw_voices = await edge_tts.list_voices()
+        except Exception as e:
+            print(f"[WARN] 在线获取声音列表失败，使用本地声音目录: {e}")
+            return False
+
+        voices = []
+        for v in raw_voices:
+            voices.append({
+                'name': v.get('ShortName') or v['Name'],
+                'backend': 'edge',
+                'locale': v.get('Locale', ''),
+                'gender': v.get('Gender', ''),
+                'friendly_name': v.get('FriendlyName', ''),
+            })
+
+        self.save(voices)
+        return True
+
+    async def refresh_if_stale(self) -> bool:
+        """超过有效期时在线刷新"""
+        if self.is_stale():
+            return await self.refresh()
+        return True
+
+    def get(self, name: str, backend: str = 'edge') -> Optional[Dict]:
+        """按名称查找声音"""
+        return self._by_key.get((backend, name))
+
+    def describe(self, name: str, backend: str = 'edge', default: str = '未知声音') -> str:
+        """获取声音的中文描述"""
+        entry = self._by_key.get((backend, name))
+        if entry is None:
+            return default
+        return entry.get('description') or entry.get('friendly_name') or default
+
+    def find(self, locale: Optional[str] = None, gender: Optional[str] = None,
+             category: Optional[str] = None, backend: Optional[str] = None) -> List[Dict]:
+        """
+        按条件查找声音
+
+        Args:
+            locale: 语言（如 zh-CN），按完全匹配
+            gender: 性别（Male/Female）
+            category: 类别（如 male-young）
+            backend: 后端（如 edge）
+
+        Returns:
+            符合全部条件的声音列表，按目录中的顺序
+        """
+        conditions = [(field, value) for field, value in
+                      (('locale', locale), ('gender', gender), ('category', category), ('backend', backend))
+                      if value]
+        if not conditions:
+            return list(self._by_key.values())
+
+        # 从最小的索引开始过滤
+        candidate_lists = [self._indexes[field].get(value, []) for field, value in conditions]
+        smallest = min(candidate_lists, key=len)
+        return [entry for entry in smallest
+                if all(entry.get(field) == value for field, value in conditions)]
+
+    def locales(self) -> List[str]:
+        """所有语言"""
+        return sorted(self._indexes['locale'])
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+
+_default_catalog = None
+
+
+def get_catalog() -> VoiceCatalog:
+    """获取进程内共享的默认声音目录"""
+    global _default_catalog
+    if _default_catalog is None:
+        _default_catalog = VoiceCatalog()
+    return _default_catalog
@@ -7,6 +7,9 @@
 
 from typing import Dict, List
 
+from voice_catalog import VoiceCatalog, get_catalog
+from voice_assignment import VoiceAssignmentSolver
+
 
 class VoiceMatcher:
     """声音匹配器"""
@@ -94,46 +97,15 @@ class VoiceMatcher:
         },
     }
 
-    # 备选声音列表（用于解决冲突）
-    BACKUP_VOICES = {
-        'male-young': [
-            'zh-CN-YunxiNeural',
-            'zh-CN-YunxiaNeural',
-            'zh-CN-YunyangNeural'
-        ],
-        'male-mature': [
-            'zh-CN-YunjianNeural',
-            'zh-CN-YunyangNeural'
-        ],
-        'male-middle': [
-            'zh-CN-YunyangNeural',
-            'zh-CN-YunjianNeural'
-        ],
-        'female-young': [
-            'zh-CN-XiaoxiaoNeural',
-            'zh-CN-YunxiNeural'
-        ],
-        'female-mature': [
-            'zh-CN-XiaoyiNeural',
-            'zh-CN-XiaoxiaoNeural'
-        ],
-        'female-accent': [
-            'zh-CN-liaoning-XiaobeiNeural',
-            'zh-CN-shaanxi-XiaoniNeural'
-        ],
-        'child': [
-            'zh-CN-YunxiNeural',
-            'zh-CN-XiaoxiaoNeural'
-        ],
-        'elderly': [
-            'zh-CN-YunjianNeural',
-            'zh-CN-XiaoyiNeural'
-        ]
-    }
+    def __init__(self, catalog: VoiceCatalog = None):
+        """
+        初始化匹配器
 
-    def __init__(self):
-        """初始化匹配器"""
+        Args:
+            catalog: 声音目录（默认使用本地声音目录，不访问网络）
+        """
         self.used_voices = set()  # 已使用的声音
+        self.catalog = catalog if catalog is not None else get_catalog()
 
     def assign_voices(self, characters: Dict[str, Dict]) -> Dict[str, Dict]:
         """
@@ -270,6 +242,9 @@ class VoiceMatcher:
         """
         解决声音冲突
 
+        有角色共用同一声音时，把所有角色与(声音, 语速)组合的分配作为带权二部匹配整体求最优解：
+        尽量保持规则推荐的声音和语速，同时让角色之间听起来各不相同
+
         Args:
             assignments: 声音分配字典
             voice_counts: 声音使用统计
@@ -277,64 +252,27 @@ class VoiceMatcher:
         Returns:
             解决冲突后的分配字典
         """
-        # 找出冲突的声音
-        conflicts = {voice: count for voice, count in voice_counts.items() if count > 1}
-
-        if not conflicts:
+        if all(count <= 1 for count in voice_counts.values()):
             return assignments
 
-        # 对每个冲突的声音，尝试重新分配
-        for voice, count in conflicts.items():
-            # 找出使用该声音的所有角色
-            conflict_roles = [
-                (name, info)
-                for name, info in assignments.items()
-                if info['voice'] == voice
-            ]
-
-            # 第一个角色保持不变，其他角色尝试更换声音
-            for i, (name, info) in enumerate(conflict_roles[1:], 1):
-                # 获取角色的声音类别
-                original_voice_key = self._get_voice_key_by_voice(voice)
-
-                if original_voice_key is None:
-                    continue
-
-                # 获取备选声音列表
-                backup_list = self.BACKUP_VOICES.get(original_voice_key, [])
-
-                # 尝试使用备选声音
-                for backup_voice in backup_list:
-                    if backup_voice != voice:
-                        # 检查备选声音是否已被使用
-                        already_used = any(
-                            assign['voice'] == backup_voice
-                            for assign in assignments.values()
-                        )
-
-                        if not already_used:
-                            # 使用备选声音
-                            assignments[name]['voice'] = backup_voice
-                            assignments[name]['voice_description'] = self._get_description_by_voice(backup_voice)
-                            break
-
-        return assignments
+        names = list(assignments)
+        requests = [
+            {'voice': assignments[name]['voice'], 'rate': assignments[name]['rate'],
+             'gender': assignments[name]['gender']}
+            for name in names
+        ]
+        solution = VoiceAssignmentSolver(self.catalog).solve(requests)
 
-    def _get_voice_key_by_voice(self, voice_name: str) -> str:
-        """
-        根据声音名称获取声音类别
+        for name, (voice, rate) in zip(names, solution):
+            assignments[name]['voice'] = voice
+            assignments[name]['rate'] = rate
+            assignments[name]['voice_description'] = self._get_description_by_voice(voice)
 
-        Args:
-            voice_name: 声音名称
+        distinct = len(set(solution))
+        if distinct < len(names):
+            print(f"[WARN] 角色数({len(names)})超过可区分的声音组合数，{len(names) - distinct} 个角色与其他角色共用声音")
 
-        Returns:
-            声音类别，如 'male-young'
-        """
-        for key, info in self.VOICE_LIBRARY.items():
-            if info['voice'] == voice_name:
-                return info['category']
-
-        return None
+        return assignments
 
     def _get_description_by_voice(self, voice_name: str) -> str:
         """
@@ -346,11 +284,7 @@ class VoiceMatcher:
         Returns:
             声音描述
         """
-        for info in self.VOICE_LIBRARY.values():
-            if info['voice'] == voice_name:
-                return info['description']
-
-        return '未知声音'
+        return self.catalog.describe(voice_name)
 
 
 # 测试代码